@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+"""
+control allocation: from a desired wrench to the thrust of each propeller
+
+for an allocation matrix B (r, P), the minimum norm solution of B.u = w is u = B^T.(B.B^T)^-1.w,
+the inverse of the Gram matrix G = B.B^T is factorized once per set of active propellers and cached;
+removing one propeller (motor out, or saturated in the box-limited mode) is a rank-1 update of G,
+so its inverse is derived from the cached one by Sherman-Morrison instead of a new factorization
+"""
+
+import collections
+
+import numpy as np
+
+class ControlAllocator() :
+
+	def __init__(self, mixer, lower=0.0, upper=np.inf, axis=None, cache_size=256) :
+		"""
+		mixer is the (6, P) allocation matrix (see Multicopter.mixer),
+		axis the rows which are controlled (all by default), lower and upper the limits of each propeller
+		"""
+		mixer = np.asarray(mixer, dtype=np.float64)
+		self.b = mixer if axis is None else mixer[list(axis)]
+		self.r, self.p = self.b.shape
+		if 63 < self.p :
+			raise ValueError("at most 63 actuators are supported")
+
+		self.lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), (self.p,)).copy()
+		self.upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), (self.p,)).copy()
+
+		self.full_mask = (1 << self.p) - 1
+		self.mask = self.full_mask # the propellers which are not out
+
+		self.cache_size = cache_size
+		self._cache = collections.OrderedDict()
+		self._null = dict()
+
+		# the factorization of the full configuration, the root of all the updates
+		g = self.b @ self.b.T
+		try :
+			self.factor = np.linalg.cholesky(g)
+			g_inv = np.linalg.inv(self.factor)
+			g_inv = g_inv.T @ g_inv
+		except np.linalg.LinAlgError :
+			self.factor = None
+			g_inv = np.linalg.pinv(g)
+		self._root = (g_inv, self.b.T @ g_inv, self.factor is not None)
+
+	@staticmethod
+	def from_multicopter(m, axis=(2, 3, 4, 5)) :
+		""" allocate the vertical thrust and the three torques of a Multicopter, within [0 ; max_thrust] """
+		return ControlAllocator(m.mixer, 0.0, m.max_thrust, axis)
+
+	def _columns(self, mask) :
+		return np.array([(mask >> i) & 1 for i in range(self.p)], dtype=bool)
+
+	def _g_inv(self, mask) :
+		"""
+		inverse of the Gram matrix of the active columns, the product B^T.G^-1, and whether G is regular
+		(else the inverse is a pseudo-inverse)
+		"""
+		if mask == self.full_mask :
+			return self._root
+
+		c = self._cache.get(mask)
+		if c is not None :
+			self._cache.move_to_end(mask)
+			return c
+
+		# remove the highest missing column from the configuration with one more column
+		k = (self.full_mask & ~mask).bit_length() - 1
+		g_inv, _, is_regular = self._g_inv(mask | (1 << k))
+
+		b = self.b[:, k]
+		gb = g_inv @ b
+		d = 1.0 - b @ gb
+		if is_regular and d > 1e-9 :
+			g_inv = g_inv + np.outer(gb, gb) / d
+		else :
+			# without this column, or already with it, the wrench space is not spanned anymore: Sherman-Morrison does
+			# not apply to a singular Gram matrix, this configuration and all its subsets use the pseudo-inverse
+			bm = self.b[:, self._columns(mask)]
+			g_inv = np.linalg.pinv(bm @ bm.T)
+			is_regular = False
+
+		c = (g_inv, self.b.T @ g_inv, is_regular)
+		self._cache[mask] = c
+		if len(self._cache) > self.cache_size :
+			self._cache.popitem(last=False)
+		return c
+
+	def pinv(self, mask=None) :
+		""" (P, r) pseudo-inverse of the allocation matrix, restricted to the columns of mask (null rows elsewhere) """
+		mask = self.mask if mask is None else mask
+		if mask == self.full_mask :
+			return self._root[1]
+		return self._g_inv(mask)[1] * self._columns(mask)[:, None]
+
+	def null_space(self, mask=None) :
+		""" (P, P - rank) orthonormal basis of the thrust variations which leave the wrench unchanged """
+		mask = self.mask if mask is None else mask
+		n = self._null.get(mask)
+		if n is None :
+			col = self._columns(mask)
+			u, s, vt = np.linalg.svd(self.b[:, col])
+			rank = int((s > s.max() * 1e-12).sum()) if len(s) else 0
+			n = np.zeros((self.p, vt.shape[0] - rank), dtype=np.float64)
+			n[col] = vt[rank:].T
+			self._null[mask] = n
+		return n
+
+	def set_motor_out(self, i, is_out=True) :
+		""" declare the propeller i as out (or back), the following solutions do not use it """
+		if is_out :
+			self.mask &= ~(1 << i)
+		else :
+			self.mask |= (1 << i)
+
+	def solve(self, wrench) :
+		""" minimum norm thrusts for a (K, r) batch of wrenches (or a single one), without limits """
+		w = np.asarray(wrench, dtype=np.float64)
+		return w @ self.pinv().T
+
+	def solve_box(self, wrench, max_iter=None) :
+		"""
+		thrusts within [lower ; upper] for a (K, r) batch of wrenches (or a single one),
+		by redistributed pseudo-inverse: the saturated propellers are fixed at their limit and the remaining
+		wrench is allocated to the others, until no limit is violated (or none is left)
+		the wrenches are grouped by set of free propellers, so that each group is solved with one cached inverse
+		"""
+		w = np.asarray(wrench, dtype=np.float64)
+		is_single = (w.ndim == 1)
+		w = w.reshape(-1, self.r)
+
+		k = len(w)
+		bit = np.int64(1) << np.arange(self.p, dtype=np.int64)
+		free = np.full(k, self.mask, dtype=np.int64)
+		u = w @ self.pinv().T
+
+		for n in range(self.p if max_iter is None else max_iter) :
+			is_free = (free[:, None] & bit) != 0
+			low, high = (u < self.lower) & is_free, (self.upper < u) & is_free
+			sat = low | high
+			row = sat.any(axis=1)
+			if not row.any() :
+				break
+
+			u[low] = np.broadcast_to(self.lower, u.shape)[low]
+			u[high] = np.broadcast_to(self.upper, u.shape)[high]
+			free[row] &= ~(sat[row] @ bit)
+
+			is_free = (free[:, None] & bit) != 0
+			fixed = np.where(is_free, 0.0, u)
+			residual = w - fixed @ self.b.T
+
+			for mask in np.unique(free[row]).tolist() :
+				sel = row & (free == mask)
+				if mask == 0 :
+					continue
+				u[sel] = fixed[sel] + residual[sel] @ self.pinv(mask).T
+
+		u = np.clip(u, self.lower, self.upper)
+		u[:, ~self._columns(self.mask)] = 0.0
+		return u[0] if is_single else u
+
+if __name__ == '__main__' :
+
+	import time
+
+	from geometrik.multicopter import setup_hexacopter
+
+	m = setup_hexacopter(0.0, 0.0, 0.0)
+	a = ControlAllocator.from_multicopter(m)
+
+	rng = np.random.default_rng(0)
+	w = np.column_stack([
+		rng.uniform(10.0, 40.0, 100000),
+		rng.uniform(-5.0, 5.0, (100000, 3))
+	])
+
+	for name, solve in [("unconstrained", a.solve), ("box", a.solve_box)] :
+		t = time.perf_counter()
+		u = solve(w)
+		t = time.perf_counter() - t
+		ok = (np.abs(u @ a.b.T - w).max(axis=1) < 1e-9).mean()
+		print("{0:<14s} {1:10.0f} wrenches per second, {2:.1%} achieved exactly".format(name, len(w) / t, ok))
+
+	a.set_motor_out(2)
+	u = a.solve_box(w)
+	print("motor 3 out, thrust of the motor 3:", np.abs(u[:, 2]).max())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""
+columnar storage of geometry collections
+
+a collection of objects of one type (twod.Point, Segment, Circle, Arc, Polygon, threed.Vector) is stored as
+one float64 array, a row per object (the columns are listed in LAYOUT), and for the polygons, whose size varies,
+a row per vertex plus the offsets of each polygon (the ragged buffer of geometrik.twod.clip)
+
+on disk, a collection is a directory holding one .npy file per array and a small meta.json; the arrays are read
+back memory-mapped, so that loading does not depend on the size of the collection and the batched functions
+can work directly on the views (point_lst.value, polygon_lst.buffer, ...)
+"""
+
+import itertools
+import json
+import operator
+import pathlib
+
+import numpy as np
+
+from geometrik.twod import Point, Segment, Circle, Arc, Polygon
+from geometrik.threed.vector import Vector
+
+LAYOUT = {
+	'Point' : ('x', 'y'),
+	'Segment' : ('ax', 'ay', 'bx', 'by'),
+	'Circle' : ('cx', 'cy', 'r'),
+	'Arc' : ('cx', 'cy', 'w', 'start', 'stop'),
+	'Polygon' : ('x', 'y'), # one row per vertex
+	'Vector' : ('x', 'y', 'z', 'is_unit'), # is_unit is 1.0 for a Vector flagged as unit, else 0.0
+}
+
+_CLASS = {
+	'Point' : Point,
+	'Segment' : Segment,
+	'Circle' : Circle,
+	'Arc' : Arc,
+	'Polygon' : Polygon,
+	'Vector' : Vector,
+}
+
+_version = 1
+
+def _to_row(kind, o) :
+	if kind == 'Point' :
+		return o.x, o.y
+	if kind == 'Segment' :
+		return o.a.x, o.a.y, o.b.x, o.b.y
+	if kind == 'Circle' :
+		return o.c.x, o.c.y, o.r
+	if kind == 'Arc' :
+		return o.c.x, o.c.y, o.w, o.start, o.stop
+	if kind == 'Vector' :
+		return o.x, o.y, o.z, float(o._is_unit)
+
+def _from_row(kind, r) :
+	if kind == 'Point' :
+		return Point(r[0], r[1])
+	if kind == 'Segment' :
+		return Segment(Point(r[0], r[1]), Point(r[2], r[3]))
+	if kind == 'Circle' :
+		return Circle(Point(r[0], r[1]), r[2])
+	if kind == 'Arc' :
+		return Arc(Point(r[0], r[1]), r[2], r[3], r[4])
+	if kind == 'Vector' :
+		return Vector(r[0], r[1], r[2], r[3] != 0.0)
+
+class GeometryColumns() :
+
+	def __init__(self, kind, value, offsets=None) :
+		"""
+		kind is one of the keys of LAYOUT, value the (N, k) array of the rows, offsets the (P + 1,) start of each
+		polygon in value (for kind='Polygon' only); the arrays are kept as they are, without copy
+		"""
+		if kind not in LAYOUT :
+			raise ValueError("unknown geometry type {0}, expected one of {1}".format(kind, ', '.join(LAYOUT)))
+		if (kind == 'Polygon') != (offsets is not None) :
+			raise ValueError("the offsets are required for the polygons, and only for them")
+		if value.ndim != 2 or value.shape[1] != len(LAYOUT[kind]) :
+			raise ValueError("a {0} is stored in {1} columns, not in an array of shape {2}".format(kind, len(LAYOUT[kind]), value.shape))
+		self.kind = kind
+		self.value = value
+		self.offsets = offsets
+
+	@staticmethod
+	def from_objects(o_lst, kind=None) :
+		""" a sequence of objects of one type, which is guessed from the first one if kind is not given """
+		o_lst = list(o_lst)
+		if kind is None :
+			if not o_lst :
+				raise ValueError("the type of an empty collection must be given")
+			kind = next((k for k, c in _CLASS.items() if type(o_lst[0]) is c), None)
+			if kind is None :
+				raise ValueError("{0} can not be stored in columns".format(type(o_lst[0]).__name__))
+
+		k = len(LAYOUT[kind])
+		if kind == 'Polygon' :
+			offsets = np.zeros(len(o_lst) + 1, dtype=np.int64)
+			offsets[1:] = np.cumsum([len(o.p_lst) for o in o_lst])
+			value = np.fromiter(
+				itertools.chain.from_iterable((p.x, p.y) for o in o_lst for p in o.p_lst), dtype=np.float64, count=2 * offsets[-1]
+			).reshape(-1, 2)
+			return GeometryColumns(kind, value, offsets)
+
+		value = np.fromiter(
+			itertools.chain.from_iterable(_to_row(kind, o) for o in o_lst), dtype=np.float64, count=k * len(o_lst)
+		).reshape(-1, k)
+		return GeometryColumns(kind, value)
+
+	@staticmethod
+	def from_buffer(xy, offsets) :
+		""" polygons from a ragged buffer (xy, offsets), see geometrik.twod.clip """
+		return GeometryColumns('Polygon', np.asarray(xy, dtype=np.float64).reshape(-1, 2), np.asarray(offsets, dtype=np.int64))
+
+	def __len__(self) :
+		return len(self.value) if self.offsets is None else len(self.offsets) - 1
+
+	def __getitem__(self, i) :
+		"""
+		the object i, built from its row(s), or for a slice a GeometryColumns over the same arrays
+		(polygons are only sliced contiguously, their offsets are rebased in a small copy)
+		"""
+		if isinstance(i, slice) :
+			if self.offsets is None :
+				return GeometryColumns(self.kind, self.value[i])
+			start, stop, step = i.indices(len(self))
+			if step != 1 :
+				raise ValueError("the polygons can only be sliced contiguously")
+			stop = max(start, stop)
+			offsets = np.asarray(self.offsets[start:stop + 1], dtype=np.int64)
+			return GeometryColumns(self.kind, self.value[offsets[0]:offsets[-1]], offsets - offsets[0])
+		try :
+			i = range(len(self))[operator.index(i)]
+		except TypeError :
+			raise TypeError("a GeometryColumns is indexed by an integer or a slice, not {0}".format(type(i).__name__)) from None
+		if self.offsets is None :
+			return _from_row(self.kind, self.value[i].tolist())
+		start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+		return Polygon(* [Point(x, y) for x, y in self.value[start:stop].tolist()])
+
+	def __iter__(self) :
+		return (self[i] for i in range(len(self)))
+
+	def column(self, name) :
+		""" (N,) view of one column, by its name in LAYOUT """
+		return self.value[:, LAYOUT[self.kind].index(name)]
+
+	@property
+	def buffer(self) :
+		""" the polygons as the ragged buffer (xy, offsets) of geometrik.twod.clip """
+		if self.offsets is None :
+			raise ValueError("only the polygons are stored as a ragged buffer")
+		return self.value, self.offsets
+
+	def save(self, pth) :
+		""" write the collection in the directory pth (created if needed) """
+		pth = pathlib.Path(pth)
+		pth.mkdir(parents=True, exist_ok=True)
+		np.save(pth / 'value.npy', np.ascontiguousarray(self.value, dtype=np.float64))
+		if self.offsets is not None :
+			np.save(pth / 'offsets.npy', np.ascontiguousarray(self.offsets, dtype=np.int64))
+		(pth / 'meta.json').write_text(json.dumps({
+			'version' : _version,
+			'kind' : self.kind,
+			'columns' : LAYOUT[self.kind],
+			'length' : len(self),
+		}))
+
+	@staticmethod
+	def load(pth, mmap_mode='r') :
+		""" read a collection written by save(), memory-mapped unless mmap_mode is None """
+		pth = pathlib.Path(pth)
+		meta = json.loads((pth / 'meta.json').read_text())
+		if meta['version'] != _version :
+			raise ValueError("unsupported version {0} of the columnar format".format(meta['version']))
+		value = np.load(pth / 'value.npy', mmap_mode=mmap_mode, allow_pickle=False)
+		offsets = np.load(pth / 'offsets.npy', mmap_mode=mmap_mode, allow_pickle=False) if meta['kind'] == 'Polygon' else None
+		return GeometryColumns(meta['kind'], value, offsets)
+
+def save(pth, o_lst, kind=None) :
+	""" write a sequence of objects of one type, see GeometryColumns.from_objects() """
+	u = o_lst if isinstance(o_lst, GeometryColumns) else GeometryColumns.from_objects(o_lst, kind)
+	u.save(pth)
+	return u
+
+def load(pth, mmap_mode='r') :
+	return GeometryColumns.load(pth, mmap_mode)
+
+if __name__ == '__main__' :
+
+	import pickle
+	import tempfile
+	import time
+
+	rng = np.random.default_rng(0)
+
+	with tempfile.TemporaryDirectory() as tmp :
+		tmp = pathlib.Path(tmp)
+
+		# pickle of the individual objects, as a reference
+		n = 100000
+		p_lst = [Point(x, y) for x, y in rng.uniform(0.0, 1.0, (n, 2)).tolist()]
+		t0 = time.perf_counter()
+		(tmp / 'point.pkl').write_bytes(pickle.dumps(p_lst))
+		t1 = time.perf_counter()
+		pickle.loads((tmp / 'point.pkl').read_bytes())
+		t2 = time.perf_counter()
+		print("pickle   {0:9d} Point: write {1:7.3f} s, read {2:7.3f} s".format(n, t1 - t0, t2 - t1))
+
+		t0 = time.perf_counter()
+		save(tmp / 'point_obj', p_lst)
+		t1 = time.perf_counter()
+		u = load(tmp / 'point_obj')
+		list(u)
+		t2 = time.perf_counter()
+		print("columnar {0:9d} Point: write {1:7.3f} s, read {2:7.3f} s (objects rebuilt)".format(n, t1 - t0, t2 - t1))
+
+		# 10^7 points, written from an array, read back memory-mapped
+		n = 10000000
+		GeometryColumns('Point', rng.uniform(0.0, 1.0, (n, 2))).save(tmp / 'point')
+		t0 = time.perf_counter()
+		u = load(tmp / 'point')
+		t1 = time.perf_counter()
+		m = u.value.mean(axis=0)
+		t2 = time.perf_counter()
+		print("columnar {0:9d} Point: load {1:7.4f} s, first pass over the mapped array {2:.3f} s".format(n, t1 - t0, t2 - t1))
+
+		# polygons, handed over to the clipping functions without any conversion
+		from geometrik.twod.clip import clip_box, ring_area
+
+		n = 1000000
+		theta = np.linspace(0.0, 2.0 * np.pi, 5, endpoint=False)
+		c = rng.uniform(0.0, 1.0, (n, 1, 2))
+		xy = (c + 0.01 * np.stack([np.cos(theta), np.sin(theta)], axis=-1)).reshape(-1, 2)
+		GeometryColumns.from_buffer(xy, np.arange(0, 5 * n + 1, 5)).save(tmp / 'polygon')
+		t0 = time.perf_counter()
+		u = load(tmp / 'polygon')
+		t1 = time.perf_counter()
+		print("columnar {0:9d} Polygon: load {1:7.4f} s, {2}, clipped area {3:.4f}".format(
+			n, t1 - t0, u[0].p_lst[:2], ring_area(* clip_box(* u.buffer, 0.0, 0.0, 0.5, 0.5)).sum()
+		))
+
+		for o in [Segment(Point(0, 1), Point(2, 3)), Circle(Point(1, 2), 3.0), Arc(Point(0, 0), 0.5, 0.0, 1.0), Vector(1.0, 2.0, 3.0)] :
+			save(tmp / 'other', [o, o])
+			print(load(tmp / 'other')[1])
@@ -1,14 +1,26 @@
 #!/usr/bin/env python3
 
+import collections
+import concurrent.futures
 import math
+import weakref
 
-from quaternion import Quaternion
+import numpy as np
+
+from geometrik.quaternion import Quaternion, QuaternionArray, resample
+from geometrik.twod.ellipse import PolarEarthSlice
 
 earth_omega = 7292115.0e-11 # earth rotation rate in [rad.s-1]
 
+wgs84 = PolarEarthSlice()
+
+# orientation of the local frames relative to the frame given by from_euler_rotation(0.0, -lat, lon)
+_ned_rotation = Quaternion.from_axial_rotation(0.0, 1.0, 0.0, -90.0)
+_enu_rotation = Quaternion.from_axial_rotation(1.0, 1.0, 1.0, 120.0)
+
 def wgs84_to_cartesian(lat, lon, alt) :
-	a = 6378137.0
-	b = a * (1 - (1.0 / 298.257223563))
+	a = wgs84.a
+	b = wgs84.b
 	lat, lon = math.radians(lat), math.radians(lon)
 	n = (a * a) / math.sqrt(
 		(a * a) * (math.cos(lat) ** 2) +
@@ -18,21 +30,140 @@ def wgs84_to_cartesian(lat, lon, alt) :
 	y = (n + alt) * math.cos(lat) * math.sin(lon)
 	z = ((b * b) / (a * a) * n + alt) * math.sin(lat)
 	return x, y, z
+
+def wgs84_to_cartesian_array(llh, out=None, chunk_size=1 << 18) :
+	"""
+	vectorized wgs84_to_cartesian(), llh is a (N, 3) array of latitude, longitude [deg] and altitude [m]
+	return a (N, 3) array of x, y, z [m]
+
+	llh can be a memory-mapped array, it is processed chunk by chunk to bound the temporaries,
+	the result is written in out, if given, which can be memory-mapped as well
+	"""
+	llh = np.asarray(llh)
+	if out is None :
+		out = np.empty(llh.shape, dtype=np.float64)
+
+	a2 = wgs84.a ** 2
+	b2 = wgs84.b ** 2
+	for start in range(0, len(llh), chunk_size) :
+		c = llh[start:start + chunk_size]
+		lat = np.radians(c[:, 0])
+		lon = np.radians(c[:, 1])
+		alt = c[:, 2]
+
+		cos_lat, sin_lat = np.cos(lat), np.sin(lat)
+		n = a2 / np.sqrt(a2 * cos_lat ** 2 + b2 * sin_lat ** 2)
+
+		r = (n + alt) * cos_lat
+		o = out[start:start + chunk_size]
+		o[:, 0] = r * np.cos(lon)
+		o[:, 1] = r * np.sin(lon)
+		o[:, 2] = (b2 / a2 * n + alt) * sin_lat
+	return out
+
+def cartesian_to_wgs84_array(xyz, out=None, chunk_size=1 << 18) :
+	"""
+	reverse of wgs84_to_cartesian_array(), xyz is a (N, 3) array of earth centered coordinates [m]
+	return a (N, 3) array of latitude, longitude [deg] and altitude [m]
+
+	closed form (H. Vermeille, Direct transformation from geocentric coordinates to geodetic coordinates, 2002),
+	without iteration, sub-millimetric from the deep underground to far above the satellite orbits
+	(it is not defined in a small region around the center of the earth)
+	"""
+	xyz = np.asarray(xyz)
+	if out is None :
+		out = np.empty(xyz.shape, dtype=np.float64)
+
+	a2 = wgs84.a ** 2
+	e2 = wgs84.e ** 2
+	e4 = e2 ** 2
+	for start in range(0, len(xyz), chunk_size) :
+		c = xyz[start:start + chunk_size]
+		x, y, z = c[:, 0], c[:, 1], c[:, 2]
+
+		rho2 = x * x + y * y
+		rho = np.sqrt(rho2)
+
+		p = rho2 / a2
+		q = (1.0 - e2) / a2 * (z * z)
+		r = (p + q - e4) / 6.0
+		s = e4 * p * q / (4.0 * r ** 3)
+		t = np.cbrt(1.0 + s + np.sqrt(s * (2.0 + s)))
+		u = r * (1.0 + t + 1.0 / t)
+		v = np.sqrt(u * u + e4 * q)
+		w = e2 * (u + v - q) / (2.0 * v)
+		k = np.sqrt(u + v + w * w) - w
+		d = k * rho / (k + e2)
+		dz = np.sqrt(d * d + z * z)
+
+		o = out[start:start + chunk_size]
+		o[:, 0] = np.degrees(2.0 * np.arctan2(z, d + dz))
+		o[:, 1] = np.degrees(np.arctan2(y, x))
+		o[:, 2] = (k + e2 - 1.0) / k * dz
+	return out
+
+def cartesian_to_wgs84(x, y, z) :
+	""" reverse of wgs84_to_cartesian(), for a single point """
+	return tuple(cartesian_to_wgs84_array(np.array([[x, y, z]], dtype=np.float64))[0].tolist())
 	
 
 class Frame() :
 	def __init__(self, pos_l=None, pos_r=None, ref=None, name=None) :
 		# coordonnées de l'origine dans le repère parent
-		self.pos_l = Quaternion.null() if pos_l is None else pos_l
+		self._pos_l = Quaternion.null() if pos_l is None else pos_l
 		
 		# orientation du nouveau repère par rapport au repère parent
-		self.pos_r = (Quaternion.identity() if pos_r is None else pos_r).normalize()
+		self._pos_r = (Quaternion.identity() if pos_r is None else pos_r).normalize()
 		
 		self._ref = ref
 		self._name = name
+
+		# the frames defined in this one, weakly referenced so that temporary frames just vanish
+		self._children = weakref.WeakSet()
+		if ref is not None :
+			ref._children.add(self)
+
+		# incremented each time this frame, or one of its references, moves
+		self._version = 0
+
+		# memoized expression of this frame in the absolute frame, valid as long as _abs_version == _version
+		self._abs = None
+		self._abs_version = -1
+
+	@property
+	def pos_l(self) :
+		return self._pos_l
+
+	@pos_l.setter
+	def pos_l(self, value) :
+		self._pos_l = value
+		self.touch()
+
+	@property
+	def pos_r(self) :
+		return self._pos_r
+
+	@pos_r.setter
+	def pos_r(self, value) :
+		self._pos_r = value.normalize()
+		self.touch()
+
+	def touch(self) :
+		"""
+		invalidate the cached transforms of this frame and of all the frames defined in it,
+		called by the pos_l and pos_r setters, must be called after an in place modification of pos_l or pos_r
+		"""
+		stack = [self]
+		while stack :
+			f = stack.pop()
+			f._version += 1
+			stack.extend(f._children)
 		
+	# set to True, on the class or on a single frame, to print the intermediate frames of transport()
+	debug = False
+
 	def dbg(self, * pos, ** nam) :
-		if __debug__ :
+		if self.debug :
 			print(* pos, ** nam)
 		
 	@property
@@ -56,22 +187,19 @@ class Frame() :
 		"""
 		time, c'est l'heure relative par rapport au départ, permet de suivre la rotation de la terre
 		"""
-		q = Quaternion.from_axial_rotation(0.0, 1.0, 0.0, -90.0)
 		lon += math.degrees(earth_omega * time)
 		return Frame(
 			Quaternion.from_vector(* wgs84_to_cartesian(lat, lon, alt)),
-			Quaternion.from_euler_rotation(0.0, -lat, lon) * q,
+			Quaternion.from_euler_rotation(0.0, -lat, lon) * _ned_rotation,
 			None, "NED"
 		)
 		
 	@staticmethod
 	def init_EastNorthUp(lat, lon, alt, time=0) :
-		q = Quaternion.from_axial_rotation(1.0, 1.0, 1.0, 90.0)
-		q.print_basis()
 		lon += math.degrees(earth_omega * time)
 		return Frame(
 			Quaternion.from_vector(* wgs84_to_cartesian(lat, lon, alt)),
-			Quaternion.from_euler_rotation(0.0, -lat, lon) * q,
+			Quaternion.from_euler_rotation(0.0, -lat, lon) * _enu_rotation,
 			None, "ENU"
 		)
 		
@@ -85,34 +213,20 @@ class Frame() :
 			stack.append(f)
 		return stack
 		
-	def transport(self, other) :
+	def transport(self, other, graph=None) :
 		"""
-		smartly transpose from one frame (self) to another (other)
+		smartly transpose from one frame (self) to another (other),
+		return self expressed in other, as a Frame whose reference is other
+		if a FrameGraph is given, the common reference is looked up, and the result cached, by it
 		validated 2017.03.24
 		"""
-		self_lst = list()
-		f = self
-		while f._ref is not None :
-			f = f._ref
-			self_lst.append(f)
-		self_lst.append(None)
-		
-		other_lst = list()
-		f = other
-		while f._ref not in self_lst :
-			other_lst.append(f)		
-			f = f._ref
-		other_lst.append(f)		
-		
-		f = self
-		self.dbg(f)
-		while f._ref != other_lst[-1]._ref :
-			f = f._pop_reference()
-			self.dbg(f)
-		while other_lst :
-			f = other_lst.pop()._push_reference(f)
-			self.dbg(f)
-		return f
+		if graph is not None :
+			return graph.transport(self, other)
+		return _transport(self, other, _common_reference(self, other))
+
+	def transform_points(self, points, other, ** opt) :
+		""" express the points given in this frame in the frame other, see transform_points() """
+		return transform_points(points, self, other, ** opt)
 		
 	def _pop_reference(self) :
 		""" for a frame f4 defined as f0 < f1 < f2 < f3 < f4, return f0 < f1 < f2 < f4 """
@@ -155,9 +269,34 @@ class Frame() :
 		if self._ref is None :
 			return self
 		else :
-			return self._pop_reference().to_absolute_recursive()
+			return self._pop_reference()._to_absolute_recursive()
+
+	def _to_absolute_cached(self) :
+		"""
+		express the current frame in the absolute frame, return a Frame whose parent is None
+
+		the result is memoized and built on the memoized absolute frame of the parent,
+		as long as nothing moves in the chain, a call costs O(1)
+		the returned frame is shared, it must not be modified
+		"""
+		if self._abs_version == self._version :
+			return self._abs
+
+		if self._ref is None :
+			a = self
+		else :
+			r = self._ref._to_absolute_cached()
+			a = Frame(
+				r.pos_l + self.pos_l.rotate(r.pos_r),
+				r.pos_r * self.pos_r,
+				None, self._name
+			)
+
+		self._abs = a
+		self._abs_version = self._version
+		return a
 			
-	to_absolute = _to_absolute_iterative
+	to_absolute = _to_absolute_cached
 		
 	def to_relative_recursive(self, other) :
 		"""
@@ -170,10 +309,453 @@ class Frame() :
 		else :
 			return self._ref.to_relative_recursive(other)
 			
+def _depth(f) :
+	n = 0
+	while f._ref is not None :
+		f = f._ref
+		n += 1
+	return n
+
+def _common_reference(a, b) :
+	""" return the lowest frame which is a reference of both a and b (or is a or b), None if they only share the absolute frame """
+	da, db = _depth(a), _depth(b)
+	while da > db :
+		a, da = a._ref, da - 1
+	while db > da :
+		b, db = b._ref, db - 1
+	while a is not b :
+		a, b = a._ref, b._ref
+	return a
+
+def _to_reference(f, ref) :
+	""" express f in ref, which must be one of its references (or None for the absolute frame) """
+	f.dbg(f)
+	while f._ref is not ref :
+		f = f._pop_reference()
+		f.dbg(f)
+	return f
+
+def _transport(source, target, common) :
+	""" express source in target, common being their lowest common reference """
+	if source is common :
+		s = Frame(None, None, common, source._name)
+	else :
+		s = _to_reference(source, common)
+	if target is common :
+		if s is source :
+			# source is defined in target, a copy is returned so that the result can be changed independently
+			s = Frame(Quaternion(* source.pos_l.value), Quaternion(* source.pos_r.value), target, source._name)
+		return s
+
+	t = _to_reference(target, common)
+	f = Frame(
+		(s.pos_l - t.pos_l).rotate(t.pos_r.conjugate),
+		t.pos_r.conjugate * s.pos_r,
+		target, source._name
+	)
+	source.dbg(f)
+	return f
+
+class FrameGraph() :
+	"""
+	registry of frames which answers transport() queries between any two of them
+
+	the lowest common reference is found by binary lifting, in O(log(depth)),
+	and the composed transform of each (source, target) pair is kept in a LRU cache,
+	it stays valid as long as the version of both frames is unchanged
+	(any move of a frame along the path bumps the version of its descendants, see Frame.touch())
+
+	frames are registered, with all their references, on first use; the graph only holds weak references to them,
+	the slot of a frame which vanishes is reused (its descendants, which hold it, are gone before it)
+	"""
+
+	def __init__(self, cache_size=4096) :
+		self.cache_size = cache_size
+
+		# index 0 is the absolute frame (None), the parent of all the root frames
+		self._index = weakref.WeakKeyDictionary()
+		self._depth = [0]
+		self._up = [[0]] # _up[k][i] is the index of the 2**k-th reference of the frame i
+		self._frame = [lambda : None] # weak references to the frames, by index
+		self._free = list() # indexes of the frames which vanished, filled by the weakref callbacks
+
+		self._cache = collections.OrderedDict()
+
+	def __len__(self) :
+		""" number of frames alive in the graph """
+		return len(self._index)
+
+	def register(self, frame) :
+		""" add frame, and its references, to the graph, return its index """
+		if frame is None :
+			return 0
+		i = self._index.get(frame)
+		if i is not None :
+			return i
+
+		p = self.register(frame._ref)
+		if self._free :
+			i = self._free.pop()
+		else :
+			i = len(self._frame)
+			self._frame.append(None)
+			self._depth.append(0)
+			for u in self._up :
+				u.append(0)
+		self._index[frame] = i
+		self._frame[i] = weakref.ref(frame, lambda r, i=i, free=self._free : free.append(i))
+		self._depth[i] = self._depth[p] + 1
+
+		k = 0
+		while True :
+			if k == len(self._up) :
+				self._up.append([0] * len(self._frame))
+			up = self._up[k]
+			up[i] = p if k == 0 else self._up[k-1][self._up[k-1][i]]
+			if up[i] == 0 :
+				# no more levels for this frame, the missing ones point to the absolute frame
+				for u in self._up[k+1:] :
+					u[i] = 0
+				break
+			k += 1
+		return i
+
+	def common_reference(self, a, b) :
+		""" lowest common reference of a and b, see _common_reference() """
+		i, j = self.register(a), self.register(b)
+		if self._depth[i] < self._depth[j] :
+			i, j = j, i
+
+		d = self._depth[i] - self._depth[j]
+		k = 0
+		while d :
+			if d & 1 :
+				i = self._up[k][i]
+			d >>= 1
+			k += 1
+
+		if i == j :
+			return self._frame[i]()
+
+		for k in reversed(range(len(self._up))) :
+			if self._up[k][i] != self._up[k][j] :
+				i, j = self._up[k][i], self._up[k][j]
+		return self._frame[self._up[0][i]]()
+
+	def transport(self, source, target) :
+		"""
+		same as source.transport(target), cached; the result is a snapshot, not a child of target (touch() does not
+		walk the cache), and the cache holds neither source nor target
+		"""
+		key = (weakref.ref(source), weakref.ref(target))
+		c = self._cache.get(key)
+		if c is not None and c[0] == source._version and c[1] == target._version :
+			self._cache.move_to_end(key)
+			f = Frame(Quaternion(* c[2]), Quaternion(* c[3], is_unit=True), None, source._name)
+			f._ref = target
+			return f
+
+		f = _transport(source, target, self.common_reference(source, target))
+		target._children.discard(f)
+
+		self._cache[key] = (source._version, target._version, f.pos_l.value, f.pos_r.value) # values, f may be changed
+		self._cache.move_to_end(key)
+		if len(self._cache) > self.cache_size :
+			self._cache.popitem(last=False)
+		return f
+
+def rigid_transform(source, target, graph=None) :
+	"""
+	return the rotation matrix m and the translation t such that a point p given in source
+	is m @ p + t in target, both composed once through transport()
+	"""
+	f = source.transport(target, graph)
+	return f.pos_r.dcm, np.array(f.pos_l.to_vector(), dtype=np.float64)
+
+def transform_points(points, source, target, out=None, chunk_size=1 << 16, workers=None, graph=None) :
+	"""
+	express the (N, 3) array of points given in the frame source in the frame target
+
+	the transform is composed once, then applied chunk by chunk, so that points can be a memory-mapped
+	array (or the path of a .npy file, which is then memory-mapped), the result is written in out if given
+	with workers, the chunks are split across a pool of threads (numpy releases the GIL in the products)
+	"""
+	if isinstance(points, str) or hasattr(points, '__fspath__') :
+		points = np.load(points, mmap_mode='r')
+	if out is None :
+		out = np.empty((len(points), 3), dtype=np.float64)
+
+	m, t = rigid_transform(source, target, graph)
+	mt = m.T.copy()
+
+	def run(start) :
+		o = out[start:start + chunk_size]
+		np.matmul(np.asarray(points[start:start + chunk_size], dtype=np.float64), mt, out=o)
+		o += t
+
+	start_lst = range(0, len(points), chunk_size)
+	if workers is None or workers <= 1 :
+		for start in start_lst :
+			run(start)
+	else :
+		with concurrent.futures.ThreadPoolExecutor(workers) as pool :
+			for r in pool.map(run, start_lst) :
+				pass
+	return out
+
+class FrameTrajectory() :
+	"""
+	time-indexed series of local frames (NED or ENU) along a trajectory, stored by columns:
+		* time: (N,) sorted array
+		* pos_l: (N, 3) array, the origins in the absolute frame
+		* pos_r: QuaternionArray, the orientations in the absolute frame
+	"""
+
+	_rotation = {
+		'NED': _ned_rotation,
+		'ENU': _enu_rotation,
+	}
+
+	def __init__(self, time, pos_l, pos_r, name="NED") :
+		self.time = np.asarray(time, dtype=np.float64)
+		self.pos_l = np.asarray(pos_l, dtype=np.float64)
+		self.pos_r = pos_r
+		self.name = name
+
+		if not (len(self.time) == len(self.pos_l) == len(self.pos_r)) :
+			raise ValueError("time, pos_l and pos_r must have the same length")
+
+	@staticmethod
+	def from_wgs84(lat, lon, alt, time, name="NED") :
+		"""
+		vectorized Frame.init_NorthEastDown() (or init_EastNorthUp() with name="ENU"),
+		for arrays of latitude, longitude [deg], altitude [m] and relative time [s], in one pass
+		"""
+		q = FrameTrajectory._rotation[name]
+
+		lat, lon, alt, time = np.broadcast_arrays(* [np.asarray(i, dtype=np.float64) for i in (lat, lon, alt, time)])
+		lon = lon + np.degrees(earth_omega * time)
+
+		pos_l = wgs84_to_cartesian_array(np.stack([lat, lon, alt], axis=1))
+		pos_r = QuaternionArray.from_euler_rotation(0.0, -lat, lon) * q
+
+		return FrameTrajectory(time, pos_l, pos_r, name)
+
+	def __len__(self) :
+		return len(self.time)
+
+	def __getitem__(self, i) :
+		""" the i-th frame, as a Frame """
+		return Frame(
+			Quaternion.from_vector(* self.pos_l[i].tolist()),
+			self.pos_r[i],
+			None, self.name
+		)
+
+	def index_at(self, t) :
+		""" index of the last sample at or before each of the times t (clamped to the first one) """
+		return np.maximum(np.searchsorted(self.time, t, side='right') - 1, 0)
+
+	def interpolate(self, t) :
+		"""
+		origins and orientations at the sorted times t: the origins are interpolated linearly,
+		the orientations by SLERP, times outside of the trajectory hold the first or last frame
+		return a (M, 3) array and a QuaternionArray
+		"""
+		t = np.asarray(t, dtype=np.float64).reshape(-1)
+		pos_l = np.stack([np.interp(t, self.time, self.pos_l[:, k]) for k in range(3)], axis=1)
+		pos_r = resample(self.time, self.pos_r, t, 'slerp')
+		return pos_l, pos_r
+
+	def frame_at(self, t) :
+		""" the interpolated frame at the time t, as a Frame """
+		pos_l, pos_r = self.interpolate([t])
+		return Frame(
+			Quaternion.from_vector(* pos_l[0].tolist()),
+			pos_r[0],
+			None, self.name
+		)
+
+class RigidBodyArray() :
+	"""
+	N rigid bodies advanced side by side, the batched equivalent of DynamicFrame, stored as arrays:
+		* lin_0, lin_1: (N, 3) position and velocity of the centre of gravity, in the reference frame
+		* rot_0: QuaternionArray, attitude which maps the body frame onto the reference frame
+		* rot_1: (N, 3) angular rate, in the body frame
+		* lin_mass: (N,) mass, rot_mass: (N, 3, 3) inertia matrix, in the body frame
+
+	the wrench applied to the bodies is either a tuple (force, torque) held over the step, or a function
+	wrench(time, lin_0, lin_1, rot_0, rot_1) -> (force, torque), rot_0 being given as a (N, 4) array
+	forces are expressed in the reference frame, torques in the body frame
+	"""
+
+	def __init__(self, n, lin_mass=1.0, rot_mass=None, time=0.0) :
+		self.lin_0 = np.zeros((n, 3), dtype=np.float64)
+		self.lin_1 = np.zeros((n, 3), dtype=np.float64)
+		self.rot_0 = QuaternionArray.identity(n)
+		self.rot_1 = np.zeros((n, 3), dtype=np.float64)
+
+		self.lin_mass = np.broadcast_to(np.asarray(lin_mass, dtype=np.float64), (n,)).copy()
+		self.rot_mass = np.broadcast_to(
+			np.identity(3) if rot_mass is None else np.asarray(rot_mass, dtype=np.float64), (n, 3, 3)
+		).copy()
+
+		self.time = time
+
+	def __len__(self) :
+		return len(self.lin_mass)
+
+	@property
+	def rot_mass(self) :
+		return self._rot_mass
+
+	@rot_mass.setter
+	def rot_mass(self, value) :
+		self._rot_mass = value
+		self._rot_mass_inv = np.linalg.inv(value)
+
+	def _wrench(self, wrench, time, lin_0, lin_1, rot_0, rot_1) :
+		if callable(wrench) :
+			force, torque = wrench(time, lin_0, lin_1, rot_0, rot_1)
+		else :
+			force, torque = wrench
+		return (
+			np.broadcast_to(np.asarray(force, dtype=np.float64), lin_0.shape),
+			np.broadcast_to(np.asarray(torque, dtype=np.float64), rot_1.shape)
+		)
+
+	def _derivative(self, time, state, wrench) :
+		""" time derivative of the state (lin_0, lin_1, rot_0, rot_1) """
+		lin_0, lin_1, rot_0, rot_1 = state
+		force, torque = self._wrench(wrench, time, lin_0, lin_1, rot_0, rot_1)
+
+		lin_2 = force / self.lin_mass[:, None]
+		rot_0_dot = 0.5 * (QuaternionArray(rot_0) * QuaternionArray.from_vector(rot_1)).value
+		# Euler's equations: I.dw/dt = torque - w x (I.w)
+		gyro = np.cross(rot_1, np.einsum('nij,nj->ni', self._rot_mass, rot_1))
+		rot_2 = np.einsum('nij,nj->ni', self._rot_mass_inv, torque - gyro)
+
+		return lin_1, lin_2, rot_0_dot, rot_2
+
+	def _state(self) :
+		return self.lin_0, self.lin_1, self.rot_0.value, self.rot_1
+
+	def _set_state(self, state) :
+		lin_0, lin_1, rot_0, rot_1 = state
+		self.lin_0, self.lin_1, self.rot_1 = lin_0, lin_1, rot_1
+		self.rot_0 = QuaternionArray(rot_0 / np.linalg.norm(rot_0, axis=1)[:, None], True)
+
+	def _step_euler(self, dt, wrench) :
+		""" semi-implicit (symplectic) Euler: velocities first, then positions with the new velocities """
+		lin_0, lin_1, rot_0, rot_1 = self._state()
+		_, lin_2, _, rot_2 = self._derivative(self.time, (lin_0, lin_1, rot_0, rot_1), wrench)
+
+		lin_1 = lin_1 + lin_2 * dt
+		rot_1 = rot_1 + rot_2 * dt
+		lin_0 = lin_0 + lin_1 * dt
+		rot_0 = (QuaternionArray(rot_0) * QuaternionArray.from_rotation_vector(rot_1 * dt)).value
+
+		return lin_0, lin_1, rot_0, rot_1
+
+	def _step_rk4(self, dt, wrench) :
+		y = self._state()
+		t = self.time
+
+		def shift(y, k, h) :
+			return tuple(a + h * b for a, b in zip(y, k))
+
+		k1 = self._derivative(t, y, wrench)
+		k2 = self._derivative(t + dt / 2.0, shift(y, k1, dt / 2.0), wrench)
+		k3 = self._derivative(t + dt / 2.0, shift(y, k2, dt / 2.0), wrench)
+		k4 = self._derivative(t + dt, shift(y, k3, dt), wrench)
+
+		return tuple(
+			a + (dt / 6.0) * (b1 + 2.0 * b2 + 2.0 * b3 + b4)
+			for a, b1, b2, b3, b4 in zip(y, k1, k2, k3, k4)
+		)
+
+	def step(self, dt, wrench, method='rk4') :
+		""" advance all the bodies by dt, with method 'euler' (semi-implicit) or 'rk4' """
+		if method == 'euler' :
+			state = self._step_euler(dt, wrench)
+		elif method == 'rk4' :
+			state = self._step_rk4(dt, wrench)
+		else :
+			raise ValueError("unknown integration method: {0!r}".format(method))
+		self._set_state(state)
+		self.time += dt
+
+	def run(self, duration, wrench, dt, method='rk4', tol=None, dt_min=1e-9, checkpoint=None, checkpoint_every=None) :
+		"""
+		advance all the bodies by duration
+
+		with tol None, the step is fixed (dt), otherwise dt is only the initial step, and it is adapted
+		by step doubling (one step against two half steps) so that the largest error of all the bodies stays under tol
+		with checkpoint (a path), the state is saved to disk at the end, and along the way every checkpoint_every (a duration)
+		return the number of steps taken
+		"""
+		stop = self.time + duration
+		next_checkpoint = None if checkpoint is None or checkpoint_every is None else self.time + checkpoint_every
+		n = 0
+
+		while self.time < stop :
+			h = min(dt, stop - self.time)
+
+			if tol is None :
+				self.step(h, wrench, method)
+			else :
+				y0, t0 = self._state(), self.time
+
+				self.step(h, wrench, method)
+				y_full = self._state()
+
+				self._set_state(y0)
+				self.time = t0
+				self.step(h / 2.0, wrench, method)
+				self.step(h / 2.0, wrench, method)
+
+				err = max(float(np.max(np.abs(a - b))) for a, b in zip(y_full, self._state())) / tol
+				if 1.0 < err and dt_min < h :
+					# rejected, retry from the start with a smaller step
+					self._set_state(y0)
+					self.time = t0
+					dt = max(dt_min, h * max(0.2, 0.9 * err ** -0.2))
+					continue
+				dt = h * min(2.0, 0.9 * err ** -0.2) if 0.0 < err else 2.0 * h
+
+			n += 1
+			if next_checkpoint is not None and next_checkpoint <= self.time :
+				self.save(checkpoint)
+				next_checkpoint += checkpoint_every
+
+		if checkpoint is not None :
+			self.save(checkpoint)
+		return n
+
+	def save(self, pth) :
+		""" checkpoint the state of all the bodies in a .npz file """
+		with open(pth, 'wb') as fid :
+			np.savez(
+				fid, time=self.time,
+				lin_0=self.lin_0, lin_1=self.lin_1, rot_0=self.rot_0.value, rot_1=self.rot_1,
+				lin_mass=self.lin_mass, rot_mass=self._rot_mass
+			)
+
+	@staticmethod
+	def load(pth) :
+		""" restore a checkpoint written by save() """
+		with np.load(pth) as data :
+			b = RigidBodyArray(len(data['lin_mass']), data['lin_mass'], data['rot_mass'], float(data['time']))
+			b.lin_0 = data['lin_0']
+			b.lin_1 = data['lin_1']
+			b.rot_0 = QuaternionArray(data['rot_0'], True)
+			b.rot_1 = data['rot_1']
+		return b
+
 class DynamicFrame() :
 	def __init__(self) :
 		self.lin_0 = Quaternion.null() # position du centre de gravité
-		self.rot_0 = Quaternion.null() # orientation du solide
+		self.rot_0 = Quaternion.identity() # orientation du solide
 		self.lin_1 = Quaternion.null() # vitesse du centre de gravité
 		self.rot_1 = Quaternion.null() # vitesse de rotation du solide
 		self.lin_2 = Quaternion.null() # accéleration du centre de gravité
@@ -184,12 +766,34 @@ class DynamicFrame() :
 		self.time = 0
 		
 		self.lin_mass = 1.0
-		self.rot_mass
+		self.rot_mass = np.identity(3) # matrice d'inertie, dans le repère du solide
 		
-	def step(self, time, force, torque) :
+	def step(self, time, force, torque, method='euler') :
+		"""
+		advance the solid up to time, under a force (in the reference frame)
+		and a torque (in the frame of the solid), both given as 3-tuples and held over the step
+		"""
 		if time <= self.time :
 			raise ValueError
-		self.lin_2
+		
+		b = RigidBodyArray(1, self.lin_mass, self.rot_mass, self.time)
+		b.lin_0[0] = self.lin_0.to_vector()
+		b.lin_1[0] = self.lin_1.to_vector()
+		b.rot_0 = QuaternionArray.from_quaternion_lst([self.rot_0])
+		b.rot_1[0] = self.rot_1.to_vector()
+
+		wrench = (np.array([force], dtype=np.float64), np.array([torque], dtype=np.float64))
+		_, lin_2, _, rot_2 = b._derivative(self.time, b._state(), wrench)
+		b.step(time - self.time, wrench, method)
+
+		self.lin_0 = Quaternion.from_vector(* b.lin_0[0].tolist())
+		self.lin_1 = Quaternion.from_vector(* b.lin_1[0].tolist())
+		self.rot_0 = b.rot_0[0]
+		self.rot_1 = Quaternion.from_vector(* b.rot_1[0].tolist())
+		self.lin_2 = Quaternion.from_vector(* lin_2[0].tolist())
+		self.rot_2 = Quaternion.from_vector(* rot_2[0].tolist())
+
+		self.time = time
 		
 	
 if __name__ == '__main__' :
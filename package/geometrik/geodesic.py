@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+
+"""
+geodesics on the ellipsoid of revolution, vectorized over arrays of points
+
+after C. F. F. Karney, Algorithms for geodesics, J. Geod. 87 (2013), with the series expanded to the order 6
+in the third flattening n: the distances are accurate to about 15 nm on the WGS84 ellipsoid
+
+the inverse problem is solved by a Newton iteration on the azimuth at the first point, started from a spherical
+or an astroid estimate; each pair keeps a bracket of the solution and falls back to its bisection when a Newton
+step goes astray, so that the near-antipodal pairs converge too
+
+the pairs are processed by chunks, and each chunk only iterates on the pairs which have not converged yet
+
+angles are in degrees, distances in meters, the constants come from a PolarEarthSlice (WGS84 by default)
+"""
+
+import math
+
+import numpy as np
+
+from geometrik.twod.ellipse import PolarEarthSlice
+
+_order = 6
+
+_tiny = math.sqrt(np.finfo(np.float64).tiny)
+_tol0 = np.finfo(np.float64).eps
+_tol1 = 200.0 * _tol0
+_tol2 = math.sqrt(_tol0)
+_tolb = _tol0 * _tol2
+_xthresh = 1000.0 * _tol2
+
+_maxit1 = 20 # Newton steps
+_maxit2 = _maxit1 + np.finfo(np.float64).nmant + 1 + 10 # then bisection steps
+
+# coefficients of the series, each polynomial is followed by its divisor
+_c1 = [
+	-1, 6, -16, 32,
+	-9, 64, -128, 2048,
+	9, -16, 768,
+	3, -5, 512,
+	-7, 1280,
+	-7, 2048,
+]
+_c1p = [
+	205, -432, 768, 1536,
+	4005, -4736, 3840, 12288,
+	-225, 116, 384,
+	-7173, 2695, 7680,
+	3467, 7680,
+	38081, 61440,
+]
+_c2 = [
+	1, 2, 16, 32,
+	35, 64, 384, 2048,
+	15, 80, 768,
+	7, 35, 512,
+	63, 1280,
+	77, 2048,
+]
+_a3 = [
+	-3, 128,
+	-2, -3, 64,
+	-1, -3, -1, 16,
+	3, -1, -2, 8,
+	1, -1, 2,
+	1, 1,
+]
+_c3 = [
+	3, 128,
+	2, 5, 128,
+	-1, 3, 3, 64,
+	-1, 0, 1, 8,
+	-1, 1, 4,
+	5, 256,
+	1, 3, 128,
+	-3, -2, 3, 64,
+	1, -3, 2, 32,
+	7, 512,
+	-10, 9, 384,
+	5, -9, 5, 192,
+	7, 512,
+	-14, 7, 512,
+	21, 2560,
+]
+
+def _polyval(n, p, s, x) :
+	""" Horner evaluation of the polynomial of degree n whose coefficients start at p[s] """
+	y = 0.0 if n < 0 else p[s]
+	for k in range(1, n + 1) :
+		y = y * x + p[s + k]
+	return y
+
+def _series(coeff, eps) :
+	""" the coefficients C1, C1' or C2, as a list of arrays indexed from 1 """
+	eps2 = eps * eps
+	c = [None,]
+	d = eps
+	o = 0
+	for l in range(1, _order + 1) :
+		m = (_order - l) // 2
+		c.append(d * _polyval(m, coeff, o, eps2) / coeff[o + m + 1])
+		o += m + 2
+		d = d * eps
+	return c
+
+def _a1m1f(eps) :
+	eps2 = eps * eps
+	t = eps2 * (eps2 * (eps2 + 4.0) + 64.0) / 256.0
+	return (t + eps) / (1.0 - eps)
+
+def _a2m1f(eps) :
+	eps2 = eps * eps
+	t = eps2 * (eps2 * (-11.0 * eps2 - 28.0) - 192.0) / 256.0
+	return (t - eps) / (1.0 + eps)
+
+def _sin_cos_series(sinx, cosx, c) :
+	""" sum of c[l] * sin(2 * l * x), by Clenshaw summation """
+	k = len(c)
+	n = k - 1
+	ar = 2.0 * (cosx - sinx) * (cosx + sinx)
+	y1 = 0.0
+	if n & 1 :
+		k -= 1
+		y0 = c[k]
+	else :
+		y0 = 0.0
+	n //= 2
+	while n :
+		n -= 1
+		k -= 1
+		y1 = ar * y0 - y1 + c[k]
+		k -= 1
+		y0 = ar * y1 - y0 + c[k]
+	return 2.0 * sinx * cosx * y0
+
+def _sum(u, v) :
+	""" error free sum: s + t == u + v exactly """
+	s = u + v
+	up = s - v
+	vpp = s - up
+	up = up - u
+	vpp = vpp - v
+	return s, np.where(s == 0.0, s, -(up + vpp))
+
+def _remainder(x) :
+	""" x reduced to [-180 ; 180] """
+	y = np.fmod(x, 360.0)
+	return np.where(y < -180.0, y + 360.0, np.where(180.0 < y, y - 360.0, y))
+
+def _ang_normalize(x) :
+	y = _remainder(x)
+	return np.where(np.abs(y) == 180.0, np.copysign(180.0, x), y)
+
+def _ang_diff(x, y) :
+	""" y - x reduced to [-180 ; 180], as a sum d + t computed without rounding error """
+	d, t = _sum(_remainder(-x), _remainder(y))
+	d, t = _sum(_remainder(d), t)
+	d = np.where((d == 0.0) | (np.abs(d) == 180.0), np.copysign(d, np.where(t == 0.0, y - x, -t)), d)
+	return d, t
+
+def _ang_round(x) :
+	""" round the tiny angles, so that they do not underflow later """
+	z = 1.0 / 16.0
+	y = np.abs(x)
+	w = z - y
+	y = np.where(w > 0.0, z - w, y)
+	return 0.0 + np.copysign(y, x)
+
+def _lat_fix(x) :
+	return np.where(np.abs(x) <= 90.0, x, np.nan)
+
+def _sincosd(x, t=None) :
+	""" sine and cosine of x (+ t) in degrees, reduced to the nearest quadrant first for exact multiples of 90 """
+	r = np.fmod(x, 360.0)
+	q = np.round(np.where(np.isfinite(r), r, 0.0) / 90.0)
+	r = r - 90.0 * q
+	r = np.radians(r if t is None else _ang_round(r + t))
+	s, c = np.sin(r), np.cos(r)
+	q = q.astype(np.int64) & 3
+	return (
+		np.choose(q, [s, c, -s, -c]),
+		0.0 + np.choose(q, [c, -s, -c, s])
+	)
+
+def _atan2d(y, x) :
+	return np.degrees(np.arctan2(y, x))
+
+def _norm2(x, y) :
+	r = np.hypot(x, y)
+	return x / r, y / r
+
+def _astroid(x, y) :
+	""" the positive root k of k^4 + 2 k^3 - (x^2 + y^2 - 1) k^2 - 2 y^2 k - y^2 = 0 """
+	p = x * x
+	q = y * y
+	r = (p + q - 1.0) / 6.0
+	s = p * q / 4.0
+	r2 = r * r
+	r3 = r * r2
+	disc = s * (s + 2.0 * r3)
+
+	t3 = s + r3
+	t3 = t3 + np.copysign(np.sqrt(np.maximum(disc, 0.0)), t3)
+	t = np.cbrt(t3)
+	u_pos = r + t + np.where(t != 0.0, r2 / t, 0.0)
+	u_neg = r + 2.0 * r * np.cos(np.arctan2(np.sqrt(np.maximum(-disc, 0.0)), -(s + r3)) / 3.0)
+	u = np.where(disc >= 0.0, u_pos, u_neg)
+
+	v = np.sqrt(u * u + q)
+	uv = np.where(u < 0.0, q / (v - u), u + v)
+	w = (uv - q) / (2.0 * v)
+	k = uv / (np.sqrt(uv + w * w) + w)
+	return np.where((q == 0.0) & (r <= 0.0), 0.0, k)
+
+class Geodesic() :
+
+	def __init__(self, earth=None) :
+		""" earth is a PolarEarthSlice, or any object with the attributes a and f """
+		earth = PolarEarthSlice() if earth is None else earth
+		self.a = earth.a
+		self.f = earth.f
+		if not (0.0 <= self.f < 1.0) :
+			raise ValueError("only the oblate ellipsoids (and the sphere) are supported")
+
+		self.f1 = 1.0 - self.f
+		self.b = self.a * self.f1
+		self.e2 = self.f * (2.0 - self.f)
+		self.ep2 = self.e2 / self.f1**2
+		self.n = self.f / (2.0 - self.f)
+		self.etol2 = 0.1 * _tol2 / math.sqrt(max(0.001, abs(self.f)) * min(1.0, 1.0 - self.f / 2.0) / 2.0)
+
+		# the coefficients of A3 and C3 depend on n only, they are evaluated once
+		self._a3x = list()
+		o = 0
+		for j in range(_order - 1, -1, -1) :
+			m = min(_order - j - 1, j)
+			self._a3x.append(_polyval(m, _a3, o, self.n) / _a3[o + m + 1])
+			o += m + 2
+
+		self._c3x = list()
+		o = 0
+		for l in range(1, _order) :
+			for j in range(_order - 1, l - 1, -1) :
+				m = min(_order - j - 1, j)
+				self._c3x.append(_polyval(m, _c3, o, self.n) / _c3[o + m + 1])
+				o += m + 2
+
+	def _a3f(self, eps) :
+		return _polyval(_order - 1, self._a3x, 0, eps)
+
+	def _c3f(self, eps) :
+		c = [None,]
+		mult = 1.0
+		o = 0
+		for l in range(1, _order) :
+			m = _order - l - 1
+			mult = mult * eps
+			c.append(mult * _polyval(m, self._c3x, o, eps))
+			o += m + 1
+		return c
+
+	def _reduced(self, lat) :
+		""" sine and cosine of the reduced latitude """
+		s, c = _sincosd(lat)
+		s, c = _norm2(s * self.f1, c)
+		return s, np.maximum(c, _tiny)
+
+	def _lengths(self, eps, sig12, ssig1, csig1, dn1, ssig2, csig2, dn2) :
+		""" distance and reduced length, in units of b """
+		a1 = _a1m1f(eps)
+		c1 = _series(_c1, eps)
+		a2 = _a2m1f(eps)
+		c2 = _series(_c2, eps)
+		m0x = a1 - a2
+		a1, a2 = 1.0 + a1, 1.0 + a2
+
+		b1 = _sin_cos_series(ssig2, csig2, c1) - _sin_cos_series(ssig1, csig1, c1)
+		b2 = _sin_cos_series(ssig2, csig2, c2) - _sin_cos_series(ssig1, csig1, c2)
+		s12b = a1 * (sig12 + b1)
+		j12 = m0x * sig12 + (a1 * b1 - a2 * b2)
+		m12b = dn2 * (csig1 * ssig2) - dn1 * (ssig1 * csig2) - csig1 * csig2 * j12
+		return s12b, m12b
+
+	def _lambda12(self, sbet1, cbet1, dn1, sbet2, cbet2, dn2, salp1, calp1, slam120, clam120, diffp) :
+		""" error on the longitude difference reached from the azimuth alp1, and its derivative """
+		calp1 = np.where((sbet1 == 0.0) & (calp1 == 0.0), -_tiny, calp1)
+
+		salp0 = salp1 * cbet1
+		calp0 = np.hypot(calp1, salp1 * sbet1)
+
+		somg1 = salp0 * sbet1
+		csig1 = comg1 = calp1 * cbet1
+		ssig1, csig1 = _norm2(sbet1, csig1)
+
+		salp2 = np.where(cbet2 != cbet1, salp0 / cbet2, salp1)
+		calp2 = np.where(
+			(cbet2 != cbet1) | (np.abs(sbet2) != -sbet1),
+			np.sqrt((calp1 * cbet1)**2 + np.where(
+				cbet1 < -sbet1,
+				(cbet2 - cbet1) * (cbet1 + cbet2),
+				(sbet1 - sbet2) * (sbet1 + sbet2)
+			)) / cbet2,
+			np.abs(calp1)
+		)
+
+		somg2 = salp0 * sbet2
+		csig2 = comg2 = calp2 * cbet2
+		ssig2, csig2 = _norm2(sbet2, csig2)
+
+		sig12 = np.arctan2(np.maximum(0.0, csig1 * ssig2 - ssig1 * csig2) + 0.0, csig1 * csig2 + ssig1 * ssig2)
+
+		somg12 = np.maximum(0.0, comg1 * somg2 - somg1 * comg2) + 0.0
+		comg12 = comg1 * comg2 + somg1 * somg2
+		eta = np.arctan2(somg12 * clam120 - comg12 * slam120, comg12 * clam120 + somg12 * slam120)
+
+		k2 = calp0**2 * self.ep2
+		eps = k2 / (2.0 * (1.0 + np.sqrt(1.0 + k2)) + k2)
+		c3 = self._c3f(eps)
+		b312 = _sin_cos_series(ssig2, csig2, c3) - _sin_cos_series(ssig1, csig1, c3)
+		lam12 = eta - self.f * self._a3f(eps) * salp0 * (sig12 + b312)
+
+		dlam12 = None
+		if diffp :
+			s12b, m12b = self._lengths(eps, sig12, ssig1, csig1, dn1, ssig2, csig2, dn2)
+			dlam12 = np.where(calp2 == 0.0, -2.0 * self.f1 * dn1 / sbet1, m12b * self.f1 / (calp2 * cbet2))
+
+		return lam12, dlam12, (salp2, calp2, sig12, ssig1, csig1, ssig2, csig2, eps)
+
+	def _inverse_start(self, sbet1, cbet1, sbet2, cbet2, lam12, slam12, clam12) :
+		"""
+		first estimate of the azimuth alp1, from the sphere or from the astroid for the nearly antipodal pairs;
+		sig12 is positive where the short line estimate is already accurate, salp2 and calp2 are set there
+		"""
+		sbet12 = sbet2 * cbet1 - cbet2 * sbet1
+		cbet12 = cbet2 * cbet1 + sbet2 * sbet1
+		sbet12a = sbet2 * cbet1 + cbet2 * sbet1
+
+		is_short = (cbet12 >= 0.0) & (sbet12 < 0.5) & (cbet2 * lam12 < 0.5)
+		sbetm2 = (sbet1 + sbet2)**2
+		sbetm2 = sbetm2 / (sbetm2 + (cbet1 + cbet2)**2)
+		dnm = np.sqrt(1.0 + self.ep2 * sbetm2)
+		omg12 = lam12 / (self.f1 * dnm)
+		somg12 = np.where(is_short, np.sin(omg12), slam12)
+		comg12 = np.where(is_short, np.cos(omg12), clam12)
+
+		salp1 = cbet2 * somg12
+		calp1 = np.where(
+			comg12 >= 0.0,
+			sbet12 + cbet2 * sbet1 * somg12**2 / (1.0 + comg12),
+			sbet12a - cbet2 * sbet1 * somg12**2 / (1.0 - comg12)
+		)
+
+		ssig12 = np.hypot(salp1, calp1)
+		csig12 = sbet1 * sbet2 + cbet1 * cbet2 * comg12
+
+		is_done = is_short & (ssig12 < self.etol2)
+		salp2, calp2 = _norm2(
+			cbet1 * somg12,
+			sbet12 - cbet1 * sbet2 * np.where(comg12 >= 0.0, somg12**2 / (1.0 + comg12), 1.0 - comg12)
+		)
+		sig12 = np.where(is_done, np.arctan2(ssig12, csig12), -1.0)
+
+		is_astroid = ~is_done & ~(
+			(abs(self.n) >= 0.1) | (csig12 >= 0.0) | (ssig12 >= 6.0 * abs(self.n) * math.pi * cbet1**2)
+		)
+		if is_astroid.any() :
+			i = np.flatnonzero(is_astroid)
+			lam12x = np.arctan2(-slam12[i], -clam12[i])
+			k2 = sbet1[i]**2 * self.ep2
+			eps = k2 / (2.0 * (1.0 + np.sqrt(1.0 + k2)) + k2)
+			lamscale = self.f * cbet1[i] * self._a3f(eps) * math.pi
+			betscale = lamscale * cbet1[i]
+			x = lam12x / lamscale
+			y = sbet12a[i] / betscale
+
+			is_near = (y > -_tol1) & (x > -1.0 - _xthresh)
+			s_near = np.minimum(1.0, -x)
+			c_near = -np.sqrt(1.0 - s_near**2)
+
+			k = _astroid(x, y)
+			omg12a = lamscale * (-x * k / (1.0 + k))
+			somg12, comg12 = np.sin(omg12a), -np.cos(omg12a)
+			s_far = cbet2[i] * somg12
+			c_far = sbet12a[i] - cbet2[i] * sbet1[i] * somg12**2 / (1.0 - comg12)
+
+			salp1[i] = np.where(is_near, s_near, s_far)
+			calp1[i] = np.where(is_near, c_near, c_far)
+
+		# sanity check on the starting guess, the backward test lets the nan through
+		is_valid = ~(salp1 <= 0.0)
+		s, c = _norm2(salp1, calp1)
+		return sig12, np.where(is_valid, s, 1.0), np.where(is_valid, c, 0.0), salp2, calp2, dnm
+
+	def _newton(self, sbet1, cbet1, dn1, sbet2, cbet2, dn2, salp1, calp1, slam12, clam12) :
+		"""
+		solve lambda12(alp1) = 0, the pairs leave the iteration as soon as they converge;
+		each one keeps a bracket [alp1a ; alp1b] of the root, a Newton step which leaves it is replaced by a bisection
+		"""
+		n = len(sbet1)
+		salp1a, calp1a = np.full(n, _tiny), np.ones(n)
+		salp1b, calp1b = np.full(n, _tiny), -np.ones(n)
+		tripn = np.zeros(n, dtype=bool)
+		tripb = np.zeros(n, dtype=bool)
+		state = np.empty((8, n), dtype=np.float64) # salp2, calp2, sig12, ssig1, csig1, ssig2, csig2, eps
+
+		act = np.arange(n)
+		for numit in range(_maxit2 + 1) :
+			v, dv, res = self._lambda12(
+				sbet1[act], cbet1[act], dn1[act], sbet2[act], cbet2[act], dn2[act],
+				salp1[act], calp1[act], slam12[act], clam12[act], numit < _maxit1
+			)
+			state[:, act] = res
+
+			keep = ~(tripb[act] | ~(np.abs(v) >= np.where(tripn[act], 8.0, 1.0) * _tol0))
+			if numit == _maxit2 or not keep.any() :
+				break
+			act, v = act[keep], v[keep]
+
+			s, c = salp1[act], calp1[act]
+			late = numit > _maxit1
+			up = (v > 0.0) & (late | (c / s > calp1b[act] / salp1b[act]))
+			lo = (v < 0.0) & (late | (c / s < calp1a[act] / salp1a[act]))
+			salp1b[act] = np.where(up, s, salp1b[act])
+			calp1b[act] = np.where(up, c, calp1b[act])
+			salp1a[act] = np.where(lo, s, salp1a[act])
+			calp1a[act] = np.where(lo, c, calp1a[act])
+
+			is_newton = np.zeros(len(act), dtype=bool)
+			if numit + 1 < _maxit1 :
+				dv = dv[keep]
+				dalp1 = -v / dv
+				sd, cd = np.sin(dalp1), np.cos(dalp1)
+				ns = s * cd + c * sd
+				is_newton = (dv > 0.0) & (np.abs(dalp1) < math.pi) & (ns > 0.0)
+				ns, nc = _norm2(ns, c * cd - s * sd)
+
+			ms, mc = _norm2((salp1a[act] + salp1b[act]) / 2.0, (calp1a[act] + calp1b[act]) / 2.0)
+			if is_newton.any() :
+				ms, mc = np.where(is_newton, ns, ms), np.where(is_newton, nc, mc)
+
+			tripn[act] = is_newton & (np.abs(v) <= 16.0 * _tol0)
+			tripb[act] = ~is_newton & (
+				(np.abs(salp1a[act] - ms) + (calp1a[act] - mc) < _tolb) |
+				(np.abs(ms - salp1b[act]) + (mc - calp1b[act]) < _tolb)
+			)
+			salp1[act], calp1[act] = ms, mc
+
+		salp2, calp2, sig12, ssig1, csig1, ssig2, csig2, eps = state
+		s12b, m12b = self._lengths(eps, sig12, ssig1, csig1, dn1, ssig2, csig2, dn2)
+		return s12b * self.b, salp1, calp1, salp2, calp2
+
+	def _inverse(self, lat1, lon1, lat2, lon2) :
+		""" the inverse problem on flat arrays """
+		n = len(lat1)
+
+		lon12, lon12s = _ang_diff(lon1, lon2)
+		lonsign = np.copysign(1.0, lon12)
+		lon12, lon12s = lonsign * lon12, lonsign * lon12s
+		lam12 = np.radians(lon12)
+		slam12, clam12 = _sincosd(lon12, lon12s)
+		lon12s = (180.0 - lon12) - lon12s
+
+		# swap the points so that |lat1| >= |lat2|, then change the signs so that lat1 <= 0
+		lat1, lat2 = _ang_round(_lat_fix(lat1)), _ang_round(_lat_fix(lat2))
+		swapp = np.where((np.abs(lat1) < np.abs(lat2)) | np.isnan(lat2), -1.0, 1.0)
+		lonsign = lonsign * swapp
+		lat1, lat2 = np.where(swapp < 0.0, lat2, lat1), np.where(swapp < 0.0, lat1, lat2)
+		latsign = np.copysign(1.0, -lat1)
+		lat1, lat2 = lat1 * latsign, lat2 * latsign
+
+		sbet1, cbet1 = self._reduced(lat1)
+		sbet2, cbet2 = self._reduced(lat2)
+		# make the symmetric cases exactly symmetric
+		is_south = cbet1 < -sbet1
+		sbet2 = np.where(is_south & (cbet2 == cbet1), np.copysign(sbet1, sbet2), sbet2)
+		cbet2 = np.where(~is_south & (np.abs(sbet2) == -sbet1), cbet1, cbet2)
+
+		dn1 = np.sqrt(1.0 + self.ep2 * sbet1**2)
+		dn2 = np.sqrt(1.0 + self.ep2 * sbet2**2)
+
+		s12 = np.full(n, np.nan)
+		salp1, calp1 = np.full(n, np.nan), np.full(n, np.nan)
+		salp2, calp2 = np.full(n, np.nan), np.full(n, np.nan)
+
+		# along a meridian, as long as it is the shortest path
+		is_meridian = (lat1 == -90.0) | (slam12 == 0.0)
+		if is_meridian.any() :
+			i = np.flatnonzero(is_meridian)
+			ssig1, csig1 = sbet1[i], clam12[i] * cbet1[i]
+			ssig2, csig2 = sbet2[i], cbet2[i]
+			sig12 = np.arctan2(np.maximum(0.0, csig1 * ssig2 - ssig1 * csig2) + 0.0, csig1 * csig2 + ssig1 * ssig2)
+			s12x, m12x = self._lengths(self.n, sig12, ssig1, csig1, dn1[i], ssig2, csig2, dn2[i])
+			is_zero = (sig12 < 3.0 * _tiny) | ((sig12 < _tol0) & ((s12x < 0.0) | (m12x < 0.0)))
+			s12x = np.where(is_zero, 0.0, s12x)
+
+			is_ok = (sig12 < _tol2) | (m12x >= 0.0)
+			is_meridian[i[~is_ok]] = False
+			i = i[is_ok]
+			s12[i] = s12x[is_ok] * self.b
+			salp1[i], calp1[i] = slam12[i], clam12[i]
+			salp2[i], calp2[i] = 0.0, 1.0
+
+		# along the equator
+		is_equator = ~is_meridian & (sbet1 == 0.0) & ((self.f <= 0.0) | (lon12s >= self.f * 180.0))
+		s12[is_equator] = self.a * lam12[is_equator]
+		salp1[is_equator], calp1[is_equator] = 1.0, 0.0
+		salp2[is_equator], calp2[is_equator] = 1.0, 0.0
+
+		# the general case
+		i = np.flatnonzero(~is_meridian & ~is_equator)
+		if len(i) :
+			sig12, s1, c1, s2, c2, dnm = self._inverse_start(
+				sbet1[i], cbet1[i], sbet2[i], cbet2[i], lam12[i], slam12[i], clam12[i]
+			)
+			is_done = sig12 >= 0.0
+			j = i[is_done]
+			s12[j] = sig12[is_done] * self.b * dnm[is_done]
+			salp1[j], calp1[j], salp2[j], calp2[j] = s1[is_done], c1[is_done], s2[is_done], c2[is_done]
+
+			k = ~is_done
+			j = i[k]
+			s12[j], salp1[j], calp1[j], salp2[j], calp2[j] = self._newton(
+				sbet1[j], cbet1[j], dn1[j], sbet2[j], cbet2[j], dn2[j],
+				s1[k], c1[k], slam12[j], clam12[j]
+			)
+
+		s12 = 0.0 + s12
+
+		# back to the original order and signs
+		salp1, salp2 = np.where(swapp < 0.0, salp2, salp1), np.where(swapp < 0.0, salp1, salp2)
+		calp1, calp2 = np.where(swapp < 0.0, calp2, calp1), np.where(swapp < 0.0, calp1, calp2)
+		salp1, salp2 = salp1 * swapp * lonsign, salp2 * swapp * lonsign
+		calp1, calp2 = calp1 * swapp * latsign, calp2 * swapp * latsign
+
+		return s12, _atan2d(salp1, calp1), _atan2d(salp2, calp2)
+
+	def _direct(self, lat1, lon1, azi1, s12) :
+		""" the direct problem on flat arrays """
+		salp1, calp1 = _sincosd(_ang_round(_ang_normalize(azi1)))
+		sbet1, cbet1 = self._reduced(_ang_round(_lat_fix(lat1)))
+
+		salp0 = salp1 * cbet1
+		calp0 = np.hypot(calp1, salp1 * sbet1)
+
+		somg1 = salp0 * sbet1
+		csig1 = comg1 = np.where((sbet1 != 0.0) | (calp1 != 0.0), calp1 * cbet1, 1.0)
+		ssig1, csig1 = _norm2(sbet1, csig1)
+
+		k2 = calp0**2 * self.ep2
+		eps = k2 / (2.0 * (1.0 + np.sqrt(1.0 + k2)) + k2)
+
+		a1m1 = _a1m1f(eps)
+		c1 = _series(_c1, eps)
+		c1p = _series(_c1p, eps)
+		b11 = _sin_cos_series(ssig1, csig1, c1)
+		s, c = np.sin(b11), np.cos(b11)
+		stau1 = ssig1 * c + csig1 * s
+		ctau1 = csig1 * c - ssig1 * s
+
+		c3 = self._c3f(eps)
+		a3c = -self.f * salp0 * self._a3f(eps)
+		b31 = _sin_cos_series(ssig1, csig1, c3)
+
+		# invert the distance series with C1'
+		tau12 = s12 / (self.b * (1.0 + a1m1))
+		s, c = np.sin(tau12), np.cos(tau12)
+		b12 = -_sin_cos_series(stau1 * c + ctau1 * s, ctau1 * c - stau1 * s, c1p)
+		sig12 = tau12 - (b12 - b11)
+		ssig12, csig12 = np.sin(sig12), np.cos(sig12)
+
+		if abs(self.f) > 0.01 :
+			# the series of C1' is not accurate enough, one more Newton step
+			ssig2 = ssig1 * csig12 + csig1 * ssig12
+			csig2 = csig1 * csig12 - ssig1 * ssig12
+			b12 = _sin_cos_series(ssig2, csig2, c1)
+			serr = (1.0 + a1m1) * (sig12 + (b12 - b11)) - s12 / self.b
+			sig12 = sig12 - serr / np.sqrt(1.0 + k2 * ssig2**2)
+			ssig12, csig12 = np.sin(sig12), np.cos(sig12)
+
+		ssig2 = ssig1 * csig12 + csig1 * ssig12
+		csig2 = csig1 * csig12 - ssig1 * ssig12
+		sbet2 = calp0 * ssig2
+		cbet2 = np.hypot(salp0, calp0 * csig2)
+		is_pole = (cbet2 == 0.0)
+		cbet2 = np.where(is_pole, _tiny, cbet2)
+		csig2 = np.where(is_pole, _tiny, csig2)
+
+		somg2, comg2 = salp0 * ssig2, csig2
+		omg12 = np.arctan2(somg2 * comg1 - comg2 * somg1, comg2 * comg1 + somg2 * somg1)
+		lam12 = omg12 + a3c * (sig12 + (_sin_cos_series(ssig2, csig2, c3) - b31))
+
+		lon2 = _ang_normalize(_ang_normalize(lon1) + _ang_normalize(np.degrees(lam12)))
+		return _atan2d(sbet2, self.f1 * cbet2), lon2, _atan2d(salp0, calp0 * csig2)
+
+	def _chunked(self, solve, arg_lst, chunk_size) :
+		arg_lst = np.broadcast_arrays(*[np.asarray(a, dtype=np.float64) for a in arg_lst])
+		shape = arg_lst[0].shape
+		arg_lst = [a.ravel() for a in arg_lst]
+		n = arg_lst[0].size
+
+		res = np.empty((3, n), dtype=np.float64)
+		with np.errstate(invalid='ignore', divide='ignore') :
+			for start in range(0, n, chunk_size) :
+				stop = min(start + chunk_size, n)
+				res[:, start:stop] = solve(* [a[start:stop] for a in arg_lst])
+		return tuple(r.reshape(shape) for r in res)
+
+	def inverse(self, lat1, lon1, lat2, lon2, chunk_size=65536) :
+		"""
+		shortest geodesic between the points 1 and 2, the arguments are broadcast together
+		return the distance s12 and the azimuths azi1 and azi2 (forward, at each point)
+		"""
+		return self._chunked(self._inverse, (lat1, lon1, lat2, lon2), chunk_size)
+
+	def direct(self, lat1, lon1, azi1, s12, chunk_size=65536) :
+		"""
+		point reached from the point 1 along the geodesic of azimuth azi1 after a distance s12,
+		the arguments are broadcast together; return lat2, lon2 and the forward azimuth azi2
+		"""
+		return self._chunked(self._direct, (lat1, lon1, azi1, s12), chunk_size)
+
+wgs84 = Geodesic()
+
+def inverse(lat1, lon1, lat2, lon2, chunk_size=65536) :
+	""" see Geodesic.inverse(), on the WGS84 ellipsoid """
+	return wgs84.inverse(lat1, lon1, lat2, lon2, chunk_size)
+
+def direct(lat1, lon1, azi1, s12, chunk_size=65536) :
+	""" see Geodesic.direct(), on the WGS84 ellipsoid """
+	return wgs84.direct(lat1, lon1, azi1, s12, chunk_size)
+
+def vincenty_inverse(lat1, lon1, lat2, lon2, earth=None, max_iter=200) :
+	"""
+	scalar reference: the classic iteration of T. Vincenty (1975), accurate to about 0.1 mm,
+	return (nan, nan, nan) when it does not converge, which happens for nearly antipodal points
+	"""
+	earth = PolarEarthSlice() if earth is None else earth
+	a, f = earth.a, earth.f
+	b = a * (1.0 - f)
+
+	u1 = math.atan((1.0 - f) * math.tan(math.radians(lat1)))
+	u2 = math.atan((1.0 - f) * math.tan(math.radians(lat2)))
+	su1, cu1 = math.sin(u1), math.cos(u1)
+	su2, cu2 = math.sin(u2), math.cos(u2)
+
+	l = math.radians(lon2 - lon1)
+	lam = l
+	for i in range(max_iter) :
+		sl, cl = math.sin(lam), math.cos(lam)
+		ss = math.hypot(cu2 * sl, cu1 * su2 - su1 * cu2 * cl)
+		if ss == 0.0 :
+			return 0.0, 0.0, 0.0
+		cs = su1 * su2 + cu1 * cu2 * cl
+		sigma = math.atan2(ss, cs)
+		sa = cu1 * cu2 * sl / ss
+		c2a = 1.0 - sa * sa
+		c2sm = cs - 2.0 * su1 * su2 / c2a if c2a != 0.0 else 0.0
+		c = f / 16.0 * c2a * (4.0 + f * (4.0 - 3.0 * c2a))
+		prev = lam
+		lam = l + (1.0 - c) * f * sa * (sigma + c * ss * (c2sm + c * cs * (-1.0 + 2.0 * c2sm * c2sm)))
+		if abs(lam - prev) < 1e-12 :
+			break
+	else :
+		return math.nan, math.nan, math.nan
+
+	u2 = c2a * (a * a - b * b) / (b * b)
+	ka = 1.0 + u2 / 16384.0 * (4096.0 + u2 * (-768.0 + u2 * (320.0 - 175.0 * u2)))
+	kb = u2 / 1024.0 * (256.0 + u2 * (-128.0 + u2 * (74.0 - 47.0 * u2)))
+	ds = kb * ss * (c2sm + kb / 4.0 * (cs * (-1.0 + 2.0 * c2sm * c2sm) - kb / 6.0 * c2sm * (-3.0 + 4.0 * ss * ss) * (-3.0 + 4.0 * c2sm * c2sm)))
+	return (
+		b * ka * (sigma - ds),
+		math.degrees(math.atan2(cu2 * sl, cu1 * su2 - su1 * cu2 * cl)),
+		math.degrees(math.atan2(cu1 * sl, -su1 * cu2 + cu1 * su2 * cl))
+	)
+
+if __name__ == '__main__' :
+
+	import time
+
+	rng = np.random.default_rng(0)
+	n = 1000000
+	lat1, lat2 = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, (2, n))))
+	lon1, lon2 = rng.uniform(-180.0, 180.0, (2, n))
+
+	t = time.perf_counter()
+	s12, azi1, azi2 = inverse(lat1, lon1, lat2, lon2)
+	t_inv = time.perf_counter() - t
+
+	t = time.perf_counter()
+	lat3, lon3, azi3 = direct(lat1, lon1, azi1, s12)
+	t_dir = time.perf_counter() - t
+
+	m = 20000
+	t = time.perf_counter()
+	ref = np.array([vincenty_inverse(*p) for p in zip(lat1[:m], lon1[:m], lat2[:m], lon2[:m])])
+	t_ref = time.perf_counter() - t
+
+	print("inverse: {0:10.0f} pairs per second".format(n / t_inv))
+	print("direct:  {0:10.0f} pairs per second".format(n / t_dir))
+	print("scalar Vincenty: {0:10.0f} pairs per second, {1} failures on {2}".format(m / t_ref, np.isnan(ref[:, 0]).sum(), m))
+	print("max difference with Vincenty: {0:.3g} m".format(np.nanmax(np.abs(ref[:, 0] - s12[:m]))))
+	print("round trip: {0:.3g} deg".format(max(np.abs(lat3 - lat2).max(), np.abs(_ang_diff(lon2, lon3)[0]).max())))
+
+	# nearly antipodal points, where Vincenty fails
+	lat1 = rng.uniform(-1.0, 1.0, m)
+	lat2 = -lat1 + rng.uniform(-0.01, 0.01, m)
+	lon2 = 180.0 - rng.uniform(0.0, 0.7, m)
+	s12, azi1, azi2 = inverse(lat1, 0.0, lat2, lon2)
+	lat3, lon3, azi3 = direct(lat1, 0.0, azi1, s12)
+	fail = sum(math.isnan(vincenty_inverse(*p)[0]) for p in zip(lat1, np.zeros(m), lat2, lon2))
+	print("nearly antipodal: Vincenty fails on {0} of {1}, round trip: {2:.3g} deg".format(
+		fail, m, max(np.abs(lat3 - lat2).max(), np.abs(_ang_diff(lon2, lon3)[0]).max())
+	))
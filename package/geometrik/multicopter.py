@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
-from geometry.frame import Frame
-from geometry.quaternion import Quaternion
+import time
+
+import numpy as np
+
+from geometrik.frame import Frame, RigidBodyArray
+from geometrik.quaternion import Quaternion, QuaternionArray
 
 """
 Le point de départ, l'origine est choisie arbitrairement,
@@ -13,49 +17,200 @@ class Propeller(Frame) :
 	def __init__(self, pos_l=None, pos_r=None, reference=None, name=None, is_right=True) :
 		Frame.__init__(self, pos_l, pos_r, reference, name)
 		self.is_right = is_right
-		
+
 class Multicopter() :
-	""" un truc sans surface porteuse """
-	
+	"""
+	un truc sans surface porteuse
+
+	the body frame is x forward, y left, z up (turned by 180° around x from the horizontal NED frame),
+	each propeller pushes along the z axis of its own frame
+	"""
+
 	gravity = 9.807
 	inertial_x = 1.2
-	interial_y = 1.2
-	interi
-	
+	inertial_y = 1.2
+	inertial_z = 2.4 # flat body: the sum of the two others
+
+	torque_ratio = 0.02 # reaction torque of a propeller for one newton of thrust [m]
+	max_thrust = 15.0 # [N]
+
 	def __init__(self, lat, lon, alt) :
 		self.contact_lst = list()
 		self.prop_lst = list()
-		
+
 		self.time = 0.0
 		self.weight = 2.0
-		
+
 		self.local_frame = Frame.init_NorthEastDown(lat, lon, alt)
 		self.horizontal_frame = Frame(ref=self.local_frame)
-		self.body_frame = Frame(ref=self.horizontal_frame)
-		
-	def add_propeller(is_right, pos, ori=None) :
+		self.body_frame = Frame(None, Quaternion.from_axial_rotation(1.0, 0.0, 0.0, 180.0), ref=self.horizontal_frame)
+
+		self._mixer = None
+
+	def add_propeller(self, is_right, pos, ori=None) :
 		if ori is None :
-			ori = geometry.quaternion.identity()
-		self.prop_lst.append(pos, ori, self.body_frame, 'prop_{0}'.format(len(self.prop_lst) + 1))
+			ori = Quaternion.identity()
+		self.prop_lst.append(Propeller(pos, ori, self.body_frame, 'prop_{0}'.format(len(self.prop_lst) + 1), is_right))
 		self.contact_lst.append(pos)
-		
+		self._mixer = None
+
 		#  la poussée est en Z, is_right = True si le sens de rotation est de x vers y
-		
-		
+
+	@property
+	def inertia(self) :
+		return np.diag([self.inertial_x, self.inertial_y, self.inertial_z])
+
+	@property
+	def mixer(self) :
+		"""
+		(6, P) allocation matrix, from the thrust of each propeller [N] to the wrench on the body,
+		force then torque, in the body frame; computed once from the propeller frames
+		"""
+		if self._mixer is None :
+			m = np.zeros((6, len(self.prop_lst)), dtype=np.float64)
+			for i, prop in enumerate(self.prop_lst) :
+				n = np.array(prop.pos_r.rotate_vector(0.0, 0.0, 1.0))
+				r = np.array(prop.pos_l.to_vector(), dtype=np.float64)
+				# a propeller turning from x to y pushes the body the other way round
+				s = -1.0 if prop.is_right else 1.0
+				m[0:3, i] = n
+				m[3:6, i] = np.cross(r, n) + s * self.torque_ratio * n
+			self._mixer = m
+		return self._mixer
+
+
 def setup_hexacopter(lat, lon, alt) :
 	m = Multicopter(lat, lon, alt)
-	
+
 	m.add_propeller(True, Quaternion.from_vector(2.0, 1.0, 0.0))
 	m.add_propeller(False, Quaternion.from_vector(0.0, 2.0, 0.0), Quaternion.from_axial_rotation(1.0, 0.0, 0.0, -15.0))
 	m.add_propeller(True, Quaternion.from_vector(-2.0, 1.0, 0.0))
 	m.add_propeller(False, Quaternion.from_vector(-2.0, -1.0, 0.0))
 	m.add_propeller(True, Quaternion.from_vector(0.0, -2.0, 0.0), Quaternion.from_axial_rotation(1.0, 0.0, 0.0, 15.0))
 	m.add_propeller(False, Quaternion.from_vector(2.0, -1.0, 0.0))
-	
+
 	m.contact_lst.append(Quaternion.from_vector(1.0, 1.0, -1.0))
 	m.contact_lst.append(Quaternion.from_vector(1.0, -1.0, -1.0))
 	m.contact_lst.append(Quaternion.from_vector(-1.0, -1.0, -1.0))
 	m.contact_lst.append(Quaternion.from_vector(-1.0, 1.0, -1.0))
 
-if __name__ == __main__ :
-	u = setup_hexacopter(0.0, 0.0, 0.0)
\ No newline at end of file
+	return m
+
+class MulticopterSimulation() :
+	"""
+	step M multicopters (airframe variants) side by side, in the local NED frame of each one
+
+	the mixer matrices are derived once from the propeller frames and stacked in a (M, 6, P) array,
+	airframes with less propellers are padded with null columns;
+	the contact points are stacked likewise in a (M, C, 3) array, with a mask
+
+	the ground is the plane z = 0 of the local frame, a contact point under it receives a spring-damper
+	normal force and a viscous friction
+	"""
+
+	ground_stiffness = 2000.0 # [N.m-1]
+	ground_damping = 50.0 # [N.s.m-1]
+	ground_friction = 20.0 # [N.s.m-1]
+
+	def __init__(self, multicopter_lst) :
+		self.multicopter_lst = list(multicopter_lst)
+		n = len(self.multicopter_lst)
+
+		p_max = max(len(m.prop_lst) for m in self.multicopter_lst)
+		c_max = max(len(m.contact_lst) for m in self.multicopter_lst)
+
+		self.mixer = np.zeros((n, 6, p_max), dtype=np.float64)
+		self.max_thrust = np.zeros((n, p_max), dtype=np.float64)
+		self.contact = np.zeros((n, c_max, 3), dtype=np.float64)
+		self.contact_mask = np.zeros((n, c_max), dtype=bool)
+		for i, m in enumerate(self.multicopter_lst) :
+			p = len(m.prop_lst)
+			self.mixer[i, :, :p] = m.mixer
+			self.max_thrust[i, :p] = m.max_thrust
+			c = len(m.contact_lst)
+			self.contact[i, :c] = [q.to_vector() for q in m.contact_lst]
+			self.contact_mask[i, :c] = True
+
+		self.body = RigidBodyArray(
+			n,
+			[m.weight for m in self.multicopter_lst],
+			[m.inertia for m in self.multicopter_lst]
+		)
+		# at rest on the ground, upright
+		self.body.rot_0 = QuaternionArray.from_quaternion_lst([m.body_frame.pos_r for m in self.multicopter_lst])
+		self.body.lin_0[:, 2] = -np.max(np.where(self.contact_mask, -self.contact[:, :, 2], -np.inf), axis=1)
+
+		self.gravity = np.array([m.gravity for m in self.multicopter_lst], dtype=np.float64)
+
+		self.thrust = np.zeros((n, p_max), dtype=np.float64)
+		self.throughput = None
+
+	def __len__(self) :
+		return len(self.multicopter_lst)
+
+	def _contact_wrench(self, lin_0, lin_1, m, rot_1) :
+		""" ground reaction, force in the local frame, torque in the body frame, m being the body to local matrices """
+		force = np.zeros_like(lin_0)
+		torque = np.zeros_like(lin_0)
+
+		# the depth alone tells which multicopters touch the ground, the others are skipped
+		depth = lin_0[:, 2, None] + np.matmul(self.contact, m[:, 2, :, None])[:, :, 0]
+		is_in = (depth > 0.0) & self.contact_mask
+		sel = is_in.any(axis=1)
+		if not sel.any() :
+			return force, torque
+
+		m, depth, is_in = m[sel], depth[sel], is_in[sel]
+		r = np.matmul(self.contact[sel], m.transpose(0, 2, 1)) # contact arms, in the local frame
+		w = np.matmul(m, rot_1[sel, :, None])[:, :, 0] # angular rate, in the local frame
+		v = lin_1[sel, None, :] + np.cross(w[:, None, :], r)
+
+		f = np.zeros_like(r)
+		# the ground only pushes
+		f[:, :, 2] = np.where(is_in, np.minimum(-(self.ground_stiffness * depth + self.ground_damping * v[:, :, 2]), 0.0), 0.0)
+		f[:, :, 0:2] = np.where(is_in[:, :, None], -self.ground_friction * v[:, :, 0:2], 0.0)
+
+		force[sel] = f.sum(axis=1)
+		torque[sel] = np.matmul(m.transpose(0, 2, 1), np.cross(r, f).sum(axis=1)[:, :, None])[:, :, 0]
+		return force, torque
+
+	def _wrench(self, t, lin_0, lin_1, rot_0, rot_1) :
+		w = np.matmul(self.mixer, self.thrust[:, :, None])[:, :, 0]
+		m = QuaternionArray(rot_0).to_dcm()
+
+		force = np.matmul(m, w[:, 0:3, None])[:, :, 0]
+		force[:, 2] += self.body.lin_mass * self.gravity
+		torque = w[:, 3:6]
+
+		f, t = self._contact_wrench(lin_0, lin_1, m, rot_1)
+		return force + f, torque + t
+
+	def step(self, dt, thrust=None, method='rk4') :
+		""" advance all the multicopters by dt, thrust is a (M, P) array of commands, clipped to the limits of each propeller """
+		if thrust is not None :
+			self.thrust = np.clip(thrust, 0.0, self.max_thrust)
+		self.body.step(dt, self._wrench, method)
+
+	def run(self, duration, dt, command=None, method='rk4') :
+		"""
+		advance all the multicopters by duration, with a fixed step dt
+		command(simulation) returns the (M, P) thrust commands, it is called once per step
+		return the throughput, in simulated seconds (summed over all the multicopters) per wall second
+		"""
+		stop = self.body.time + duration
+		t0 = time.perf_counter()
+		while self.body.time < stop :
+			self.step(min(dt, stop - self.body.time), None if command is None else command(self), method)
+		self.throughput = len(self) * duration / (time.perf_counter() - t0)
+		return self.throughput
+
+if __name__ == '__main__' :
+	u = setup_hexacopter(0.0, 0.0, 0.0)
+
+	n = 1000
+	sim = MulticopterSimulation([u] * n)
+	hover = np.linalg.lstsq(u.mixer[[2, 3, 4, 5]], [u.weight * u.gravity, 0.0, 0.0, 0.0], rcond=None)[0]
+	rng = np.random.default_rng(0)
+	gain = rng.uniform(1.0, 1.2, (n, 1))
+	print("throughput: {0:.0f} simulated seconds per second".format(sim.run(2.0, 0.002, lambda s : gain * hover)))
+	print("altitude (min, max):", -sim.body.lin_0[:, 2].max(), -sim.body.lin_0[:, 2].min())
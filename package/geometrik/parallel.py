@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""
+parallel execution of the batched operations (containment, geodesics, frame transforms, ...) over a pool of processes
+
+the input and output arrays are placed in shared memory blocks, the workers attach to them by name and each one
+reads and writes its own rows in place, so that no array is pickled; the prepared objects (polygons, indexes,
+transforms) are given once in a context, sent to each worker when it starts, and referred to by their name
+
+the rows are split in contiguous chunks and each result is written at the position of its rows, so that the
+output is in the order of the input whatever the order in which the chunks are done
+
+	with ParallelExecutor(8, zone=SphericalPolygon.from_latlon(lat_lst, lon_lst)) as ex :
+		is_in = ex.map('zone.is_inside', p) # p is a (N, 3) array of unit vectors
+"""
+
+import concurrent.futures
+import math
+import os
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_context = dict() # the prepared objects, in each worker
+
+def _init_worker(context) :
+	_context.clear()
+	_context.update(context)
+
+def _resolve(func, context) :
+	""" func itself, or the attribute 'name.method' of the object name of the context """
+	if not isinstance(func, str) :
+		return func
+	name, * attr_lst = func.split('.')
+	f = context[name]
+	for attr in attr_lst :
+		f = getattr(f, attr)
+	return f
+
+class SharedArray() :
+	""" a numpy array in a shared memory block, which the workers attach to by its name """
+
+	def __init__(self, shape, dtype=np.float64) :
+		self.shape = tuple(int(i) for i in shape)
+		self.dtype = np.dtype(dtype)
+		size = math.prod(self.shape) * self.dtype.itemsize
+		self._shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+		self.value = np.ndarray(self.shape, self.dtype, buffer=self._shm.buf)
+
+	@staticmethod
+	def from_array(a) :
+		a = np.asarray(a)
+		s = SharedArray(a.shape, a.dtype)
+		s.value[...] = a
+		return s
+
+	@property
+	def descriptor(self) :
+		""" what a worker needs to attach to the block, small enough to be pickled with each task """
+		return self._shm.name, self.shape, self.dtype.str
+
+	def __len__(self) :
+		return self.shape[0]
+
+	def __getitem__(self, i) :
+		return self.value[i]
+
+	def close(self) :
+		""" release the block, the array must not be used anymore """
+		self.value = None
+		self._shm.close()
+		self._shm.unlink()
+
+	def __enter__(self) :
+		return self
+
+	def __exit__(self, * exc) :
+		self.close()
+
+def _run(func, in_lst, out, start, stop, kwargs) :
+	""" in a worker: func over the rows [start ; stop[ of the shared inputs, written in the shared output """
+	shm_lst = [shared_memory.SharedMemory(name=d[0]) for d in in_lst + [out]]
+	a_lst = None
+	try :
+		a_lst = [np.ndarray(d[1], d[2], buffer=s.buf)[start:stop] for d, s in zip(in_lst + [out], shm_lst)]
+		a_lst[-1][...] = _resolve(func, _context)(* a_lst[:-1], ** kwargs)
+	finally :
+		a_lst = None # the views must be gone before the blocks are closed
+		for s in shm_lst :
+			s.close()
+	return stop - start
+
+class ParallelExecutor() :
+
+	def __init__(self, workers=None, mp_context=None, ** context) :
+		"""
+		workers is the number of processes (all the cores by default), with workers=1 the work is done in this
+		process, without pool nor shared memory; context holds the prepared objects, sent once to each worker
+		"""
+		self.workers = os.cpu_count() if workers is None else int(workers)
+		self.mp_context = mp_context
+		self.context = context
+		self._pool = None
+
+	@property
+	def pool(self) :
+		if self._pool is None :
+			self._pool = concurrent.futures.ProcessPoolExecutor(
+				self.workers, mp_context=self.mp_context, initializer=_init_worker, initargs=(self.context,)
+			)
+		return self._pool
+
+	def shutdown(self) :
+		if self._pool is not None :
+			self._pool.shutdown()
+			self._pool = None
+
+	def __enter__(self) :
+		return self
+
+	def __exit__(self, * exc) :
+		self.shutdown()
+
+	def map(self, func, * arrays, out=None, chunk_size=None, ** kwargs) :
+		"""
+		func(* chunks, ** kwargs) over the rows of arrays (all of the same length N), which must return one row
+		of output per row of input; func is a function defined at the top level of a module (so that it can be
+		sent to the workers) or the name 'name.method' of a method of an object of the context
+
+		arrays are numpy arrays (copied once into shared memory) or SharedArray (used in place, to share an input
+		between several calls); out is a SharedArray of N rows to write into, else the shape and type of the
+		output are found by a call on the first row, and a new array is returned
+		"""
+		if not arrays :
+			raise ValueError("at least one input array is needed")
+		n = len(arrays[0])
+		if any(len(a) != n for a in arrays) :
+			raise ValueError("all the inputs must have the same number of rows")
+
+		if out is None :
+			probe = np.asarray(_resolve(func, self.context)(* [a[:1] for a in arrays], ** kwargs))
+			shape, dtype = (n,) + probe.shape[1:], probe.dtype
+		elif len(out) != n :
+			raise ValueError("the output must have one row per input row")
+
+		if self.workers <= 1 :
+			res = np.empty(shape, dtype) if out is None else out.value
+			f = _resolve(func, self.context)
+			step = n if chunk_size is None else chunk_size
+			for start in range(0, n, max(1, step)) :
+				res[start:start + step] = f(* [np.asarray(a[start:start + step]) for a in arrays], ** kwargs)
+			return res
+
+		tmp_lst = list()
+		try :
+			in_lst = list()
+			for a in arrays :
+				if not isinstance(a, SharedArray) :
+					a = SharedArray.from_array(np.ascontiguousarray(a))
+					tmp_lst.append(a)
+				in_lst.append(a.descriptor)
+			if out is None :
+				res = SharedArray(shape, dtype)
+				tmp_lst.append(res)
+			else :
+				res = out
+
+			# a few chunks per worker, so that the faster ones take over the slower ones
+			step = max(1, math.ceil(n / (4 * self.workers))) if chunk_size is None else max(1, chunk_size)
+			future_lst = [
+				self.pool.submit(_run, func, in_lst, res.descriptor, start, min(n, start + step), kwargs)
+				for start in range(0, n, step)
+			]
+			try :
+				for f in future_lst :
+					f.result()
+			except BaseException :
+				# the chunks still queued are dropped, the running ones must end before their blocks are released
+				for f in future_lst :
+					f.cancel()
+				concurrent.futures.wait(future_lst)
+				raise
+			return res.value.copy() if out is None else out.value
+		finally :
+			for a in tmp_lst :
+				a.close()
+
+if __name__ == '__main__' :
+
+	import time
+
+	from geometrik.frame import wgs84_to_cartesian_array
+	from geometrik.threed.polygon import SphericalPolygon
+
+	rng = np.random.default_rng(0)
+
+	zone = SphericalPolygon.from_latlon(
+		[44.1, 44.1, 43.9138888888889, 43.8166666666667, 43.8055555555556, 43.8166666666667],
+		[4.75833333333333, 4.96305555555556, 4.99305555555556, 4.975, 4.84166666666667, 4.78055555555556],
+		use_cap=False
+	)
+
+	n = 4000000
+	lat = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+	lon = rng.uniform(-180.0, 180.0, n)
+	llh = np.column_stack([lat, lon, np.zeros(n)])
+	xyz = wgs84_to_cartesian_array(llh)
+	p = xyz / np.linalg.norm(xyz, axis=1)[:, None]
+
+	print("{0} cores".format(os.cpu_count()))
+	reference = None
+	worker_lst = sorted(set([1, 2, 4, os.cpu_count()]))
+	for workers in worker_lst :
+		with ParallelExecutor(workers, zone=zone) as ex :
+			ex.map('zone.is_inside', p[:1000]) # start the pool
+			t = time.perf_counter()
+			is_in = ex.map('zone.is_inside', p)
+			t_in = time.perf_counter() - t
+			t = time.perf_counter()
+			ecef = ex.map(wgs84_to_cartesian_array, llh)
+			t_ecef = time.perf_counter() - t
+		if reference is None :
+			reference = (t_in, t_ecef, is_in, ecef)
+		assert (is_in == reference[2]).all() and (ecef == reference[3]).all()
+		print("{0:3d} workers: containment {1:10.0f} points per second (x{2:.2f}), geodetic to ecef {3:10.0f} per second (x{4:.2f})".format(
+			workers, n / t_in, reference[0] / t_in, n / t_ecef, reference[1] / t_ecef
+		))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+"""
+chunked streaming of coordinates: from a file of latitude, longitude and altitude, through the earth centered
+frame and a local frame, to 2D points tested against polygons, without ever holding the whole input
+
+a Pipeline pulls chunks from its source only when its consumer asks for the next one (it is a chain of
+generators), so that at most one chunk per stage is alive and the memory does not depend on the size of the input;
+each chunk is a (index, value) pair, index being the row numbers of value in the input, so that the rows kept by a
+filter can be traced back; rebatch() regroups the chunks thinned by a filter to a steady size for the next stages
+
+	Pipeline.from_csv("fix.csv", usecols=(1, 2, 3)).to_ecef().to_frame(earth, ned).project().inside(zone).collect()
+"""
+
+import collections
+import itertools
+import pathlib
+
+import numpy as np
+
+from geometrik.frame import Frame, wgs84_to_cartesian_array, rigid_transform
+from geometrik.twod import Polygon
+from geometrik.twod.clip import as_buffer, is_inside
+
+Chunk = collections.namedtuple('Chunk', ['index', 'value'])
+
+def rows_for(memory, n_column, dtype=np.float64) :
+	""" number of rows of n_column values which fit in memory [bytes], to size the chunks from a budget """
+	return max(1, int(memory) // (n_column * np.dtype(dtype).itemsize))
+
+def read_array(a, chunk_size=1 << 16) :
+	""" chunks of an array (which can be memory-mapped), as float64 """
+	for start in range(0, len(a), chunk_size) :
+		value = np.asarray(a[start:start + chunk_size], dtype=np.float64)
+		yield Chunk(np.arange(start, start + len(value)), value)
+
+def read_csv(pth, usecols=(0, 1, 2), delimiter=',', skiprows=0, chunk_size=1 << 16) :
+	""" chunks of the columns usecols of a text file, read lazily chunk_size lines at a time """
+	with open(pth, 'r') as fid :
+		for line in itertools.islice(fid, skiprows) :
+			pass
+		start = 0
+		while True :
+			line_lst = list(itertools.islice(fid, chunk_size))
+			if not line_lst :
+				break
+			value = np.loadtxt(line_lst, delimiter=delimiter, usecols=usecols, dtype=np.float64, ndmin=2)
+			yield Chunk(np.arange(start, start + len(value)), value)
+			start += len(value)
+
+def read_binary(pth, n_column=3, dtype='<f8', offset=0, chunk_size=1 << 16) :
+	""" chunks of a raw binary file of n_column values per row (or of a .npy file), memory-mapped """
+	pth = pathlib.Path(pth)
+	if pth.suffix == '.npy' :
+		a = np.load(pth, mmap_mode='r')
+	else :
+		a = np.memmap(pth, dtype=dtype, mode='r', offset=offset)
+		a = a[:len(a) - len(a) % n_column].reshape(-1, n_column)
+	return read_array(a, chunk_size)
+
+class Pipeline() :
+
+	def __init__(self, source, * arg, ** opt) :
+		"""
+		source is a function which returns an iterable of Chunk, see read_array(), read_csv() and read_binary(),
+		it is called with arg and opt each time the pipeline is run, so that it can be run several times;
+		source can also be an iterable of Chunk, a generator can then only be run once
+		"""
+		self.source = source
+		self.arg = arg
+		self.opt = opt
+		self.stage_lst = list()
+		self._is_started = False
+
+	@staticmethod
+	def from_array(a, ** opt) :
+		return Pipeline(read_array, a, ** opt)
+
+	@staticmethod
+	def from_csv(pth, ** opt) :
+		return Pipeline(read_csv, pth, ** opt)
+
+	@staticmethod
+	def from_binary(pth, ** opt) :
+		return Pipeline(read_binary, pth, ** opt)
+
+	def map(self, func) :
+		""" value -> func(value), func keeps the number of rows """
+		self.stage_lst.append(lambda chunk_iter : (Chunk(c.index, func(c.value)) for c in chunk_iter))
+		return self
+
+	def filter(self, func) :
+		""" keep the rows for which the (n,) boolean array func(value) is True """
+		def stage(chunk_iter) :
+			for c in chunk_iter :
+				is_kept = func(c.value)
+				if is_kept.any() :
+					yield Chunk(c.index[is_kept], c.value[is_kept])
+		self.stage_lst.append(stage)
+		return self
+
+	def rebatch(self, chunk_size) :
+		""" regroup the chunks so that they hold chunk_size rows (except the last one) """
+		def stage(chunk_iter) :
+			pending, n = list(), 0
+			for c in chunk_iter :
+				pending.append(c)
+				n += len(c.index)
+				while chunk_size <= n :
+					index = np.concatenate([p.index for p in pending])
+					value = np.concatenate([p.value for p in pending])
+					yield Chunk(index[:chunk_size], value[:chunk_size])
+					pending, n = [Chunk(index[chunk_size:], value[chunk_size:])], n - chunk_size
+			if n :
+				yield Chunk(np.concatenate([p.index for p in pending]), np.concatenate([p.value for p in pending]))
+		self.stage_lst.append(stage)
+		return self
+
+	def to_ecef(self) :
+		""" latitude, longitude [deg] and altitude [m] -> earth centered x, y, z [m] """
+		return self.map(wgs84_to_cartesian_array)
+
+	def to_frame(self, source, target) :
+		""" points given in the frame source, expressed in the frame target; the transform is composed once """
+		m, t = rigid_transform(source, target)
+		mt = m.T.copy()
+		return self.map(lambda value : value @ mt + t)
+
+	def to_local(self, lat, lon, alt, name="NED") :
+		""" earth centered points expressed in the North-East-Down (or East-North-Up) frame at lat, lon, alt """
+		target = Frame.init_NorthEastDown(lat, lon, alt) if name == "NED" else Frame.init_EastNorthUp(lat, lon, alt)
+		return self.to_frame(Frame(), target)
+
+	def project(self, axes=(1, 0)) :
+		""" keep two of the coordinates as 2D points, by default y, x: east, north in a NED frame """
+		axes = list(axes)
+		return self.map(lambda value : value[:, axes])
+
+	def inside(self, polygon) :
+		"""
+		keep the 2D points inside polygon: a twod.Polygon, a sequence of them (a polygon with holes, by the even-odd
+		rule) or a ragged buffer (xy, offsets) of geometrik.twod.clip
+		"""
+		if isinstance(polygon, Polygon) :
+			polygon = [polygon]
+		is_buffer = isinstance(polygon, tuple) and len(polygon) == 2 and isinstance(polygon[0], np.ndarray)
+		xy, offsets = polygon if is_buffer else as_buffer(polygon)
+		return self.filter(lambda value : is_inside(value, xy, offsets))
+
+	def __iter__(self) :
+		if callable(self.source) :
+			chunk_iter = iter(self.source(* self.arg, ** self.opt))
+		else :
+			chunk_iter = iter(self.source)
+			if chunk_iter is self.source and self._is_started :
+				raise ValueError("the source of this pipeline is an iterator which was already consumed, give a function instead")
+			self._is_started = True
+		for stage in self.stage_lst :
+			chunk_iter = stage(chunk_iter)
+		return chunk_iter
+
+	def collect(self) :
+		""" all the rows left, as (index, value), for an output which fits in memory """
+		chunk_lst = list(self)
+		if not chunk_lst :
+			return np.zeros(0, dtype=np.int64), None
+		return np.concatenate([c.index for c in chunk_lst]), np.concatenate([c.value for c in chunk_lst])
+
+	def count(self) :
+		return sum(len(c.index) for c in self)
+
+	def write_binary(self, pth) :
+		""" write the rows left as a raw float64 file, readable by read_binary(), return the number of rows """
+		n = 0
+		with open(pth, 'wb') as fid :
+			for c in self :
+				fid.write(np.ascontiguousarray(c.value, dtype='<f8').tobytes())
+				n += len(c.index)
+		return n
+
+if __name__ == '__main__' :
+
+	import tempfile
+	import time
+	import tracemalloc
+
+	from geometrik.twod import Point
+
+	rng = np.random.default_rng(0)
+
+	# GNSS fixes around a reference point, and a zone of about 2 km x 1 km, in meters east and north of it
+	lat0, lon0, alt0 = 43.6, 1.45, 150.0
+	zone = Polygon(Point(-1000.0, -500.0), Point(1000.0, -500.0), Point(1500.0, 500.0), Point(-500.0, 500.0))
+
+	with tempfile.TemporaryDirectory() as tmp :
+		tmp = pathlib.Path(tmp)
+		n = 2000000
+		llh = np.column_stack([
+			lat0 + rng.uniform(-0.05, 0.05, n),
+			lon0 + rng.uniform(-0.05, 0.05, n),
+			alt0 + rng.uniform(-10.0, 10.0, n),
+		])
+		llh.tofile(tmp / 'fix.bin')
+		np.savetxt(tmp / 'fix.csv', llh[:200000], delimiter=',', fmt='%.9f')
+		del llh
+
+		for name, pipeline in [
+			("binary", lambda : Pipeline.from_binary(tmp / 'fix.bin', chunk_size=rows_for(8 << 20, 3))),
+			("csv", lambda : Pipeline.from_csv(tmp / 'fix.csv')),
+		] :
+			tracemalloc.start()
+			t = time.perf_counter()
+			index, value = pipeline().to_ecef().to_local(lat0, lon0, alt0).project().inside(zone).rebatch(1 << 14).collect()
+			t = time.perf_counter() - t
+			peak = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+			print("{0:<6s} {1:9.0f} fixes per second, {2} inside, peak memory {3:.1f} MB".format(
+				name, (n if name == "binary" else 200000) / t, len(index), peak / 1e6
+			))
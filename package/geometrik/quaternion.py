@@ -13,7 +13,13 @@ http://www.camelsoftware.com/2016/02/21/quaternion-formulas/
 import math
 import collections
 
+import numpy as np
+
 class Quaternion() :
+
+	# no __dict__, the control loops create and compose a lot of them
+	__slots__ = ('w', 'x', 'y', 'z', '_is_unit', '_dcm', '_dcm_key')
+
 	def __init__(self, w, x, y, z, is_unit=False) :
 		self.w = w
 		self.x = x
@@ -21,10 +27,13 @@ class Quaternion() :
 		self.z = z
 		
 		self._is_unit = is_unit
+
+		self._dcm = None
+		self._dcm_key = None
 	
 	@staticmethod
 	def identity() :
-		return Quaternion(1.0, 0.0, 0.0, 0.0)
+		return Quaternion(1.0, 0.0, 0.0, 0.0, True)
 		
 	@staticmethod
 	def null() :
@@ -44,10 +53,7 @@ class Quaternion() :
 		yf = yi.rotate(self)
 		zf = zi.rotate(self)
 		
-		print(xf, yf, zf)
-		return
-		
-		return [p for p in list(zip(xf, yf, zf))[1:]]
+		return [p for p in list(zip(xf.value, yf.value, zf.value))[1:]]
 		
 	def rotation_to(self, other) :
 		""" return the quaternion required to pass from self to other """
@@ -77,30 +83,71 @@ class Quaternion() :
 	def to_vector(self) :
 		return self.x, self.y, self.z
 
+	@property
+	def dcm(self) :
+		"""
+		the 3x3 rotation matrix M of the (normalized) quaternion, such that M @ v == q * v * q.conjugate
+		computed on first use and cached until one of the components changes
+		"""
+		key = self.w, self.x, self.y, self.z
+		if self._dcm is None or self._dcm_key != key :
+			n = self._norm_2
+			w, x, y, z = key
+			k = 2.0 / n # same as normalizing first
+			self._dcm = np.array([
+				[ 1.0 - k * ((y * y) + (z * z)), k * ((x * y) - (w * z)), k * ((x * z) + (w * y)) ],
+				[ k * ((x * y) + (w * z)), 1.0 - k * ((x * x) + (z * z)), k * ((y * z) - (w * x)) ],
+				[ k * ((x * z) - (w * y)), k * ((y * z) + (w * x)), 1.0 - k * ((x * x) + (y * y)) ]
+			], dtype=np.float64)
+			self._dcm_key = key
+		return self._dcm
+
+	def rotate_array(self, v) :
+		""" rotate a (N, 3) array of vectors by this attitude, with one matrix product """
+		return np.asarray(v, dtype=np.float64) @ self.dcm.T
+
 	def rotate(self, q) :
+		if q._is_unit :
+			# q * self * q.conjugate, without the two full products
+			tx = 2.0 * (q.y * self.z - q.z * self.y)
+			ty = 2.0 * (q.z * self.x - q.x * self.z)
+			tz = 2.0 * (q.x * self.y - q.y * self.x)
+			return Quaternion(
+				self.w,
+				self.x + q.w * tx + (q.y * tz - q.z * ty),
+				self.y + q.w * ty + (q.z * tx - q.x * tz),
+				self.z + q.w * tz + (q.x * ty - q.y * tx)
+			)
 		return q * self * q.conjugate
 		
 	@staticmethod
 	def from_axial_rotation(x, y, z, alpha, mode='degrees') :
 		"""
-			where x, y, z are the components of the rotation axis
+			where x, y, z are the components of the rotation axis (normalized here)
 			alpha is the amount of rotation in radians
 		"""
 		if mode == 'degrees' :
 			alpha = math.radians(alpha)
+
+		n = math.sqrt((x * x) + (y * y) + (z * z))
+		k = math.sin(alpha / 2.0) / n if n != 0.0 else 0.0
 			
 		return Quaternion(
 			math.cos(alpha / 2.0),
-			x * math.sin(alpha / 2.0),
-			y * math.sin(alpha / 2.0),
-			z * math.sin(alpha / 2.0)
+			x * k,
+			y * k,
+			z * k
 		).normalize()
 		
 	def to_axial_rotation(self, mode='degrees') :
-		r = 2.0 * math.acos(self.w)
+		w = max(-1.0, min(self.w, 1.0))
+		r = 2.0 * math.acos(w)
 		if mode == 'degrees' :
 			r = math.degrees(r)
-		q = math.sqrt(1.0 - (self.w * self.w)) # presque inutile... si le vecteur est normalisé
+		q = math.sqrt(1.0 - (w * w)) # presque inutile... si le vecteur est normalisé
+		if q == 0.0 :
+			# identity: the axis is undefined, x is returned arbitrarily
+			return (1.0, 0.0, 0.0, r)
 		return (
 			self.x / q,
 			self.y / q,
@@ -144,35 +191,41 @@ class Quaternion() :
 
 	def __mul__(self, other) :
 		if isinstance(other, Quaternion) :
-			q = Quaternion(
+			return Quaternion(
 				(self.w * other.w) - (self.x * other.x) - (self.y * other.y) - (self.z * other.z),
 				(self.w * other.x) + (self.x * other.w) + (self.y * other.z) - (self.z * other.y),
 				(self.w * other.y) - (self.x * other.z) + (self.y * other.w) + (self.z * other.x),
 				(self.w * other.z) + (self.x * other.y) - (self.y * other.x) + (self.z * other.w)
-			)
-		else :
-			q = self.__rmul__(other)
-		#print("__mul__({0}, {1}) => {2}".format(self, other, q))
-		return q			
+			) # not flagged as unit: the rounding errors of repeated products must be normalized away
+		return self.__rmul__(other)
 			
 	def __rmul__(self, other) :
-		if isinstance(other, float) or isinstance(other, int) :
-			q = Quaternion(other * self.w, other * self.x, other * self.y, other * self.z)
-		#print("__rmul__({0}, {1}) => {2}".format(self, other, q))
-		return q
+		if isinstance(other, (float, int)) :
+			return Quaternion(other * self.w, other * self.x, other * self.y, other * self.z)
+		return NotImplemented
+
+	def imul(self, other) :
+		""" in place version of self * other (other is a Quaternion), return self """
+		w, x, y, z = self.w, self.x, self.y, self.z
+		self.w = (w * other.w) - (x * other.x) - (y * other.y) - (z * other.z)
+		self.x = (w * other.x) + (x * other.w) + (y * other.z) - (z * other.y)
+		self.y = (w * other.y) - (x * other.z) + (y * other.w) + (z * other.x)
+		self.z = (w * other.z) + (x * other.y) - (y * other.x) + (z * other.w)
+		self._is_unit = False # see __mul__()
+		return self
 			
 	def __truediv__(self, other) :
-		#print("__truediv__({0}, {1})".format(self, other))
-		if isinstance(other, Quaternion) :
+		if isinstance(other, (Quaternion, float, int)) :
 			return self * (1.0 / other)
-		else :
-			return self.__rdiv__(other)
+		return NotImplemented
 			
 	def __rtruediv__(self, other) :
-		#print("__rdiv__({0}, {1})".format(self, other))
-		if isinstance(other, float) or isinstance(other, int) :
-			return self.conjugate  * (other / self._norm_2)
+		if isinstance(other, (float, int)) :
 			# if u is a unit quaternion, then 1.0 / u == u.conjugate
+			if self._is_unit :
+				return self.conjugate * other
+			return self.conjugate  * (other / self._norm_2)
+		return NotImplemented
 			
 	def __add__(self, other) :
 		if isinstance(other, Quaternion) :
@@ -182,13 +235,14 @@ class Quaternion() :
 				self.y + other.y,
 				self.z + other.z
 			)
-		elif isinstance(other, float) or isinstance(other, int) :
+		elif isinstance(other, (float, int)) :
 			return Quaternion(
 				self.w + other,
 				self.x,
 				self.y,
 				self.z
 			)
+		return NotImplemented
 
 	def __sub__(self, other) :
 		if isinstance(other, Quaternion) :
@@ -198,13 +252,14 @@ class Quaternion() :
 				self.y - other.y,
 				self.z - other.z
 			)
-		elif isinstance(other, float) or isinstance(other, int) :
+		elif isinstance(other, (float, int)) :
 			return Quaternion(
 				self.w - other,
 				self.x,
 				self.y,
 				self.z
 			)
+		return NotImplemented
 
 	@property
 	def value(self) :
@@ -212,7 +267,7 @@ class Quaternion() :
 			
 	@property
 	def conjugate(self) :
-		return __class__(self.w, -self.x, -self.y, -self.z)
+		return __class__(self.w, -self.x, -self.y, -self.z, self._is_unit)
 		
 	@property
 	def _norm_2(self) :
@@ -223,26 +278,682 @@ class Quaternion() :
 		return math.sqrt(self._norm_2)
 		
 	def normalize(self) :
+		if self._is_unit :
+			return self
 		n = self.norm
-		return Quaternion(self.w / n, self.x / n, self.y / n, self.z / n, True) if n != 1.0 else self
+		if n == 1.0 :
+			self._is_unit = True
+			return self
+		return Quaternion(self.w / n, self.x / n, self.y / n, self.z / n, True)
+
+	def inormalize(self) :
+		""" in place version of normalize(), return self """
+		if not self._is_unit :
+			n = self.norm
+			self.w, self.x, self.y, self.z = self.w / n, self.x / n, self.y / n, self.z / n
+			self._is_unit = True
+		return self
+
+	def rotate_vector(self, x, y, z) :
+		""" rotate the vector (x, y, z) by q, same as (q * v * q.conjugate).to_vector() for a unit q, without any allocation but the tuple """
+		w, qx, qy, qz = self.w, self.x, self.y, self.z
+		if not self._is_unit :
+			n = self.norm
+			w, qx, qy, qz = w / n, qx / n, qy / n, qz / n
+		tx = 2.0 * (qy * z - qz * y)
+		ty = 2.0 * (qz * x - qx * z)
+		tz = 2.0 * (qx * y - qy * x)
+		return (
+			x + w * tx + (qy * tz - qz * ty),
+			y + w * ty + (qz * tx - qx * tz),
+			z + w * tz + (qx * ty - qy * tx)
+		)
 		
 	def __str__(self) :
 		return ("({0:+.3g} {1:+.3g}i {2:+.3g}j {3:+.3g}k)".format(* self.value))
 		
+def _hamilton(a, b) :
+	""" Hamilton product of two (..., 4) arrays, broadcasted """
+	aw, ax, ay, az = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+	bw, bx, by, bz = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+	return np.stack([
+		(aw * bw) - (ax * bx) - (ay * by) - (az * bz),
+		(aw * bx) + (ax * bw) + (ay * bz) - (az * by),
+		(aw * by) - (ax * bz) + (ay * bw) + (az * bx),
+		(aw * bz) + (ax * by) - (ay * bx) + (az * bw)
+	], axis=-1)
+
+def _rotate_vector(q, v) :
+	""" rotate the (..., 3) vectors v by the (..., 4) unit quaternions q, same as q * v * q.conjugate """
+	qw = q[..., 0:1]
+	qv = q[..., 1:4]
+	t = 2.0 * np.cross(qv, v)
+	return v + qw * t + np.cross(qv, t)
+
+class QuaternionArray() :
+	""" a batch of N quaternions, stored as a (N, 4) array of w, x, y, z """
+
+	def __init__(self, value, is_unit=False) :
+		value = np.asarray(value, dtype=np.float64)
+		if value.ndim != 2 or value.shape[1] != 4 :
+			raise ValueError("a QuaternionArray expects a (N, 4) array, got {0}".format(value.shape))
+		self.value = value
+
+		self._is_unit = is_unit
+
+	@staticmethod
+	def identity(n) :
+		value = np.zeros((n, 4), dtype=np.float64)
+		value[:, 0] = 1.0
+		return QuaternionArray(value, True)
+
+	@staticmethod
+	def null(n) :
+		return QuaternionArray(np.zeros((n, 4), dtype=np.float64))
+
+	@staticmethod
+	def from_vector(v) :
+		""" v is a (N, 3) array of vectors, return them as pure quaternions """
+		v = np.asarray(v, dtype=np.float64)
+		value = np.zeros((v.shape[0], 4), dtype=np.float64)
+		value[:, 1:4] = v
+		return QuaternionArray(value)
+
+	@staticmethod
+	def from_quaternion_lst(q_lst) :
+		return QuaternionArray(
+			np.array([q.value for q in q_lst], dtype=np.float64).reshape(-1, 4),
+			all(q._is_unit for q in q_lst)
+		)
+
+	def to_quaternion_lst(self) :
+		return [Quaternion(* row, is_unit=self._is_unit) for row in self.value.tolist()]
+
+	@property
+	def w(self) :
+		return self.value[:, 0]
+
+	@property
+	def x(self) :
+		return self.value[:, 1]
+
+	@property
+	def y(self) :
+		return self.value[:, 2]
+
+	@property
+	def z(self) :
+		return self.value[:, 3]
+
+	def to_vector(self) :
+		return self.value[:, 1:4]
+
+	def __len__(self) :
+		return self.value.shape[0]
+
+	def __iter__(self) :
+		return (Quaternion(* row, is_unit=self._is_unit) for row in self.value.tolist())
+
+	def __getitem__(self, key) :
+		if isinstance(key, (int, np.integer)) :
+			return Quaternion(* self.value[key].tolist(), is_unit=self._is_unit)
+		return QuaternionArray(self.value[key], self._is_unit)
+
+	@staticmethod
+	def _as_array(other) :
+		""" return other as a (..., 4) array which broadcast against a (N, 4) one, or None """
+		if isinstance(other, QuaternionArray) :
+			return other.value
+		elif isinstance(other, Quaternion) :
+			return np.array(other.value, dtype=np.float64)
+		return None
+
+	def __mul__(self, other) :
+		o = self._as_array(other)
+		if o is not None :
+			return QuaternionArray(_hamilton(self.value, o)) # not flagged as unit, see Quaternion.__mul__()
+		elif isinstance(other, (float, int)) :
+			return QuaternionArray(other * self.value)
+		return NotImplemented
+
+	def __rmul__(self, other) :
+		o = self._as_array(other)
+		if o is not None :
+			return QuaternionArray(_hamilton(o, self.value))
+		elif isinstance(other, (float, int)) :
+			return QuaternionArray(other * self.value)
+		return NotImplemented
+
+	def __add__(self, other) :
+		o = self._as_array(other)
+		if o is not None :
+			return QuaternionArray(self.value + o)
+		return NotImplemented
+
+	__radd__ = __add__
+
+	def __sub__(self, other) :
+		o = self._as_array(other)
+		if o is not None :
+			return QuaternionArray(self.value - o)
+		return NotImplemented
+
+	@property
+	def conjugate(self) :
+		value = self.value * np.array([1.0, -1.0, -1.0, -1.0])
+		return QuaternionArray(value, self._is_unit)
+
+	@property
+	def _norm_2(self) :
+		return np.einsum('ij,ij->i', self.value, self.value)
+
+	@property
+	def norm(self) :
+		if self._is_unit :
+			return np.ones(len(self))
+		return np.sqrt(self._norm_2)
+
+	def normalize(self) :
+		if self._is_unit :
+			return self
+		return QuaternionArray(self.value / self.norm[:, None], True)
+
+	def rotate_vector(self, v) :
+		"""
+		rotate the vectors v (a (N, 3) array, or a single 3-vector broadcasted)
+		by each quaternion, same as q * v * q.conjugate for unit quaternions
+		"""
+		q = self.normalize().value
+		return _rotate_vector(q, np.asarray(v, dtype=np.float64))
+
+	def rotate_vector_dcm(self, v, dcm=None) :
+		"""
+		same as rotate_vector(), through the rotation matrices of to_dcm(),
+		dcm can be given when it was already exported, to skip its computation
+		"""
+		m = self.to_dcm() if dcm is None else dcm
+		return np.einsum('nij,nj->ni', m, np.broadcast_to(np.asarray(v, dtype=np.float64), (len(m), 3)))
+
+	def rotate(self, q) :
+		""" same as Quaternion.rotate, self holds pure quaternions rotated by q (Quaternion or QuaternionArray) """
+		q = q.normalize()
+		r = np.empty(np.broadcast_shapes(self.value.shape, np.shape(q.value)), dtype=np.float64)
+		r[:, 0] = self.value[:, 0]
+		r[:, 1:4] = _rotate_vector(self._as_array(q), self.value[:, 1:4])
+		return QuaternionArray(r)
+
+	@staticmethod
+	def from_euler_rotation(phi, theta, psi, mode='degrees') :
+		"""
+		roll, pitch & yaw as arrays of N angles,
+		same convention as Quaternion.from_euler_rotation
+		"""
+		h = np.array(np.broadcast_arrays(phi, theta, psi), dtype=np.float64).reshape(3, -1)
+		h *= (math.pi / 360.0) if mode == 'degrees' else 0.5
+
+		(rc, pc, yc), (rs, ps, ys) = np.cos(h), np.sin(h)
+
+		ycpc, ysps, ycps, yspc = yc * pc, ys * ps, yc * ps, ys * pc
+
+		value = np.empty((h.shape[1], 4), dtype=np.float64)
+		value[:, 0] = (ycpc * rc) + (ysps * rs)
+		value[:, 1] = (ycpc * rs) - (ysps * rc)
+		value[:, 2] = (ycps * rc) + (yspc * rs)
+		value[:, 3] = (yspc * rc) - (ycps * rs)
+
+		# the product of three unit rotations is a unit quaternion by construction
+		return QuaternionArray(value, True)
+
+	def to_euler(self, mode='degrees', gimbal_tol=1e-9) :
+		"""
+		return three arrays roll, pitch & yaw
+
+		at gimbal lock (pitch = +/-90°) only the difference between roll and yaw is defined,
+		the roll is then set to 0.0 and the whole rotation is put in the yaw
+		"""
+		w, x, y, z = self.normalize().value.T
+
+		k = np.clip(2.0 * ((w * y) - (x * z)), -1.0, 1.0)
+
+		phi = np.arctan2(2.0 * ((w * x) + (y * z)), 1.0 - 2.0 * ((x * x) + (y * y)))
+		theta = np.arcsin(k)
+		psi = np.arctan2(2.0 * ((w * z) + (x * y)), 1.0 - 2.0 * ((y * y) + (z * z)))
+
+		lock = np.abs(k) >= 1.0 - gimbal_tol
+		if lock.any() :
+			phi[lock] = 0.0
+			theta[lock] = np.copysign(math.pi / 2.0, k[lock])
+			psi[lock] = -2.0 * np.sign(k[lock]) * np.arctan2(x[lock], w[lock])
+			psi[lock] = np.arctan2(np.sin(psi[lock]), np.cos(psi[lock]))
+
+		if mode == 'degrees' :
+			phi, theta, psi = np.degrees(phi), np.degrees(theta), np.degrees(psi)
+		return phi, theta, psi
+
+	@staticmethod
+	def from_axial_rotation(axis, alpha, mode='degrees') :
+		"""
+		axis is a (N, 3) array (or a single 3-vector) of rotation axis, normalized here,
+		alpha is an array of N angles
+		a null axis gives the identity, whatever the angle, as Quaternion.from_axial_rotation()
+		"""
+		axis = np.asarray(axis, dtype=np.float64)
+		alpha = np.asarray(alpha, dtype=np.float64)
+		if mode == 'degrees' :
+			alpha = np.radians(alpha)
+
+		n = np.linalg.norm(axis, axis=-1)
+		is_null = (n == 0.0)
+		n = np.where(is_null, 1.0, n)
+
+		h = np.where(is_null, 0.0, alpha / 2.0)
+		s = np.sin(h) / n
+
+		value = np.empty(np.broadcast_shapes(axis.shape[:-1], alpha.shape) + (4,), dtype=np.float64)
+		value[..., 0] = np.cos(h)
+		value[..., 1:4] = axis * s[..., None]
+
+		return QuaternionArray(value.reshape(-1, 4), True)
+
+	def to_axial_rotation(self, mode='degrees') :
+		"""
+		return a (N, 3) array of unit axis and an array of N angles in [0 ; 180°],
+		the identity returns the x axis with a null angle
+		"""
+		q = self.normalize().value
+		# q and -q describe the same rotation, keep w positive to return the shortest angle
+		q = q * np.where(q[:, 0:1] < 0.0, -1.0, 1.0)
+
+		s = np.linalg.norm(q[:, 1:4], axis=1)
+		alpha = 2.0 * np.arctan2(s, q[:, 0])
+
+		axis = np.zeros((len(q), 3), dtype=np.float64)
+		axis[:, 0] = 1.0
+		is_rot = s > 0.0
+		axis[is_rot] = q[is_rot, 1:4] / s[is_rot, None]
+
+		if mode == 'degrees' :
+			alpha = np.degrees(alpha)
+		return axis, alpha
+
+	@staticmethod
+	def from_rotation_vector(v) :
+		""" v is a (N, 3) array of rotation vectors (axis times angle in radians), exponential map """
+		return QuaternionArray(_qexp(0.5 * np.asarray(v, dtype=np.float64).reshape(-1, 3)), True)
+
+	def to_rotation_vector(self) :
+		""" reverse of from_rotation_vector(), along the shortest path """
+		q = self.normalize().value
+		q = q * np.where(q[:, 0:1] < 0.0, -1.0, 1.0)
+		return 2.0 * _qlog(q)
+
+	def to_dcm(self, out=None) :
+		"""
+		return a (N, 3, 3) array of rotation matrices M such that M @ v == q * v * q.conjugate
+		out is an optional (N, 3, 3) buffer where the matrices are written, for the bulk export of large batches
+		"""
+		w, x, y, z = self.normalize().value.T
+
+		m = np.empty((len(w), 3, 3), dtype=np.float64) if out is None else out
+		m[:, 0, 0] = 1.0 - 2.0 * ((y * y) + (z * z))
+		m[:, 0, 1] = 2.0 * ((x * y) - (w * z))
+		m[:, 0, 2] = 2.0 * ((x * z) + (w * y))
+		m[:, 1, 0] = 2.0 * ((x * y) + (w * z))
+		m[:, 1, 1] = 1.0 - 2.0 * ((x * x) + (z * z))
+		m[:, 1, 2] = 2.0 * ((y * z) - (w * x))
+		m[:, 2, 0] = 2.0 * ((x * z) - (w * y))
+		m[:, 2, 1] = 2.0 * ((y * z) + (w * x))
+		m[:, 2, 2] = 1.0 - 2.0 * ((x * x) + (y * y))
+		return m
+
+	@staticmethod
+	def from_dcm(m) :
+		"""
+		m is a (N, 3, 3) array of rotation matrices, the reverse of to_dcm()
+		Shepperd's method: the largest of the four diagonal combinations is used as pivot
+		"""
+		m = np.asarray(m, dtype=np.float64).reshape(-1, 3, 3)
+
+		d = np.empty((len(m), 4), dtype=np.float64)
+		d[:, 0] = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+		d[:, 1] = m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2]
+		d[:, 2] = m[:, 1, 1] - m[:, 0, 0] - m[:, 2, 2]
+		d[:, 3] = m[:, 2, 2] - m[:, 0, 0] - m[:, 1, 1]
+		pivot = np.argmax(d, axis=1)
+
+		value = np.empty((len(m), 4), dtype=np.float64)
+		for i in range(4) :
+			sel = pivot == i
+			if not sel.any() :
+				continue
+			ms = m[sel]
+			r = np.sqrt(1.0 + d[sel, i])
+			k = 0.5 / r
+			u = np.empty((len(ms), 4), dtype=np.float64)
+			if i == 0 :
+				u[:, 0] = 0.5 * r
+				u[:, 1] = (ms[:, 2, 1] - ms[:, 1, 2]) * k
+				u[:, 2] = (ms[:, 0, 2] - ms[:, 2, 0]) * k
+				u[:, 3] = (ms[:, 1, 0] - ms[:, 0, 1]) * k
+			elif i == 1 :
+				u[:, 0] = (ms[:, 2, 1] - ms[:, 1, 2]) * k
+				u[:, 1] = 0.5 * r
+				u[:, 2] = (ms[:, 0, 1] + ms[:, 1, 0]) * k
+				u[:, 3] = (ms[:, 0, 2] + ms[:, 2, 0]) * k
+			elif i == 2 :
+				u[:, 0] = (ms[:, 0, 2] - ms[:, 2, 0]) * k
+				u[:, 1] = (ms[:, 0, 1] + ms[:, 1, 0]) * k
+				u[:, 2] = 0.5 * r
+				u[:, 3] = (ms[:, 1, 2] + ms[:, 2, 1]) * k
+			else :
+				u[:, 0] = (ms[:, 1, 0] - ms[:, 0, 1]) * k
+				u[:, 1] = (ms[:, 0, 2] + ms[:, 2, 0]) * k
+				u[:, 2] = (ms[:, 1, 2] + ms[:, 2, 1]) * k
+				u[:, 3] = 0.5 * r
+			value[sel] = u
+
+		return QuaternionArray(value).normalize()
+
+	def __repr__(self) :
+		return "QuaternionArray({0} items{1})".format(len(self), ", unit" if self._is_unit else "")
+
+def _as_value(q) :
+	""" return q (QuaternionArray, Quaternion or array-like) as a (..., 4) array, without copy when possible """
+	if isinstance(q, QuaternionArray) :
+		return q.value
+	elif isinstance(q, Quaternion) :
+		return np.array(q.value, dtype=np.float64)
+	return np.asarray(q, dtype=np.float64)
+
+def _qlog(q) :
+	""" logarithm of the (..., 4) unit quaternions q, return the (..., 3) vector part """
+	v = q[..., 1:4]
+	s = np.linalg.norm(v, axis=-1)
+	a = np.arctan2(s, q[..., 0])
+	k = np.where(s > 0.0, a / np.where(s > 0.0, s, 1.0), 1.0)
+	return v * k[..., None]
+
+def _qexp(v) :
+	""" exponential of the (..., 3) pure quaternions v, return (..., 4) unit quaternions """
+	a = np.linalg.norm(v, axis=-1)
+	q = np.empty(v.shape[:-1] + (4,), dtype=np.float64)
+	q[..., 0] = np.cos(a)
+	q[..., 1:4] = v * np.sinc(a / math.pi)[..., None]
+	return q
+
+def _slerp(q0, q1, t, shortest=True) :
+	""" spherical linear interpolation between the (N, 4) unit quaternions q0 and q1, at t in [0 ; 1] """
+	d = np.einsum('ij,ij->i', q0, q1)
+	if shortest :
+		# q and -q are the same rotation, take the one which is on the same side as q0
+		q1 = q1 * np.where(d < 0.0, -1.0, 1.0)[:, None]
+		d = np.abs(d)
+	theta = np.arccos(np.clip(d, -1.0, 1.0))
+	s = np.sin(theta)
+	# for close quaternions, sin(theta) vanishes and the linear interpolation is as good
+	is_lin = s < 1e-9
+	s = np.where(is_lin, 1.0, s)
+	k0 = np.where(is_lin, 1.0 - t, np.sin((1.0 - t) * theta) / s)
+	k1 = np.where(is_lin, t, np.sin(t * theta) / s)
+	q = k0[:, None] * q0 + k1[:, None] * q1
+	return q / np.linalg.norm(q, axis=1)[:, None]
+
+def _squad_control(q_prev, q, q_next) :
+	""" intermediate control point of SQUAD at q, given its two neighbours (all on the same side as q) """
+	q_inv = q * np.array([1.0, -1.0, -1.0, -1.0])
+	l = _qlog(_hamilton(q_inv, q_next)) + _qlog(_hamilton(q_inv, q_prev))
+	return _hamilton(q, _qexp(-l / 4.0))
+
+def _align(q, ref) :
+	""" flip the (N, 4) quaternions q which are not on the same side as ref """
+	return q * np.where(np.einsum('ij,ij->i', q, ref) < 0.0, -1.0, 1.0)[:, None]
+
+def slerp(q0, q1, t) :
+	"""
+	interpolate between two batches of unit quaternions, along the shortest path
+	t is an array of N ratios in [0 ; 1], 0 gives q0 and 1 gives q1
+	"""
+	q0, q1, t = np.broadcast_arrays(
+		_as_value(q0).reshape(-1, 4), _as_value(q1).reshape(-1, 4), np.asarray(t, dtype=np.float64).reshape(-1, 1)
+	)
+	return QuaternionArray(_slerp(q0, q1, t[:, 0]), True)
+
+def squad(q0, q1, s0, s1, t) :
+	"""
+	spherical quadrangle interpolation between q0 and q1, with s0 and s1 the intermediate control points
+	"""
+	q0, q1, s0, s1, t = np.broadcast_arrays(
+		_as_value(q0).reshape(-1, 4), _as_value(q1).reshape(-1, 4),
+		_as_value(s0).reshape(-1, 4), _as_value(s1).reshape(-1, 4),
+		np.asarray(t, dtype=np.float64).reshape(-1, 1)
+	)
+	t = t[:, 0]
+	return QuaternionArray(_slerp(
+		_slerp(q0, q1, t, False), _slerp(s0, s1, t, False), 2.0 * t * (1.0 - t), False
+	), True)
+
+def iter_resample(time_src, q_src, time_dst, mode='slerp', chunk_size=1 << 16) :
+	"""
+	resample the attitude series q_src, sampled at the sorted times time_src, at the sorted times time_dst
+	
+	yield, for each chunk of at most chunk_size target times, the times and the interpolated QuaternionArray
+	only the source samples which bracket a chunk are read, so that time_src and q_src can be memory-mapped arrays
+	targets outside of time_src hold the first or last attitude
+	mode is 'slerp' or 'squad'
+	"""
+	if mode not in ('slerp', 'squad') :
+		raise ValueError("unknown interpolation mode: {0!r}".format(mode))
+
+	q_src = _as_value(q_src)
+	n = len(time_src)
+	if n == 0 or n != len(q_src) :
+		raise ValueError("time_src and q_src must have the same, non null, length")
+
+	for start in range(0, len(time_dst), chunk_size) :
+		t = np.asarray(time_dst[start:start + chunk_size], dtype=np.float64)
+
+		# binary search of the bracketing samples, restricted to the part of the source covered by the chunk
+		lo = max(int(np.searchsorted(time_src, t[0], side='right')) - 2, 0)
+		hi = min(int(np.searchsorted(time_src, t[-1], side='right')) + 2, n)
+		ts = np.asarray(time_src[lo:hi], dtype=np.float64)
+		qs = np.asarray(q_src[lo:hi], dtype=np.float64)
+		m = len(ts)
+
+		i = np.clip(np.searchsorted(ts, t, side='right') - 1, 0, m - 1)
+		j = np.minimum(i + 1, m - 1)
+
+		dt = ts[j] - ts[i]
+		r = np.clip(np.where(dt > 0.0, (t - ts[i]) / np.where(dt > 0.0, dt, 1.0), 0.0), 0.0, 1.0)
+
+		q0 = qs[i]
+		q1 = _align(qs[j], q0)
+
+		if mode == 'slerp' :
+			q = _slerp(q0, q1, r)
+		else :
+			qp = _align(qs[np.maximum(i - 1, 0)], q0)
+			qn = _align(qs[np.minimum(j + 1, m - 1)], q1)
+			s0 = _squad_control(qp, q0, q1)
+			s1 = _squad_control(q0, q1, qn)
+			q = _slerp(_slerp(q0, q1, r, False), _slerp(s0, s1, r, False), 2.0 * r * (1.0 - r), False)
+
+		yield t, QuaternionArray(q, True)
+
+def resample(time_src, q_src, time_dst, mode='slerp', chunk_size=1 << 16) :
+	""" same as iter_resample(), but return the whole resampled series as a single QuaternionArray """
+	q_lst = [q.value for t, q in iter_resample(time_src, q_src, time_dst, mode, chunk_size)]
+	if not q_lst :
+		return QuaternionArray(np.empty((0, 4), dtype=np.float64), True)
+	return QuaternionArray(np.concatenate(q_lst), True)
+
+def _cumulative_product(dq) :
+	"""
+	inclusive prefix Hamilton product of the (N, 4) quaternions dq: r[k] = dq[0] * dq[1] * ... * dq[k]
+
+	the product is sequential by nature, it is split in about sqrt(N) blocks which are scanned
+	side by side, then the block totals are scanned (recursively) and applied to each block
+	"""
+	n = len(dq)
+	if n <= 32 :
+		r = np.empty_like(dq)
+		acc = dq[0]
+		r[0] = acc
+		for k in range(1, n) :
+			acc = _hamilton(acc, dq[k])
+			r[k] = acc
+		return r
+
+	b = int(math.ceil(math.sqrt(n)))
+	m = int(math.ceil(n / b))
+
+	block = np.zeros((m * b, 4), dtype=np.float64)
+	block[:, 0] = 1.0
+	block[:n] = dq
+	block = block.reshape(m, b, 4)
+
+	r = np.empty_like(block)
+	acc = block[:, 0]
+	r[:, 0] = acc
+	for k in range(1, b) :
+		acc = _hamilton(acc, block[:, k])
+		r[:, k] = acc
+
+	# the first block needs no correction, the following ones are left-multiplied by the product of all the previous ones
+	head = _cumulative_product(r[:-1, -1])
+	r[1:] = _hamilton(head[:, None, :], r[1:])
+
+	return r.reshape(-1, 4)[:n]
+
+class AngularRateIntegrator() :
+	"""
+	integrate body angular rates (gyro samples) into an attitude series, chunk after chunk
+
+	the attitude q maps the body frame onto the reference frame, so that dq/dt = q * (0, omega) / 2
+	each sample omega[k], at time[k], is the rate over the interval ]time[k-1] ; time[k]]
+
+	modes:
+		* 'exact': the rate is held over the interval and integrated by the exact exponential map
+		* 'coning': trapezoidal rotation increments, with the two-sample coning correction
+	"""
+
+	def __init__(self, q0=None, t0=None, mode='exact') :
+		if mode not in ('exact', 'coning') :
+			raise ValueError("unknown integration mode: {0!r}".format(mode))
+		self.mode = mode
+
+		self.q = Quaternion.identity() if q0 is None else q0.normalize()
+		self.time = t0
+
+		self._omega = None # last rate sample, for the trapezoidal increment
+		self._dtheta = None # last rotation increment, for the coning correction
+
+	def push(self, time, omega) :
+		"""
+		time is an array of N sorted timestamps, omega a (N, 3) array of angular rates in [rad.s-1]
+		return the attitude at each timestamp as a QuaternionArray, and keep the last one as state
+		"""
+		time = np.asarray(time, dtype=np.float64)
+		omega = np.asarray(omega, dtype=np.float64).reshape(-1, 3)
+		if len(time) != len(omega) :
+			raise ValueError("time and omega must have the same length")
+		if len(time) == 0 :
+			return QuaternionArray(np.empty((0, 4), dtype=np.float64), True)
+
+		t_prev = time[0] if self.time is None else self.time
+		dt = np.diff(time, prepend=t_prev)
+		if (dt < 0.0).any() :
+			raise ValueError("the timestamps must be sorted, and after the previous chunk")
+
+		if self.mode == 'exact' :
+			dtheta = omega * dt[:, None]
+			phi = dtheta
+		else :
+			omega_prev = np.empty_like(omega)
+			omega_prev[0] = omega[0] if self._omega is None else self._omega
+			omega_prev[1:] = omega[:-1]
+			dtheta = 0.5 * (omega_prev + omega) * dt[:, None]
+
+			dtheta_prev = np.empty_like(dtheta)
+			dtheta_prev[0] = 0.0 if self._dtheta is None else self._dtheta
+			dtheta_prev[1:] = dtheta[:-1]
+			phi = dtheta + np.cross(dtheta_prev, dtheta) / 12.0
+
+		dq = _qexp(0.5 * phi)
+		dq[0] = _hamilton(np.array(self.q.value, dtype=np.float64), dq[0])
+
+		q = _cumulative_product(dq)
+		# the products drift slowly away from the unit sphere, renormalize once per chunk
+		q /= np.linalg.norm(q, axis=1)[:, None]
+
+		self.q = Quaternion(* q[-1].tolist(), is_unit=True)
+		self.time = time[-1]
+		self._omega = omega[-1].copy()
+		self._dtheta = dtheta[-1].copy()
+
+		return QuaternionArray(q, True)
+
+def integrate_angular_rate(time, omega, q0=None, mode='exact', chunk_size=1 << 20) :
+	""" integrate a whole angular rate log, see AngularRateIntegrator """
+	integrator = AngularRateIntegrator(q0, None, mode)
+	q_lst = [
+		integrator.push(time[start:start + chunk_size], omega[start:start + chunk_size]).value
+		for start in range(0, len(time), chunk_size)
+	]
+	if not q_lst :
+		return QuaternionArray(np.empty((0, 4), dtype=np.float64), True)
+	return QuaternionArray(np.concatenate(q_lst), True)
+
+def _benchmark(n=100000) :
+	""" micro-benchmarks of the per-sample operations, the allocating (former) way against the slotted and in place one """
+	import timeit
+
+	class _DictQuaternion(Quaternion) :
+		""" same as Quaternion, with a __dict__ and without the unit flag, as the class was before """
+		def normalize(self) :
+			n = self.norm
+			return _DictQuaternion(self.w / n, self.x / n, self.y / n, self.z / n)
+
+		def __mul__(self, other) :
+			return _DictQuaternion(
+				(self.w * other.w) - (self.x * other.x) - (self.y * other.y) - (self.z * other.z),
+				(self.w * other.x) + (self.x * other.w) + (self.y * other.z) - (self.z * other.y),
+				(self.w * other.y) - (self.x * other.z) + (self.y * other.w) + (self.z * other.x),
+				(self.w * other.z) + (self.x * other.y) - (self.y * other.x) + (self.z * other.w)
+			)
+
+	def report(name, stmt) :
+		t = min(timeit.repeat(stmt, number=n, repeat=5))
+		print("{0:<40s} {1:8.1f} ns".format(name, 1e9 * t / n))
+
+	dq = Quaternion.from_axial_rotation(1.0, 2.0, 3.0, 0.01)
+	dq_old = _DictQuaternion(* dq.value)
+	q_old = _DictQuaternion(1.0, 0.0, 0.0, 0.0)
+	q_new = Quaternion.identity()
+	v = Quaternion.from_vector(1.0, 2.0, 3.0)
+
+	report("compose + normalize, former", lambda : (q_old * dq_old).normalize())
+	report("compose + normalize, allocating", lambda : (q_new * dq).normalize())
+	report("compose + normalize, in place", lambda : q_new.imul(dq).inormalize())
+	report("rotate, q * v * q.conjugate", lambda : q_old * v * q_old.conjugate)
+	report("rotate, Quaternion.rotate", lambda : v.rotate(q_new))
+	report("rotate, fused rotate_vector", lambda : q_new.rotate_vector(1.0, 2.0, 3.0))
+
 if __name__ == '__main__' :
+
+	_benchmark()
 	
 	p = Quaternion.from_euler_rotation(0.0, -90.0, 0.0)
-	p.basis()
+	print(p.basis())
 	
 	p = Quaternion.identity()
-	p.basis()
+	print(p.basis())
 	
 	r1 = Quaternion.from_axial_rotation(0.0, 0.0, 1.0, 90.0)
-	r1.basis()
+	print(r1.basis())
 	r2 = Quaternion.from_axial_rotation(1.0, 0.0, 0.0, 180.0)
-	r2.basis()
+	print(r2.basis())
 	q = r1 * r2
-	q.basis()
+	print(q.basis())
 	print(q.to_axial_rotation())
 	
 	
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""
+great circle navigation on the unit sphere, vectorized over (N, 3) arrays of unit vectors
+
+the z axis points toward the north pole, bearings are counted from the north toward the east, in radians,
+distances are angles in radians (to be multiplied by the radius of the sphere)
+
+each function agrees with the scalar methods of geometrik.threed.Vector, which serve as reference:
+Vector.angle_to() for the distance, Vector.bearing_to() (built on angle_to(..., way=...)) for the bearing
+"""
+
+import numpy as np
+
+def _unit(v) :
+	return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+def _dot(a, b) :
+	return np.einsum('...i,...i->...', a, b)
+
+def from_latlon(lat, lon) :
+	""" latitude and longitude in degrees, to (N, 3) unit vectors """
+	lat, lon = np.radians(lat), np.radians(lon)
+	c = np.cos(lat)
+	return np.stack([c * np.cos(lon), c * np.sin(lon), np.sin(lat)], axis=-1)
+
+def to_latlon(v) :
+	""" (N, 3) unit vectors to latitude and longitude in degrees """
+	v = np.asarray(v, dtype=np.float64)
+	return (
+		np.degrees(np.arctan2(v[..., 2], np.hypot(v[..., 0], v[..., 1]))),
+		np.degrees(np.arctan2(v[..., 1], v[..., 0]))
+	)
+
+def northeast_frame(a) :
+	""" local north and east unit vectors at each point of a, same as Vector.northeast_frame() (undefined at the poles) """
+	e = _unit(np.cross([0.0, 0.0, 1.0], a))
+	n = np.cross(a, e)
+	return n, e
+
+def distance(a, b) :
+	""" angle between a and b, same as Vector.angle_to(), well conditioned for close and for antipodal points """
+	return np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), _dot(a, b))
+
+def initial_bearing(a, b) :
+	""" bearing at a of the great circle from a to b, in [0 ; 2pi[, same as Vector.bearing_to() """
+	n, e = northeast_frame(a)
+	t = np.cross(np.cross(a, b), a) # direction of b, in the plane tangent at a
+	return np.arctan2(_dot(t, e), _dot(t, n)) % (2.0 * np.pi)
+
+def final_bearing(a, b) :
+	""" bearing at b of the great circle from a to b, in [0 ; 2pi[ """
+	return (initial_bearing(b, a) + np.pi) % (2.0 * np.pi)
+
+def destination(a, bearing, dist) :
+	""" point reached from a after an angle dist along the great circle of initial bearing """
+	bearing = np.asarray(bearing, dtype=np.float64)[..., None]
+	dist = np.asarray(dist, dtype=np.float64)[..., None]
+	n, e = northeast_frame(a)
+	d = np.cos(bearing) * n + np.sin(bearing) * e
+	return _unit(np.cos(dist) * a + np.sin(dist) * d)
+
+def cross_track(p, a, b) :
+	""" signed angle from p to the great circle through a and b, positive on the left of a -> b """
+	return np.arcsin(np.clip(_dot(p, _unit(np.cross(a, b))), -1.0, 1.0))
+
+def along_track(p, a, b) :
+	""" angle from a to the projection of p on the great circle through a and b, signed along a -> b """
+	g = _unit(np.cross(a, b))
+	q = np.cross(g, np.cross(p, g)) # projection of p on the plane of the great circle
+	return np.arctan2(_dot(np.cross(a, q), g), _dot(a, q))
+
+def intersection(a1, b1, a2, b2) :
+	"""
+	the two antipodal intersections of the great circles through (a1, b1) and (a2, b2),
+	the first one is the closest to a1; the result is NaN for identical great circles
+	"""
+	i = np.cross(np.cross(a1, b1), np.cross(a2, b2))
+	with np.errstate(invalid='ignore', divide='ignore') :
+		i = _unit(i)
+	i = np.where((_dot(i, a1) < 0.0)[..., None], -i, i)
+	return i, -i
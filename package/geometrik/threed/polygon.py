@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+"""
+polygon on the unit sphere, for regions given in latitude and longitude (airspaces, zones)
+
+the edges are great circle arcs, so that the test is exact for large regions, across the antimeridian and
+around the poles, without any projection; the vertices are converted once to unit Vector and the normal of each
+edge plane (a @ b, the vector_product) is precomputed
+
+a point p is inside if the arc from p to a reference point r of known side crosses the boundary an even number
+of times (odd if r is outside); the crossings of an arc (p, r) with an edge (a, b) are given by the signs of
+four triple products, two of them (a, b, p) and (a, b, r) use the edge normals, the two others (p, r, a) and
+(p, r, b) are computed once per query point for all the vertices
+"""
+
+import math
+
+import numpy as np
+
+from geometrik.threed.vector import Vector
+
+class SphericalPolygon() :
+
+	def __init__(self, * v_lst, is_ccw=None, use_cap=True) :
+		"""
+		v_lst are the vertices, as Vector (normalized here), the polygon is closed implicitly
+
+		the interior is on the left of the edges when the vertices are counterclockwise (seen from outside);
+		with is_ccw=None, the orientation is chosen so that the interior is the smaller of the two regions,
+		is_ccw=True (or False) forces it, for regions larger than a hemisphere
+		"""
+		self.v_lst = [v.normalized() for v in v_lst]
+		if len(self.v_lst) < 3 :
+			raise ValueError("a polygon needs at least 3 vertices")
+
+		area = self._left_area(self.v_lst)
+		if (is_ccw is None and 2.0 * math.pi < area) or is_ccw is False :
+			self.v_lst.reverse()
+			area = 4.0 * math.pi - area
+		self.area = area # in steradians
+
+		self.n_lst = [a @ b for a, b in zip(self.v_lst, self.v_lst[1:] + self.v_lst[:1])]
+
+		self.vertex = np.array([v.as_tuple for v in self.v_lst], dtype=np.float64)
+		self.normal = np.array([n.as_tuple for n in self.n_lst], dtype=np.float64)
+
+		# the spherical cap which holds the boundary, when it is smaller than a hemisphere
+		self.cap_center = None
+		self.cap_cos = None
+		c = self.vertex.sum(axis=0)
+		n = np.linalg.norm(c)
+		if n > 1e-9 :
+			c = c / n
+			cos_r = (self.vertex @ c).min()
+			if cos_r > 1e-9 :
+				self.cap_center = c
+				self.cap_cos = cos_r
+		# the complement of the cap does not touch the boundary, it lies in one region: the larger one
+		self.cap_outside = 2.0 * math.pi < self.area
+		self.use_cap = use_cap and self.cap_center is not None
+
+		self._set_reference()
+
+	@staticmethod
+	def from_latlon(lat_lst, lon_lst, ** opt) :
+		""" vertices given by their latitude and longitude, in degrees """
+		return SphericalPolygon(* [
+			Vector(
+				math.cos(math.radians(lat)) * math.cos(math.radians(lon)),
+				math.cos(math.radians(lat)) * math.sin(math.radians(lon)),
+				math.sin(math.radians(lat))
+			) for lat, lon in zip(lat_lst, lon_lst)
+		], ** opt)
+
+	def __len__(self) :
+		return len(self.v_lst)
+
+	@staticmethod
+	def _left_area(v_lst) :
+		""" area on the left of the edges: 2 pi minus the sum of the turning angles (Gauss-Bonnet) """
+		n_lst = [(a @ b).normalized() for a, b in zip(v_lst, v_lst[1:] + v_lst[:1])]
+		turn = 0.0
+		for i, b in enumerate(v_lst) :
+			n0, n1 = n_lst[i - 1], n_lst[i]
+			turn += math.atan2(b * (n0 @ n1), n0 * n1)
+		return (2.0 * math.pi - turn) % (4.0 * math.pi)
+
+	def _winding(self, r) :
+		""" sum of the angles under which the edges are seen from r: 2 pi if r is inside, -2 pi if -r is inside, else 0 """
+		a = self.vertex
+		b = np.roll(a, -1, axis=0)
+		ra, rb = a @ r, b @ r
+		return np.arctan2(self.normal @ r, np.einsum('ij,ij->i', a, b) - ra * rb).sum()
+
+	def _is_clear(self, r) :
+		""" True if r is away from the planes of all the edges (and so from the vertices), where the side tests are exact """
+		return (np.abs(self.normal @ r) > 1e-9 * np.linalg.norm(self.normal, axis=1)).all()
+
+	def _set_reference(self) :
+		"""
+		r0 is a point of known side: the center of the complement of the cap when there is one, else a point
+		whose antipode is on the other side, as told by its winding number (+/- 2 pi);
+		r1 is (about) orthogonal to r0 and classified from it, each query uses the one it is the furthest to be antipodal with;
+		both are kept away from the planes of the edges, where the crossings of an arc ending at them are ambiguous
+		"""
+		candidate_lst = list(np.identity(3)) + list(np.random.default_rng(0).normal(size=(16, 3)))
+
+		if self.cap_center is not None and self._is_clear(-self.cap_center) :
+			r, is_in = -self.cap_center, self.cap_outside
+		else :
+			for r in candidate_lst :
+				r = r / np.linalg.norm(r)
+				if not self._is_clear(r) :
+					continue
+				w = self._winding(r)
+				if abs(abs(w) - 2.0 * math.pi) < 1e-6 :
+					break
+			else :
+				raise ValueError("no reference point found, the polygon may be degenerate")
+			is_in = 0.0 < w
+
+		# orthogonal to r0 if possible, else tilted towards it when all the orthogonal candidates are on an edge plane
+		for r1 in [np.cross(r, c) + tilt * r for tilt in (0.0, 0.25) for c in candidate_lst] :
+			n = np.linalg.norm(r1)
+			if n > 0.1 and self._is_clear(r1 / n) :
+				r1 /= n
+				break
+		else :
+			raise ValueError("no reference point found, the polygon may be degenerate")
+
+		self.ref = np.array([r, r1])
+		self.ref_side = np.array([is_in, False])
+		self.ref_normal = self.normal @ self.ref.T # (E, 2) side of the references relative to each edge plane
+		self.ref_side[1] = self._is_inside(r1[None, :], 0)[0]
+
+	def _is_inside(self, p, ref=None) :
+		""" (N, 3) unit vectors, without the prefilter """
+		if ref is None :
+			ref = np.where(p @ self.ref[0] < -0.5, 1, 0)
+		else :
+			ref = np.full(len(p), ref)
+		r = self.ref[ref]
+
+		m = np.cross(p, r) # normal of the plane of each arc (p, r)
+		s_pr = (m @ self.vertex.T) > 0.0 # (N, V) side of the vertices relative to the arcs
+		s_pr_a, s_pr_b = s_pr, np.roll(s_pr, -1, axis=1)
+		s_ab_p = (p @ self.normal.T) > 0.0 # (N, E) side of the points relative to the edges
+		s_ab_r = self.ref_normal[:, ref].T > 0.0
+
+		crossing = (s_ab_p != s_ab_r) & (s_pr_a != s_pr_b) & (s_pr_a == s_ab_r)
+		return (crossing.sum(axis=1) % 2 == 1) != self.ref_side[ref]
+
+	def is_inside(self, p, chunk_size=8192) :
+		""" (N, 3) array of unit vectors, return a (N,) boolean array """
+		p = np.asarray(p, dtype=np.float64).reshape(-1, 3)
+		res = np.empty(len(p), dtype=bool)
+		for start in range(0, len(p), chunk_size) :
+			q = p[start:start + chunk_size]
+			if not self.use_cap :
+				res[start:start + chunk_size] = self._is_inside(q)
+			else :
+				is_near = (q @ self.cap_center) >= self.cap_cos
+				r = np.full(len(q), self.cap_outside)
+				if is_near.any() :
+					r[is_near] = self._is_inside(q[is_near])
+				res[start:start + chunk_size] = r
+		return res
+
+	def is_inside_latlon(self, lat, lon, chunk_size=8192) :
+		""" latitude and longitude arrays, in degrees """
+		lat, lon = np.broadcast_arrays(np.radians(lat), np.radians(lon))
+		c = np.cos(lat)
+		p = np.stack([c * np.cos(lon), c * np.sin(lon), np.sin(lat)], axis=-1)
+		return self.is_inside(p, chunk_size).reshape(lat.shape)
+
+	def is_point_inside(self, m) :
+		""" m is a Vector """
+		return bool(self.is_inside(m.normalized().as_tuple)[0])
+
+if __name__ == '__main__' :
+
+	import time
+
+	# a region which crosses the antimeridian, and one around the north pole
+	u = SphericalPolygon.from_latlon([50.0, 50.0, 60.0, 60.0], [170.0, -170.0, -170.0, 170.0])
+	print(u.is_inside_latlon([55.0, 55.0, 55.0], [180.0, 0.0, 165.0]), u.area * 6371.0**2, "km2")
+
+	v = SphericalPolygon.from_latlon([80.0, 80.0, 80.0, 80.0], [0.0, 90.0, 180.0, -90.0])
+	print(v.is_inside_latlon([89.0, 85.0, 75.0], [45.0, -135.0, 0.0]))
+
+	rng = np.random.default_rng(0)
+	n = 1000000
+	lat = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+	lon = rng.uniform(-180.0, 180.0, n)
+
+	for name, opt in [("with cap", dict()), ("without cap", dict(use_cap=False))] :
+		w = SphericalPolygon.from_latlon(
+			[44.1, 44.1, 43.9138888888889, 43.8166666666667, 43.8055555555556, 43.8166666666667],
+			[4.75833333333333, 4.96305555555556, 4.99305555555556, 4.975, 4.84166666666667, 4.78055555555556],
+			** opt
+		)
+		t = time.perf_counter()
+		r = w.is_inside_latlon(lat, lon)
+		t = time.perf_counter() - t
+		print("{0:<12s} {1:10.0f} points per second, {2} inside".format(name, n / t, r.sum()))
@@ -177,6 +177,13 @@ class Vector() :
 		else :
 			return cc
 
+	def bearing_to(self, other) :
+		""" initial bearing (from the north toward the east, in [0 ; 2pi[) of the great circle from self to other,
+		scalar reference of geometrik.threed.globe.initial_bearing() """
+		Fn, Fe = self.northeast_frame()
+		t = (self @ other) @ self # direction of other, in the plane tangent at self
+		return Fn.angle_to(t, way=-self) % math.tau
+
 	def oriented_frame(self, heading, w=1) : # in radians
 		Fn, Fe = self.northeast_frame()
 
@@ -4,6 +4,9 @@
 
 import math
 import cmath
+import fractions
+
+from geometrik.twod.predicate import orient2d, is_sign_certain
 
 template_svg = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
 <?xml-stylesheet href="style.css" type="text/css"?>
@@ -123,7 +126,11 @@ class Polygon() :
 	def __init__(self, * p_lst) :
 		self.p_lst = p_lst
 
-	def is_point_inside(self, m) :
+	def is_point_inside(self, m, robust=False) :
+		""" with robust=True, the crossings are decided by an exact orientation test instead of an interpolated x,
+		the points of the boundary are inside """
+		if robust :
+			return self._is_point_inside_robust(m)
 		c = 0
 		for i in range(len(self.p_lst)) :
 			a = self.p_lst[i-1]
@@ -139,6 +146,35 @@ class Polygon() :
 						c += 1
 		return c % 2 == 1
 
+	def _is_point_inside_robust(self, m) :
+		c = 0
+		for i in range(len(self.p_lst)) :
+			a = self.p_lst[i-1]
+			b = self.p_lst[i]
+			if (a.y <= m.y) != (b.y <= m.y) :
+				# the edge crosses the horizontal of m, going up (or down): m must be on its left (or right)
+				o = orient2d(a.x, a.y, b.x, b.y, m.x, m.y)
+				if o == 0 :
+					return True
+				if (o > 0) == (a.y <= m.y) :
+					c += 1
+			elif min(a.y, b.y) <= m.y <= max(a.y, b.y) and min(a.x, b.x) <= m.x <= max(a.x, b.x) :
+				if orient2d(a.x, a.y, b.x, b.y, m.x, m.y) == 0 :
+					return True
+		return c % 2 == 1
+
+	def triangulate(self, * hole_lst) :
+		""" (T, 3) indices of the triangles, counterclockwise, into the vertices of the polygon followed by those
+		of each hole (a Polygon), see geometrik.twod.triangulate """
+		from geometrik.twod.triangulate import triangulate
+
+		p_lst = list(self.p_lst)
+		hole_start = list()
+		for hole in hole_lst :
+			hole_start.append(len(p_lst))
+			p_lst.extend(hole.p_lst)
+		return triangulate([(p.x, p.y) for p in p_lst], hole_start)
+
 	def to_svg(self) :
 		return '<polygon points="{0}" />'.format(
 			' '.join(f"{p.x:.3f},{p.y:.3f}" for p in self.p_lst)
@@ -182,19 +218,43 @@ class Line() :
 		a, b, c = self.get_canonical_coef
 		return f"{a} * x + {b} * y + {c} = 0"
 
-	def intersection_with_line(self, other) :
+	def intersection_with_line(self, other, robust=False) :
+		""" with robust=True, the lines are parallel only if their directions are exactly colinear """
 		# print(f">>> intersection({self.debug_canonical()}, {other.debug_canonical()}")
 		a1, b1, c1 = self.get_canonical_coef
 		a2, b2, c2 = other.get_canonical_coef
 
 		d = a1*b2 - a2*b1
 
-		if d != 0 :
-			y = ( a2*c1 - a1*c2 ) / d
-			x = ( b1*c2 - c1*b2 ) / d
-			return Point(x, y)
+		if robust :
+			# d is the cross product of the directions, its sign is taken exactly
+			is_parallel = orient2d(0.0, 0.0, self.a.x, self.a.y, other.a.x, other.a.y) == 0
+		else :
+			is_parallel = (d == 0)
+
+		if is_parallel :
+			return None
 
-		return None
+		if robust and not is_sign_certain(a1*b2, a2*b1) :
+			# the float determinant is not reliable, it may even be 0.0: the point is computed exactly
+			return self._intersection_exact(other)
+
+		y = ( a2*c1 - a1*c2 ) / d
+		x = ( b1*c2 - c1*b2 ) / d
+		return Point(x, y)
+
+	def _intersection_exact(self, other) :
+		""" the intersection of two lines which are not parallel, computed with fractions, then rounded once """
+		ux, uy, px, py = (fractions.Fraction(v) for v in (self.a.x, self.a.y, self.b.x, self.b.y))
+		vx, vy, qx, qy = (fractions.Fraction(v) for v in (other.a.x, other.a.y, other.b.x, other.b.y))
+		a1, b1, c1 = uy, -ux, ux * py - uy * px
+		a2, b2, c2 = vy, -vx, vx * qy - vy * qx
+		d = a1*b2 - a2*b1
+		try :
+			return Point(float(( b1*c2 - c1*b2 ) / d), float(( a2*c1 - a1*c2 ) / d))
+		except OverflowError :
+			# the lines are so close to parallel that the point is beyond the range of the floats
+			return None
 
 	def intersection_with_circle(self, other: "Circle") -> ("Point", "Point") :
 		# https://mathworld.wolfram.com/Circle-LineIntersection.html
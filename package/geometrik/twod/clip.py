@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+"""
+clipping of polygons: by a convex window (Sutherland-Hodgman), vectorized across many polygons at once, and the
+boolean operations (intersection, union, difference) of two arbitrary polygons
+
+the polygons are stored in a ragged buffer: xy, a (N, 2) array of the vertices of all the rings one after the other,
+and offsets, a (R + 1,) array, the ring r being xy[offsets[r]:offsets[r+1]]; a polygon with holes is a set of rings
+(even-odd rule), in the results of the boolean operations the outer rings are counterclockwise and the holes clockwise
+
+the boolean operations cut the edges of both polygons at their intersections (found with the robust orient2d), then
+keep each piece according to its side relative to the other polygon, and chain the kept pieces into rings
+"""
+
+import collections
+import math
+
+import numpy as np
+
+from geometrik.twod import Point, Polygon
+from geometrik.twod.predicate import orient2d_array
+
+_SWEEP_MIN = 32 # below this number of edges, is_inside() tests all of them
+
+def as_buffer(p_lst) :
+	""" a sequence of twod.Polygon (or of (n, 2) arrays) as (xy, offsets) """
+	r_lst = [
+		np.array([(p.x, p.y) for p in r.p_lst], dtype=np.float64).reshape(-1, 2) if isinstance(r, Polygon) else
+		np.asarray(r, dtype=np.float64).reshape(-1, 2) for r in p_lst
+	]
+	offsets = np.zeros(len(r_lst) + 1, dtype=np.int64)
+	offsets[1:] = np.cumsum([len(r) for r in r_lst])
+	xy = np.concatenate(r_lst) if r_lst else np.zeros((0, 2), dtype=np.float64)
+	return xy, offsets
+
+def as_polygons(xy, offsets) :
+	""" the rings of (xy, offsets) as a list of twod.Polygon """
+	return [
+		Polygon(* [Point(x, y) for x, y in xy[start:stop].tolist()])
+		for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+	]
+
+def _as_arrays(xy, offsets) :
+	return np.asarray(xy, dtype=np.float64).reshape(-1, 2), np.asarray(offsets, dtype=np.int64)
+
+def _next_index(offsets) :
+	""" index of the next vertex in the same ring, for each vertex """
+	nxt = np.arange(1, offsets[-1] + 1)
+	is_full = offsets[:-1] < offsets[1:]
+	nxt[offsets[1:][is_full] - 1] = offsets[:-1][is_full]
+	return nxt
+
+def ring_area(xy, offsets) :
+	""" (R,) signed areas of the rings, positive when counterclockwise """
+	xy, offsets = _as_arrays(xy, offsets)
+	b = xy[_next_index(offsets)]
+	a = xy[:, 0] * b[:, 1] - b[:, 0] * xy[:, 1]
+	c = np.zeros(len(a) + 1)
+	c[1:] = np.cumsum(a)
+	return 0.5 * (c[offsets[1:]] - c[offsets[:-1]])
+
+def _expand(start, stop, chunk_size) :
+	""" (row, position) for all the positions of [start[r] ; stop[r][ of each row r, by chunks of about chunk_size """
+	count = np.maximum(stop - start, 0)
+	c = np.cumsum(count)
+	first = 0
+	while first < len(count) :
+		last = max(first + 1, int(np.searchsorted(c, (c[first - 1] if first else 0) + chunk_size, side='right')))
+		k = count[first:last]
+		row = np.repeat(np.arange(first, last), k)
+		yield row, np.arange(k.sum()) + np.repeat(start[first:last] - (np.cumsum(k) - k), k)
+		first = last
+
+def _overlapping(a_lo, a_hi, b_lo, b_hi, chunk_size=1<<20) :
+	"""
+	the pairs (i, j) of intervals [a_lo[i] ; a_hi[i]] and [b_lo[j] ; b_hi[j]] which overlap, by chunks: either b_lo[j]
+	is within [a_lo[i] ; a_hi[i]] or a_lo[i] is within ]b_lo[j] ; b_hi[j]], and in both cases the candidates are a
+	range of the sorted starts, so that the cost is O((N + M).log(N + M)) plus the number of pairs
+	"""
+	a_order, b_order = np.argsort(a_lo, kind='stable'), np.argsort(b_lo, kind='stable')
+	a_sorted, b_sorted = a_lo[a_order], b_lo[b_order]
+	start, stop = np.searchsorted(b_sorted, a_lo, side='left'), np.searchsorted(b_sorted, a_hi, side='right')
+	for i, k in _expand(start, stop, chunk_size) :
+		yield i, b_order[k]
+	start, stop = np.searchsorted(a_sorted, b_lo, side='right'), np.searchsorted(a_sorted, b_hi, side='right')
+	for j, k in _expand(start, stop, chunk_size) :
+		yield a_order[k], j
+
+def is_inside(p, xy, offsets, chunk_size=1<<20) :
+	""" (N,) True for the points p (N, 2) inside the set of rings (xy, offsets), by the even-odd rule """
+	p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+	xy, offsets = _as_arrays(xy, offsets)
+	a, b = xy, xy[_next_index(offsets)]
+	res = np.zeros(len(p), dtype=bool)
+	if len(a) == 0 :
+		return res
+	if len(a) <= _SWEEP_MIN :
+		# a few edges: all of them are tested against each point
+		step = max(1, chunk_size // len(a))
+		for start in range(0, len(p), step) :
+			px = p[start:start + step, 0:1]
+			py = p[start:start + step, 1:2]
+			is_crossing = (a[:, 1] > py) != (b[:, 1] > py)
+			with np.errstate(divide='ignore', invalid='ignore') :
+				x = a[:, 0] + (py - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+			res[start:start + step] = (is_crossing & (px < x)).sum(axis=1) % 2 == 1
+		return res
+
+	# many edges: only the ones which span the ordinate of each point are tested
+	y_lo, y_hi = np.minimum(a[:, 1], b[:, 1]), np.maximum(a[:, 1], b[:, 1])
+	count = np.zeros(len(p), dtype=np.int64)
+	for i, j in _overlapping(p[:, 1], p[:, 1], y_lo, y_hi, chunk_size) :
+		py = p[i, 1]
+		is_crossing = (a[j, 1] > py) != (b[j, 1] > py)
+		i, j, py = i[is_crossing], j[is_crossing], py[is_crossing]
+		x = a[j, 0] + (py - a[j, 1]) * (b[j, 0] - a[j, 0]) / (b[j, 1] - a[j, 1])
+		count += np.bincount(i[p[i, 0] < x], minlength=len(p))
+	return count % 2 == 1
+
+def _clip_half_plane(xy, offsets, w0, w1) :
+	""" one step of Sutherland-Hodgman for all the rings: keep the left of the line w0 -> w1 """
+	nxt = _next_index(offsets)
+	d = (w1[0] - w0[0]) * (xy[:, 1] - w0[1]) - (w1[1] - w0[1]) * (xy[:, 0] - w0[0])
+	da, db = d, d[nxt]
+	a_in, b_in = da >= 0.0, db >= 0.0
+
+	# each edge (a, b) emits its crossing point if it crosses the line, then b if b is inside
+	is_cross = a_in != b_in
+	count = is_cross.astype(np.int64) + b_in
+	c = np.zeros(len(count) + 1, dtype=np.int64)
+	c[1:] = np.cumsum(count)
+
+	res = np.empty((c[-1], 2), dtype=np.float64)
+	a, b = xy[is_cross], xy[nxt[is_cross]]
+	t = (da[is_cross] / (da[is_cross] - db[is_cross]))[:, None]
+	res[c[:-1][is_cross]] = a + t * (b - a)
+	res[c[:-1][b_in] + is_cross[b_in]] = xy[nxt[b_in]]
+	return res, c[offsets]
+
+def clip_convex(xy, offsets, window) :
+	"""
+	the rings (xy, offsets) clipped by the convex window, a (K, 2) array of vertices counterclockwise;
+	a ring which is entirely outside becomes empty, so that the ring r of the result comes from the ring r of the input;
+	a concave ring may give a single ring with zero-width parts along the boundary of the window
+	"""
+	xy, offsets = _as_arrays(xy, offsets)
+	window = np.asarray(window, dtype=np.float64).reshape(-1, 2)
+	for w0, w1 in zip(window, np.roll(window, -1, axis=0)) :
+		if len(xy) == 0 :
+			break
+		xy, offsets = _clip_half_plane(xy, offsets, w0, w1)
+	return xy, offsets
+
+def clip_box(xy, offsets, x_min, y_min, x_max, y_max) :
+	""" clip_convex() by an axis-aligned rectangle, a map tile for example """
+	return clip_convex(xy, offsets, [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]])
+
+def segment_intersections(p0, p1, q0, q1, chunk_size=1<<20) :
+	"""
+	the pairs of segments (p0[i], p1[i]) and (q0[j], q1[j]) which cross or touch, the sides being decided by the
+	robust orient2d; return i, j and the (K, 2) points of intersection (an endpoint exactly, when it lies on the other
+	segment), and apart, as i, j, the pairs of collinear segments whose bounding boxes overlap
+	"""
+	p0, p1, q0, q1 = (np.asarray(v, dtype=np.float64).reshape(-1, 2) for v in (p0, p1, q0, q1))
+	p_lo, p_hi = np.minimum(p0, p1), np.maximum(p0, p1)
+	q_lo, q_hi = np.minimum(q0, q1), np.maximum(q0, q1)
+
+	# the candidates: the pairs whose bounding boxes overlap, swept along the axis where the boxes are the thinnest
+	with np.errstate(divide='ignore', invalid='ignore') :
+		span = np.vstack([p_hi, q_hi]).max(axis=0, initial=-np.inf) - np.vstack([p_lo, q_lo]).min(axis=0, initial=np.inf)
+		ratio = ((p_hi - p_lo).sum(axis=0) + (q_hi - q_lo).sum(axis=0)) / span
+	axis = int(np.argmin(np.nan_to_num(ratio, nan=np.inf)))
+	other = 1 - axis
+	i_lst, j_lst = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+	for i, j in _overlapping(p_lo[:, axis], p_hi[:, axis], q_lo[:, axis], q_hi[:, axis], chunk_size) :
+		is_overlap = (p_lo[i, other] <= q_hi[j, other]) & (q_lo[j, other] <= p_hi[i, other])
+		i_lst.append(i[is_overlap])
+		j_lst.append(j[is_overlap])
+	i, j = np.concatenate(i_lst), np.concatenate(j_lst)
+	order = np.lexsort((j, i))
+	i, j = i[order], j[order]
+
+	o1 = orient2d_array(p0[i], p1[i], q0[j])
+	o2 = orient2d_array(p0[i], p1[i], q1[j])
+	o3 = orient2d_array(q0[j], q1[j], p0[i])
+	o4 = orient2d_array(q0[j], q1[j], p1[i])
+	is_collinear = (o1 == 0) & (o2 == 0)
+	is_hit = ~is_collinear & (o1 * o2 <= 0) & (o3 * o4 <= 0)
+
+	i_hit, j_hit = i[is_hit], j[is_hit]
+	o1, o2, o3, o4 = o1[is_hit], o2[is_hit], o3[is_hit], o4[is_hit]
+	u, v, w = p1[i_hit] - p0[i_hit], q1[j_hit] - q0[j_hit], q0[j_hit] - p0[i_hit]
+	with np.errstate(divide='ignore', invalid='ignore') :
+		t = (w[:, 0] * v[:, 1] - w[:, 1] * v[:, 0]) / (u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0])
+	pt = p0[i_hit] + t[:, None] * u
+	for o, e in [(o3, p0[i_hit]), (o4, p1[i_hit]), (o1, q0[j_hit]), (o2, q1[j_hit])] :
+		pt[o == 0] = e[o == 0]
+
+	return i_hit, j_hit, pt, i[is_collinear], j[is_collinear]
+
+def _oriented(xy, offsets) :
+	""" the same rings, the outer ones (inside an even number of other rings) counterclockwise, the holes clockwise """
+	xy, offsets = _as_arrays(xy, offsets)
+	is_full = offsets[:-1] < offsets[1:]
+	ring = np.flatnonzero(is_full)
+	first = xy[offsets[ring]]
+	depth = np.zeros(len(offsets) - 1, dtype=np.int64)
+	for k, r in enumerate(ring.tolist()) :
+		inside = is_inside(first, xy[offsets[r]:offsets[r + 1]], [0, offsets[r + 1] - offsets[r]])
+		inside[k] = False
+		depth[ring] += inside
+	is_flipped = (ring_area(xy, offsets) > 0.0) != (depth % 2 == 0)
+
+	index = np.arange(len(xy))
+	for r in np.flatnonzero(is_flipped & is_full).tolist() :
+		index[offsets[r]:offsets[r + 1]] = index[offsets[r]:offsets[r + 1]][::-1]
+	return xy[index], offsets
+
+def _position(xy, nxt, e, pt) :
+	""" position of the points pt (K, 2) along the edges e (K,), 0 at the start and 1 at the end """
+	a, b = xy[e], xy[nxt[e]]
+	ab = b - a
+	with np.errstate(divide='ignore', invalid='ignore') :
+		return ((pt - a) * ab).sum(axis=1) / (ab * ab).sum(axis=1)
+
+def _split(xy, offsets, e, pt) :
+	"""
+	the edges of the rings cut at the points pt (K, 2) lying on the edges e (K,), return the start and end of each piece;
+	every point is kept, even when rounding puts it slightly off its edge, so that both polygons are cut at the same points
+	"""
+	nxt = _next_index(offsets)
+	t = np.clip(_position(xy, nxt, e, pt), 0.0, 1.0)
+	is_new = (pt != xy[e]).any(axis=1) & (pt != xy[nxt[e]]).any(axis=1)
+
+	e = np.concatenate([np.arange(len(xy)), e[is_new]])
+	t = np.concatenate([np.zeros(len(xy)), t[is_new]])
+	start = np.concatenate([xy, pt[is_new]])
+	order = np.lexsort((np.arange(len(e)), t, e)) # the vertex first, then the points along the edge
+	e, start = e[order], start[order]
+
+	# each piece goes to the next point on the same edge, or to the end of the edge
+	end = np.empty_like(start)
+	end[:-1] = start[1:]
+	is_last = np.ones(len(e), dtype=bool)
+	is_last[:-1] = e[1:] != e[:-1]
+	end[is_last] = xy[nxt[e[is_last]]]
+
+	is_piece = (start != end).any(axis=1)
+	return start[is_piece], end[is_piece]
+
+def _assemble(start, end) :
+	""" chain the directed edges into rings, turning as much as possible to the right where several edges leave a vertex """
+	s_lst = [tuple(p) for p in start.tolist()]
+	e_lst = [tuple(p) for p in end.tolist()]
+	leaving = collections.defaultdict(list)
+	for k, s in enumerate(s_lst) :
+		leaving[s].append(k)
+
+	def turn(k, m) :
+		ux, uy = e_lst[k][0] - s_lst[k][0], e_lst[k][1] - s_lst[k][1]
+		vx, vy = e_lst[m][0] - s_lst[m][0], e_lst[m][1] - s_lst[m][1]
+		return math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+
+	is_used = [False] * len(s_lst)
+	ring_lst = list()
+	for k in range(len(s_lst)) :
+		ring = list()
+		while not is_used[k] :
+			is_used[k] = True
+			ring.append(s_lst[k])
+			candidate_lst = [m for m in leaving[e_lst[k]] if not is_used[m]]
+			if not candidate_lst :
+				break
+			k = min(candidate_lst, key=lambda m : turn(k, m)) if 1 < len(candidate_lst) else candidate_lst[0]
+		if 3 <= len(ring) :
+			ring_lst.append(ring)
+
+	return as_buffer(ring_lst)
+
+def _overlay(a, b, op) :
+	xa, oa = _oriented(* a)
+	xb, ob = _oriented(* b)
+	na, nb = _next_index(oa), _next_index(ob)
+
+	# cut the edges of each polygon where they meet the other one, the collinear ones at the endpoints of the other
+	i, j, pt, i_c, j_c = segment_intersections(xa, xa[na], xb, xb[nb])
+	ea, pa = np.concatenate([i_c, i_c]), np.concatenate([xb[j_c], xb[nb[j_c]]])
+	eb, pb = np.concatenate([j_c, j_c]), np.concatenate([xa[i_c], xa[na[i_c]]])
+	ta, tb = _position(xa, na, ea, pa), _position(xb, nb, eb, pb)
+	is_a, is_b = (0.0 < ta) & (ta < 1.0), (0.0 < tb) & (tb < 1.0)
+	sa, ea = _split(xa, oa, np.concatenate([i, ea[is_a]]), np.concatenate([pt, pa[is_a]]))
+	sb, eb = _split(xb, ob, np.concatenate([j, eb[is_b]]), np.concatenate([pt, pb[is_b]]))
+
+	# the pieces shared by both boundaries are identical, in the same direction or in the opposite one
+	key_b = set(map(tuple, np.hstack([sb, eb]).tolist()))
+	key_a = set(map(tuple, np.hstack([sa, ea]).tolist()))
+	a_same = np.array([k in key_b for k in map(tuple, np.hstack([sa, ea]).tolist())], dtype=bool)
+	a_opposite = np.array([k in key_b for k in map(tuple, np.hstack([ea, sa]).tolist())], dtype=bool)
+	b_shared = np.array([k in key_a for k in map(tuple, np.hstack([sb, eb]).tolist())], dtype=bool)
+	b_shared |= np.array([k in key_a for k in map(tuple, np.hstack([eb, sb]).tolist())], dtype=bool)
+	a_shared = a_same | a_opposite
+
+	a_in = is_inside(0.5 * (sa + ea), xb, ob)
+	b_in = is_inside(0.5 * (sb + eb), xa, oa)
+
+	if op == 'and' :
+		keep_a, keep_b = (a_in & ~a_shared) | a_same, b_in & ~b_shared
+	elif op == 'or' :
+		keep_a, keep_b = (~a_in & ~a_shared) | a_same, ~b_in & ~b_shared
+	else :
+		keep_a, keep_b = (~a_in & ~a_shared) | a_opposite, b_in & ~b_shared
+		sb, eb = eb, sb # the holes carved by b are turned the other way
+
+	return _assemble(np.concatenate([sa[keep_a], sb[keep_b]]), np.concatenate([ea[keep_a], eb[keep_b]]))
+
+def intersection(a, b) :
+	""" a and b are polygons as (xy, offsets), return a & b as (xy, offsets) """
+	return _overlay(a, b, 'and')
+
+def union(a, b) :
+	""" a | b, see intersection() """
+	return _overlay(a, b, 'or')
+
+def difference(a, b) :
+	""" a - b, see intersection() """
+	return _overlay(a, b, 'sub')
+
+if __name__ == '__main__' :
+
+	import time
+
+	rng = np.random.default_rng(0)
+
+	# parcels: random hexagons of various sizes, clipped by map tiles of a 10 x 10 grid
+	n = 100000
+	theta = np.linspace(0.0, 2.0 * np.pi, 6, endpoint=False) + rng.uniform(0.0, 1.0, (n, 1))
+	r = rng.uniform(0.005, 0.05, (n, 6))
+	c = rng.uniform(0.05, 0.95, (n, 1, 2))
+	xy = (c + r[:, :, None] * np.stack([np.cos(theta), np.sin(theta)], axis=-1)).reshape(-1, 2)
+	offsets = np.arange(0, 6 * n + 1, 6)
+
+	t = time.perf_counter()
+	total = 0.0
+	for x in range(10) :
+		for y in range(10) :
+			u = clip_box(xy, offsets, x / 10.0, y / 10.0, (x + 1) / 10.0, (y + 1) / 10.0)
+			total += ring_area(* u).sum()
+	t = time.perf_counter() - t
+	print("{0} parcels clipped by 100 tiles in {1:.2f} s, {2:.0f} parcels per second, area {3:.6f} / {4:.6f}".format(
+		n, t, 100 * n / t, total, ring_area(xy, offsets).sum()
+	))
+
+	# boolean operations of two concave polygons of 1000 vertices
+	def star(n, center) :
+		theta = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+		r = rng.uniform(0.5, 1.0, n)
+		return np.column_stack([center[0] + r * np.cos(theta), center[1] + r * np.sin(theta)])
+
+	a = as_buffer([star(1000, (0.0, 0.0))])
+	b = as_buffer([star(1000, (0.5, 0.2))])
+	area = dict()
+	for name, op in [("intersection", intersection), ("union", union), ("difference", difference)] :
+		t = time.perf_counter()
+		u = op(a, b)
+		t = time.perf_counter() - t
+		area[name] = ring_area(* u).sum()
+		print("{0:<12s} {1:4d} rings, {2:5d} vertices in {3:.3f} s, area {4:.6f}".format(name, len(u[1]) - 1, len(u[0]), t, area[name]))
+	print("area check:", ring_area(* a).sum() + ring_area(* b).sum() - area["intersection"] - area["union"], ring_area(* a).sum() - area["intersection"] - area["difference"])
+
+	# large outlines, airspace boundaries for example: the cost grows with the number of vertices, not with its square
+	for n in [10000, 100000] :
+		theta = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+		r = 1.0 + 0.05 * np.sin(7.0 * theta) + rng.uniform(0.0, 1e-3, (2, n))
+		a = as_buffer([np.column_stack([r[0] * np.cos(theta), r[0] * np.sin(theta)])])
+		b = as_buffer([np.column_stack([0.5 + r[1] * np.cos(theta), 0.2 + r[1] * np.sin(theta)])])
+		t = time.perf_counter()
+		u = intersection(a, b)
+		t = time.perf_counter() - t
+		print("intersection of two outlines of {0:6d} vertices in {1:.3f} s, area {2:.6f}".format(n, t, ring_area(* u).sum()))
+
+	# a square with a square hole, minus a band across it
+	a = as_buffer([[[0.0, 0.0], [4.0, 0.0], [4.0, 4.0], [0.0, 4.0]], [[1.0, 1.0], [3.0, 1.0], [3.0, 3.0], [1.0, 3.0]]])
+	b = as_buffer([[[-1.0, 1.5], [5.0, 1.5], [5.0, 2.5], [-1.0, 2.5]]])
+	u = difference(a, b)
+	print(u[1], ring_area(* u))
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+"""
+incremental Delaunay triangulation (Bowyer-Watson), and the dual Voronoi cells
+
+the points are inserted in a biased randomized order (BRIO: rounds of doubling size, drawn at random) and sorted
+along a Hilbert curve inside each round, so that the walk which locates each point from the previous one is short
+and the expected cost is O(n log n)
+
+the outside of the convex hull is covered by ghost triangles (a, b, G) sharing the infinite vertex G, one per hull
+edge, so that the points outside the hull are inserted like the others; the conflicts are decided by the robust
+predicates of geometrik.twod.predicate, the duplicated points are skipped
+
+the result is exposed as compact arrays:
+	triangles (T, 3) the indices of the vertices of each triangle, counterclockwise
+	neighbors (T, 3) the triangle opposite to each vertex, -1 on the convex hull
+"""
+
+import numpy as np
+
+from geometrik.twod import Point, Polygon
+from geometrik.twod.predicate import orient2d, incircle
+
+_G = -1 # the infinite vertex
+
+def hilbert_index(x, y, order=16) :
+	""" position along the Hilbert curve of the (N,) integer coordinates x and y, in [0 ; 2**order[ """
+	x = np.asarray(x, dtype=np.int64).copy()
+	y = np.asarray(y, dtype=np.int64).copy()
+	n = 1 << order
+	d = np.zeros_like(x)
+	s = n >> 1
+	while s > 0 :
+		rx = (x & s) > 0
+		ry = (y & s) > 0
+		d += s * s * ((3 * rx) ^ ry)
+		# rotate the quadrant
+		flip = ~ry & rx
+		x = np.where(flip, n - 1 - x, x)
+		y = np.where(flip, n - 1 - y, y)
+		x, y = np.where(ry, x, y), np.where(ry, y, x)
+		s >>= 1
+	return d
+
+def brio_order(p, seed=0, order=16) :
+	""" insertion order of the (N, 2) points p: random rounds, each one being twice larger than the previous one,
+	sorted along a Hilbert curve """
+	p = np.asarray(p, dtype=np.float64)
+	lo = p.min(axis=0)
+	span = (p.max(axis=0) - lo).max()
+	q = np.zeros(p.shape, dtype=np.int64) if span == 0.0 else ((p - lo) * (((1 << order) - 1) / span)).astype(np.int64)
+	h = hilbert_index(q[:, 0], q[:, 1], order)
+
+	u = np.random.default_rng(seed).random(len(p))
+	r = np.floor(-np.log2(np.maximum(u, 1e-300))).astype(np.int64) # the last round holds half of the points, ...
+	return np.lexsort((h, -r))
+
+class Delaunay() :
+
+	def __init__(self, p_lst, seed=0) :
+		""" p_lst is a (N, 2) array, or a sequence of twod.Point """
+		if isinstance(p_lst, np.ndarray) :
+			self.points = np.asarray(p_lst, dtype=np.float64).reshape(-1, 2)
+		else :
+			self.points = np.array([(p.x, p.y) for p in p_lst], dtype=np.float64).reshape(-1, 2)
+
+		if len(self.points) < 3 :
+			raise ValueError("a triangulation needs at least 3 points, not all aligned")
+		self._build(brio_order(self.points, seed))
+		self._export()
+
+	def _build(self, order) :
+		X = self.points[:, 0].tolist()
+		Y = self.points[:, 1].tolist()
+		order = order.tolist()
+
+		# first triangle, from the first three points which are not aligned
+		a = order[0]
+		b = next((i for i in order[1:] if X[i] != X[a] or Y[i] != Y[a]), None)
+		c = None if b is None else next((i for i in order[1:] if orient2d(X[a], Y[a], X[b], Y[b], X[i], Y[i]) != 0), None)
+		if c is None :
+			raise ValueError("all the points are aligned, there is no triangulation")
+		if orient2d(X[a], Y[a], X[b], Y[b], X[c], Y[c]) < 0 :
+			b, c = c, b
+
+		tri = [a, b, c, b, a, _G, c, b, _G, a, c, _G] # flat list, 3 vertices per triangle, counterclockwise
+		nbr = [1, 2, 3, 0, 3, 2, 0, 1, 3, 0, 2, 1] # the triangle across the edge (tri[3t+k], tri[3t+(k+1)%3])
+		free = list() # the slots of the deleted triangles
+		last = 0
+
+		for ip in order :
+			if ip == a or ip == b or ip == c :
+				continue
+			px, py = X[ip], Y[ip]
+
+			# walk toward p, across the edges which have p on their right
+			t = last
+			k0 = 0
+			while True :
+				k0 = (k0 + 1) % 3
+				for k in (k0, (k0 + 1) % 3, (k0 + 2) % 3) :
+					u, v = tri[3*t + k], tri[3*t + (k + 1) % 3]
+					if orient2d(X[u], Y[u], X[v], Y[v], px, py) < 0 :
+						t = nbr[3*t + k]
+						break
+				else :
+					break
+				if tri[3*t + 2] == _G :
+					break
+
+			if tri[3*t + 2] != _G and any(X[w] == px and Y[w] == py for w in tri[3*t:3*t + 3]) :
+				continue # duplicated point
+
+			# the cavity: all the triangles whose circumcircle holds p
+			dead = {t}
+			stack = [t]
+			boundary = list()
+			checked = dict()
+			while stack :
+				s = stack.pop()
+				for k in range(3) :
+					o = nbr[3*s + k]
+					if o in dead :
+						continue
+					is_conflict = checked.get(o)
+					if is_conflict is None :
+						u, v, w = tri[3*o:3*o + 3]
+						if w == _G :
+							r = orient2d(X[u], Y[u], X[v], Y[v], px, py)
+							is_conflict = r > 0 or (r == 0 and (X[u] - px) * (X[v] - px) + (Y[u] - py) * (Y[v] - py) < 0)
+						else :
+							is_conflict = incircle(X[u], Y[u], X[v], Y[v], X[w], Y[w], px, py) > 0
+						checked[o] = is_conflict
+					if is_conflict :
+						dead.add(o)
+						stack.append(o)
+					else :
+						boundary.append((tri[3*s + k], tri[3*s + (k + 1) % 3], o))
+
+			# fill the cavity with a fan of triangles around p
+			free.extend(dead)
+			head = dict() # boundary vertex u -> (new triangle, index of its edge (p, u))
+			tail = dict() # boundary vertex v -> (new triangle, index of its edge (v, p))
+			for u, v, o in boundary :
+				# the triangle (u, v, p), turned so that G is always last; k_out is the index of its edge (u, v)
+				if v == _G :
+					vertex, k_out = (ip, u, _G), 1
+				elif u == _G :
+					vertex, k_out = (v, ip, _G), 2
+				else :
+					vertex, k_out = (u, v, ip), 0
+
+				n = free.pop() if free else len(tri) // 3
+				if 3*n == len(tri) :
+					tri.extend(vertex)
+					nbr.extend((-1, -1, -1))
+				else :
+					tri[3*n:3*n + 3] = vertex
+				if k_out == 0 :
+					last = n
+
+				# the outside triangle, across (u, v)
+				nbr[3*n + k_out] = o
+				for j in range(3) :
+					if tri[3*o + j] == v and tri[3*o + (j + 1) % 3] == u :
+						nbr[3*o + j] = n
+						break
+
+				tail[v] = (n, (k_out + 1) % 3)
+				head[u] = (n, (k_out + 2) % 3)
+
+			for w, (n, k) in head.items() :
+				m, j = tail[w]
+				nbr[3*n + k] = m
+				nbr[3*m + j] = n
+
+		self._tri = tri
+		self._nbr = nbr
+		self._free = set(free)
+
+	def _export(self) :
+		tri = np.array(self._tri, dtype=np.int64).reshape(-1, 3)
+		nbr = np.array(self._nbr, dtype=np.int64).reshape(-1, 3)
+		is_alive = np.ones(len(tri), dtype=bool)
+		is_alive[list(self._free)] = False
+		is_real = is_alive & (tri[:, 2] != _G)
+
+		index = np.full(len(tri), -1, dtype=np.int64)
+		index[is_real] = np.arange(is_real.sum())
+
+		self.triangles = tri[is_real]
+		# from the edge convention (k, k+1) to the opposite vertex convention: the edge opposite to k is (k+1, k+2)
+		self.neighbors = index[nbr[is_real]][:, [1, 2, 0]]
+
+		# one triangle for each vertex, -1 for the duplicated points
+		self.vertex_triangle = np.full(len(self.points), -1, dtype=np.int64)
+		self.vertex_triangle[self.triangles.ravel()] = np.repeat(np.arange(len(self.triangles)), 3)
+
+		del self._tri, self._nbr, self._free
+
+	def __len__(self) :
+		return len(self.triangles)
+
+	def circumcenters(self) :
+		""" (T, 2) centers of the circumcircles of the triangles (see Circle.from_3_Point for a single one) """
+		a, b, c = (self.points[self.triangles[:, i]] for i in range(3))
+		b, c = b - a, c - a
+		d = 2.0 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+		b2, c2 = (b * b).sum(axis=1), (c * c).sum(axis=1)
+		return a + np.stack([
+			(c[:, 1] * b2 - b[:, 1] * c2) / d,
+			(b[:, 0] * c2 - c[:, 0] * b2) / d,
+		], axis=1)
+
+	def triangle_fan(self, i) :
+		""" the triangles around the vertex i, counterclockwise, and True if the fan is closed (i is not on the hull) """
+		t = self.vertex_triangle[i]
+		if t < 0 :
+			return list(), False
+		# rewind to the first triangle of the fan when it is open
+		start = t
+		while True :
+			k = int(np.flatnonzero(self.triangles[t] == i)[0])
+			s = self.neighbors[t, (k + 2) % 3]
+			if s < 0 or s == start :
+				break
+			t = s
+		t_lst = list()
+		first = t
+		while True :
+			t_lst.append(t)
+			k = int(np.flatnonzero(self.triangles[t] == i)[0])
+			t = self.neighbors[t, (k + 1) % 3]
+			if t < 0 :
+				return t_lst, False
+			if t == first :
+				return t_lst, True
+
+	def voronoi_cell(self, i, centers=None) :
+		""" the Voronoi cell of the point i as a twod.Polygon, None when it is unbounded (i on the hull) or duplicated """
+		t_lst, is_closed = self.triangle_fan(i)
+		if not is_closed :
+			return None
+		c = self.circumcenters() if centers is None else centers
+		return Polygon(* [Point(* c[t].tolist()) for t in t_lst])
+
+	def voronoi_cells(self) :
+		""" the Voronoi cells of all the points, see voronoi_cell() """
+		c = self.circumcenters()
+		return [self.voronoi_cell(i, c) for i in range(len(self.points))]
+
+if __name__ == '__main__' :
+
+	import time
+
+	rng = np.random.default_rng(0)
+
+	for n in [1000, 10000, 100000] :
+		p = rng.uniform(0.0, 1.0, (n, 2))
+		t = time.perf_counter()
+		d = Delaunay(p)
+		t = time.perf_counter() - t
+		print("{0:7d} points: {1:7d} triangles in {2:.2f} s, {3:.1f} us per point".format(n, len(d), t, 1e6 * t / n))
+
+	# a grid, full of cocircular points
+	x, y = np.meshgrid(np.arange(100.0), np.arange(100.0))
+	d = Delaunay(np.column_stack([x.ravel(), y.ravel()]))
+	print("grid 100 x 100:", len(d), "triangles")
+
+	d = Delaunay([Point(0.0, 0.0), Point(2.0, 0.0), Point(1.0, 2.0), Point(1.0, 0.7), Point(0.0, 0.0)])
+	print(d.triangles, d.voronoi_cell(3).p_lst)
@@ -4,7 +4,6 @@ import collections
 import math
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 def semi_factorial(n) :
 	# https://en.wikipedia.org/wiki/Double_factorial
@@ -82,6 +81,8 @@ class PolarEarthSlice(Ellipse) :
 		return Ellipse.circumference(self, self.a, self.b)
 
 	def demo(self) :
+		import matplotlib.pyplot as plt
+
 		shape = collections.defaultdict(list)
 		radius = dict()
 
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+"""
+a route made of Segment and Arc, indexed by the distance along it
+
+each element is stored in a row of a growable array (the start point and the direction for a segment, the center,
+radius, start angle and angular span for an arc, as Arc.get_point_at() walks it), next to the cumulative length at
+its start; a position given as a distance is located by binary search on the cumulative lengths, then evaluated in
+its element, for a whole array of distances at once
+"""
+
+import math
+
+import numpy as np
+
+from geometrik.twod import Point, Segment, Arc
+
+_SEGMENT, _ARC = 0, 1
+_BLOCK = 64 # consecutive elements grouped for the nearest point search
+
+def _box_distance(q, lo, hi) :
+	""" distance from the points q to the boxes [lo ; hi], 0.0 inside """
+	gap = np.maximum(np.maximum(lo - q, q - hi), 0.0)
+	return np.hypot(gap[..., 0], gap[..., 1])
+
+class Path() :
+
+	def __init__(self, * e_lst, capacity=16) :
+		""" e_lst are the elements, Segment or Arc, in the order of the route """
+		self.e_lst = list()
+		self._kind = np.zeros(capacity, dtype=np.int8)
+		self._param = np.zeros((capacity, 5), dtype=np.float64)
+		self._cum = np.zeros(capacity + 1, dtype=np.float64)
+		self.extend(e_lst)
+
+	def __len__(self) :
+		return len(self.e_lst)
+
+	@property
+	def length(self) :
+		return float(self._cum[len(self.e_lst)])
+
+	@property
+	def cumulative_length(self) :
+		""" (E + 1,) distance along the path at the start of each element, and at the end """
+		return self._cum[:len(self.e_lst) + 1]
+
+	def _reserve(self, n) :
+		""" grow the arrays by doubling, so that appending is amortized O(1) """
+		capacity = len(self._kind)
+		if n <= capacity :
+			return
+		while capacity < n :
+			capacity *= 2
+		k = len(self.e_lst)
+		kind, param, cum = self._kind, self._param, self._cum
+		self._kind = np.zeros(capacity, dtype=np.int8)
+		self._param = np.zeros((capacity, 5), dtype=np.float64)
+		self._cum = np.zeros(capacity + 1, dtype=np.float64)
+		self._kind[:k] = kind[:k]
+		self._param[:k] = param[:k]
+		self._cum[:k + 1] = cum[:k + 1]
+
+	def append(self, e) :
+		""" add one Segment or Arc at the end of the path """
+		k = len(self.e_lst)
+		self._reserve(k + 1)
+		if isinstance(e, Segment) :
+			ux, uy = e.b.x - e.a.x, e.b.y - e.a.y
+			self._kind[k] = _SEGMENT
+			self._param[k] = (e.a.x, e.a.y, ux, uy, 0.0)
+			length = math.hypot(ux, uy)
+		elif isinstance(e, Arc) :
+			r = 1.0 / abs(e.w)
+			span = e.stop - e.start
+			self._kind[k] = _ARC
+			self._param[k] = (e.c.x, e.c.y, r, e.start, span)
+			length = r * abs(span)
+		else :
+			raise TypeError("a Path is made of Segment and Arc, not {0}".format(type(e).__name__))
+		self._cum[k + 1] = self._cum[k] + length
+		self.e_lst.append(e)
+
+	def extend(self, e_lst) :
+		e_lst = list(e_lst)
+		self._reserve(len(self.e_lst) + len(e_lst))
+		for e in e_lst :
+			self.append(e)
+
+	def locate(self, s) :
+		""" the element holding each distance of the array s, and the position in this element, within [0.0 ; 1.0] """
+		s = np.asarray(s, dtype=np.float64)
+		n = len(self.e_lst)
+		if n == 0 :
+			raise ValueError("the path is empty")
+		cum = self._cum[:n + 1]
+		k = np.clip(np.searchsorted(cum, s, side='right') - 1, 0, n - 1)
+		length = cum[k + 1] - cum[k]
+		with np.errstate(divide='ignore', invalid='ignore') :
+			i = np.where(0.0 < length, (s - cum[k]) / length, 0.0)
+		return k, np.clip(i, 0.0, 1.0)
+
+	def _evaluate(self, k, i) :
+		""" points and unit tangents at the positions i of the elements k """
+		kind, p = self._kind[k], self._param[k]
+		is_arc = (kind == _ARC)
+
+		# segment: a + i.u
+		point = p[..., 0:2] + i[..., None] * p[..., 2:4]
+		with np.errstate(divide='ignore', invalid='ignore') :
+			tangent = p[..., 2:4] / np.hypot(p[..., 2], p[..., 3])[..., None]
+
+		# arc: c + r.(cos m, sin m), with m from start to start + span
+		m = p[..., 3] + i * p[..., 4]
+		cos_m, sin_m = np.cos(m), np.sin(m)
+		arc_point = p[..., 0:2] + p[..., 2:3] * np.stack([cos_m, sin_m], axis=-1)
+		arc_tangent = np.sign(p[..., 4:5]) * np.stack([-sin_m, cos_m], axis=-1)
+
+		point = np.where(is_arc[..., None], arc_point, point)
+		tangent = np.where(is_arc[..., None], arc_tangent, tangent)
+		return point, tangent
+
+	def point_at(self, s) :
+		""" (..., 2) points at the distances s along the path, clamped to its ends """
+		return self._evaluate(* self.locate(s))[0]
+
+	def tangent_at(self, s) :
+		""" (..., 2) unit tangents, in the direction of travel, at the distances s """
+		return self._evaluate(* self.locate(s))[1]
+
+	def get_point_at(self, s) :
+		""" the Point at the distance s, see point_at() """
+		return Point(* self.point_at(s).tolist())
+
+	def _bounding_box(self) :
+		""" (E, 2) lower and upper corners of the elements, the whole circle for an arc """
+		n = len(self.e_lst)
+		p = self._param[:n]
+		is_arc = (self._kind[:n] == _ARC)[:, None]
+		a, b = p[:, 0:2], p[:, 0:2] + p[:, 2:4]
+		r = p[:, 2:3]
+		lo = np.where(is_arc, p[:, 0:2] - r, np.minimum(a, b))
+		hi = np.where(is_arc, p[:, 0:2] + r, np.maximum(a, b))
+		return lo, hi
+
+	def _project(self, q, k) :
+		""" position in the elements k (M,) of the closest points to q (M, 2) """
+		p = self._param[k]
+		span = p[:, 4]
+		with np.errstate(divide='ignore', invalid='ignore') :
+			# segment: the projection, clamped
+			i_seg = np.clip(np.nan_to_num(((q - p[:, 0:2]) * p[:, 2:4]).sum(axis=1) / (p[:, 2:4]**2).sum(axis=1)), 0.0, 1.0)
+			# arc: the angle of the point if it is within the span, else the closest end
+			cq = q - p[:, 0:2]
+			psi = np.mod((np.arctan2(cq[:, 1], cq[:, 0]) - p[:, 3]) * np.sign(span), 2.0 * np.pi)
+			end = np.where(psi - np.abs(span) < 2.0 * np.pi - psi, 1.0, 0.0)
+			i_arc = np.where(psi <= np.abs(span), psi / np.abs(span), end)
+		return np.where(self._kind[k] == _ARC, i_arc, i_seg)
+
+	def _distance(self, q, k) :
+		""" position in the elements k (M,) of the closest points to q (M, 2), and the distance to them """
+		i = self._project(q, k)
+		x, _ = self._evaluate(k, i)
+		return i, np.hypot(* (x - q).T)
+
+	def nearest(self, p, chunk_size=1<<20) :
+		"""
+		for each point of the (N, 2) array p, the closest point of the path:
+		return the distance along the path (N,), the closest point (N, 2) and the distance to it (N,)
+
+		the elements are grouped by blocks of consecutive elements, which are close to each other along a route;
+		the distance to the elements of the closest block bounds the search, then only the blocks and the elements
+		whose bounding box is within this bound are evaluated
+		"""
+		p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+		n = len(self.e_lst)
+		if n == 0 :
+			raise ValueError("the path is empty")
+		cum = self._cum[:n + 1]
+		lo, hi = self._bounding_box()
+		first = np.arange(0, n, _BLOCK)
+		b_lo, b_hi = np.minimum.reduceat(lo, first, axis=0), np.maximum.reduceat(hi, first, axis=0)
+		offset = np.arange(_BLOCK)
+
+		res_s = np.empty(len(p), dtype=np.float64)
+		res_d = np.empty(len(p), dtype=np.float64)
+		step = max(1, chunk_size // len(first))
+		for begin in range(0, len(p), step) :
+			q = p[begin:begin + step]
+			m = len(q)
+			b_gap = _box_distance(q[:, None, :], b_lo, b_hi)
+
+			# the bound: the distance to the closest element of the closest block
+			row = np.repeat(np.arange(m), _BLOCK)
+			k = np.minimum(first[b_gap.argmin(axis=1)][:, None] + offset, n - 1).ravel()
+			upper = self._distance(q[row], k)[1].reshape(m, _BLOCK).min(axis=1)
+
+			# the candidates: the elements of the blocks within the bound, themselves within the bound
+			row, b = np.nonzero(b_gap <= upper[:, None])
+			k = (first[b][:, None] + offset).ravel()
+			row = np.repeat(row, _BLOCK)
+			is_valid = k < n
+			row, k = row[is_valid], k[is_valid]
+			is_near = _box_distance(q[row], lo[k], hi[k]) <= upper[row]
+			row, k = row[is_near], k[is_near]
+
+			i, d = self._distance(q[row], k)
+			order = np.lexsort((d, row))
+			best = order[np.concatenate([[True], row[order][1:] != row[order][:-1]])]
+			res_d[begin:begin + step] = d[best]
+			res_s[begin:begin + step] = cum[k[best]] + i[best] * (cum[k[best] + 1] - cum[k[best]])
+
+		return res_s, self.point_at(res_s), res_d
+
+	def _to_path(self) :
+		if not self.e_lst :
+			return ''
+		return ' '.join([self.e_lst[0]._to_path(True)] + [e._to_path(False) for e in self.e_lst[1:]])
+
+if __name__ == '__main__' :
+
+	import time
+
+	# a route: straight, a quarter turn to the left, straight
+	u = Path(
+		Segment(Point(0.0, 0.0), Point(10.0, 0.0)),
+		Arc(Point(10.0, 5.0), 0.2, -math.pi / 2.0, 0.0),
+		Segment(Point(15.0, 5.0), Point(15.0, 20.0)),
+	)
+	print(u.length, u.point_at([0.0, 5.0, 10.0 + 5.0 * math.pi / 4.0, 30.0]), u.tangent_at(12.0))
+	print(u.nearest([[5.0, 1.0], [20.0, 0.0], [16.0, 18.0]]))
+
+	# a long route of 10^4 elements, built incrementally
+	rng = np.random.default_rng(0)
+	v = Path()
+	p, heading = Point(0.0, 0.0), 0.0
+	t = time.perf_counter()
+	for n in range(10000) :
+		if n % 2 == 0 :
+			q = Point(p.x + 100.0 * math.cos(heading), p.y + 100.0 * math.sin(heading))
+			v.append(Segment(p, q))
+		else :
+			turn = rng.uniform(-1.0, 1.0)
+			w = math.copysign(1.0 / 500.0, turn)
+			c = Point(p.x - math.sin(heading) / w, p.y + math.cos(heading) / w)
+			start = math.atan2(p.y - c.y, p.x - c.x)
+			v.append(Arc(c, w, start, start + turn))
+			heading += turn
+			q = Point(c.x + math.cos(start + turn) / abs(w), c.y + math.sin(start + turn) / abs(w))
+		p = q
+	t = time.perf_counter() - t
+	print("{0} elements appended in {1:.3f} s, {2:.1f} km".format(len(v), t, v.length / 1000.0))
+
+	s = rng.uniform(0.0, v.length, 1000000)
+	t = time.perf_counter()
+	x = v.point_at(s)
+	g = v.tangent_at(s)
+	t = time.perf_counter() - t
+	print("{0:10.0f} distance queries per second (point and tangent)".format(len(s) / t))
+
+	q = x[:1000] + rng.normal(0.0, 20.0, (1000, 2))
+	t = time.perf_counter()
+	s_near, x_near, d = v.nearest(q)
+	t = time.perf_counter() - t
+	print("{0:10.0f} nearest point queries per second, mean distance {1:.1f} m".format(len(q) / t, d.mean()))
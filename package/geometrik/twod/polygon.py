@@ -10,6 +10,11 @@ class Polygon() :
 	def area(self) :
 		return sum(self._trapezoid_area(self.p_lst[i], self.p_lst[(i + 1) % len(self.p_lst)]) for i in range(len(self.p_lst)))
 
+	def triangulate(self) :
+		""" (T, 3) indices of the triangles into p_lst, see geometrik.twod.triangulate """
+		from geometrik.twod.triangulate import triangulate
+		return triangulate(self.p_lst)
+
 if __name__ == '__main__' :
 
 	right_lst = [
@@ -37,4 +42,5 @@ if __name__ == '__main__' :
 	]
 
 	u = Polygon(* right_lst)
-	print(u.area())
\ No newline at end of file
+	print(u.area())
+	print(Polygon(* one_lst).triangulate())
\ No newline at end of file
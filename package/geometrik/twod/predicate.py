@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""
+robust geometric predicates: orientation of three points and position of a point relative to a circle
+
+the determinant is first evaluated with floats, its sign is trusted when its magnitude exceeds a bound of the
+rounding error (the static filters of J. R. Shewchuk, Adaptive precision floating-point arithmetic and fast
+robust geometric predicates, 1997); otherwise, which is rare, it is evaluated again exactly, the floats being
+turned into integers scaled by a common power of 2 (as Fraction would, without normalizing each intermediate result)
+
+each predicate returns +1, -1 or 0, the batched versions take (N, 2) arrays and return an int8 array,
+the number of fast and exact evaluations is counted in stats
+"""
+
+import collections
+
+import numpy as np
+
+_eps = 2.0**-53 # half of the machine epsilon, the relative error of one rounding
+_ccw_bound = (3.0 + 16.0 * _eps) * _eps
+_icc_bound = (10.0 + 96.0 * _eps) * _eps
+
+stats = collections.Counter()
+
+def _sign(x) :
+	return 1 if x > 0 else (-1 if x < 0 else 0)
+
+def _as_integers(* v_lst) :
+	""" the floats of v_lst as exact integers, all multiplied by the same power of 2 """
+	r_lst = [float(v).as_integer_ratio() for v in v_lst]
+	d = max(den for num, den in r_lst)
+	return [num * (d // den) for num, den in r_lst]
+
+def _orient2d_exact(ax, ay, bx, by, cx, cy) :
+	ax, ay, bx, by, cx, cy = _as_integers(ax, ay, bx, by, cx, cy)
+	return _sign((ax - cx) * (by - cy) - (ay - cy) * (bx - cx))
+
+def _incircle_exact(ax, ay, bx, by, cx, cy, dx, dy) :
+	ax, ay, bx, by, cx, cy, dx, dy = _as_integers(ax, ay, bx, by, cx, cy, dx, dy)
+	adx, ady = ax - dx, ay - dy
+	bdx, bdy = bx - dx, by - dy
+	cdx, cdy = cx - dx, cy - dy
+	return _sign(
+		(adx * adx + ady * ady) * (bdx * cdy - cdx * bdy) +
+		(bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy) +
+		(cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady)
+	)
+
+def is_sign_certain(l, r) :
+	""" True if the float l - r, l and r being products of two floats, has the sign of the exact difference """
+	return abs(l - r) > _ccw_bound * (abs(l) + abs(r))
+
+def orient2d(ax, ay, bx, by, cx, cy) :
+	""" +1 if a, b, c turn counterclockwise (c on the left of a -> b), -1 if clockwise, 0 if they are aligned """
+	l = (ax - cx) * (by - cy)
+	r = (ay - cy) * (bx - cx)
+	if is_sign_certain(l, r) :
+		stats['orient2d_fast'] += 1
+		return _sign(l - r)
+	stats['orient2d_exact'] += 1
+	return _orient2d_exact(ax, ay, bx, by, cx, cy)
+
+def incircle(ax, ay, bx, by, cx, cy, dx, dy) :
+	""" +1 if d is inside the circle through a, b, c (counterclockwise), -1 if outside, 0 if on it """
+	adx, ady = ax - dx, ay - dy
+	bdx, bdy = bx - dx, by - dy
+	cdx, cdy = cx - dx, cy - dy
+
+	bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+	cdxady, adxcdy = cdx * ady, adx * cdy
+	adxbdy, bdxady = adx * bdy, bdx * ady
+	alift = adx * adx + ady * ady
+	blift = bdx * bdx + bdy * bdy
+	clift = cdx * cdx + cdy * cdy
+
+	det = alift * (bdxcdy - cdxbdy) + blift * (cdxady - adxcdy) + clift * (adxbdy - bdxady)
+	permanent = (
+		(abs(bdxcdy) + abs(cdxbdy)) * alift +
+		(abs(cdxady) + abs(adxcdy)) * blift +
+		(abs(adxbdy) + abs(bdxady)) * clift
+	)
+	if abs(det) > _icc_bound * permanent :
+		stats['incircle_fast'] += 1
+		return _sign(det)
+	stats['incircle_exact'] += 1
+	return _incircle_exact(ax, ay, bx, by, cx, cy, dx, dy)
+
+def _as_columns(* p_lst) :
+	p_lst = np.broadcast_arrays(* [np.asarray(p, dtype=np.float64) for p in p_lst])
+	return [p.reshape(-1, 2) for p in p_lst], p_lst[0].shape[:-1]
+
+def orient2d_array(a, b, c) :
+	""" orient2d() for (N, 2) arrays of points a, b and c (broadcast together) """
+	(a, b, c), shape = _as_columns(a, b, c)
+	l = (a[:, 0] - c[:, 0]) * (b[:, 1] - c[:, 1])
+	r = (a[:, 1] - c[:, 1]) * (b[:, 0] - c[:, 0])
+	det = l - r
+	res = np.sign(det).astype(np.int8)
+
+	uncertain = np.flatnonzero(~(np.abs(det) > _ccw_bound * (np.abs(l) + np.abs(r))))
+	for i in uncertain.tolist() :
+		res[i] = _orient2d_exact(* a[i].tolist(), * b[i].tolist(), * c[i].tolist())
+
+	stats['orient2d_fast'] += len(res) - len(uncertain)
+	stats['orient2d_exact'] += len(uncertain)
+	return res.reshape(shape)
+
+def incircle_array(a, b, c, d) :
+	""" incircle() for (N, 2) arrays of points a, b, c and d (broadcast together) """
+	(a, b, c, d), shape = _as_columns(a, b, c, d)
+	ad, bd, cd = a - d, b - d, c - d
+
+	bdxcdy, cdxbdy = bd[:, 0] * cd[:, 1], cd[:, 0] * bd[:, 1]
+	cdxady, adxcdy = cd[:, 0] * ad[:, 1], ad[:, 0] * cd[:, 1]
+	adxbdy, bdxady = ad[:, 0] * bd[:, 1], bd[:, 0] * ad[:, 1]
+	alift = (ad * ad).sum(axis=1)
+	blift = (bd * bd).sum(axis=1)
+	clift = (cd * cd).sum(axis=1)
+
+	det = alift * (bdxcdy - cdxbdy) + blift * (cdxady - adxcdy) + clift * (adxbdy - bdxady)
+	permanent = (
+		(np.abs(bdxcdy) + np.abs(cdxbdy)) * alift +
+		(np.abs(cdxady) + np.abs(adxcdy)) * blift +
+		(np.abs(adxbdy) + np.abs(bdxady)) * clift
+	)
+	res = np.sign(det).astype(np.int8)
+
+	uncertain = np.flatnonzero(~(np.abs(det) > _icc_bound * permanent))
+	for i in uncertain.tolist() :
+		res[i] = _incircle_exact(* a[i].tolist(), * b[i].tolist(), * c[i].tolist(), * d[i].tolist())
+
+	stats['incircle_fast'] += len(res) - len(uncertain)
+	stats['incircle_exact'] += len(uncertain)
+	return res.reshape(shape)
+
+def hit_rate(name) :
+	""" share of the evaluations of the predicate name which were settled by the float filter """
+	fast, exact = stats[name + '_fast'], stats[name + '_exact']
+	return fast / (fast + exact) if fast + exact else None
+
+if __name__ == '__main__' :
+
+	import time
+
+	rng = np.random.default_rng(0)
+
+	n = 1000000
+	m = 100000
+
+	# points spread at random, on a grid (exact zeros are frequent), nearly aligned or nearly cocircular
+	t = rng.uniform(0.0, 1.0, (3, m, 1))
+	theta = rng.uniform(0.0, 2.0 * np.pi, (4, m))
+	set_lst = [
+		("random", rng.uniform(-1.0, 1.0, (4, n, 2))),
+		("grid", rng.integers(0, 8, (4, m, 2)).astype(np.float64)),
+		("degenerate", (
+			rng.uniform(-1.0, 1.0, (1, 2)) + t * rng.uniform(-1.0, 1.0, (1, 2)),
+			np.stack([np.cos(theta), np.sin(theta)], axis=-1)
+		)),
+	]
+
+	for name, p in set_lst :
+		p_orient, p_circle = (p[:3], p) if name != "degenerate" else p
+		stats.clear()
+
+		t0 = time.perf_counter()
+		orient2d_array(* p_orient)
+		t1 = time.perf_counter()
+		incircle_array(* p_circle)
+		t2 = time.perf_counter()
+
+		print("{0:<11s} orient2d {1:10.0f} per second, fast path {2:7.2%} | incircle {3:10.0f} per second, fast path {4:7.2%}".format(
+			name, len(p_orient[0]) / (t1 - t0), hit_rate('orient2d'), len(p_circle[0]) / (t2 - t1), hit_rate('incircle')
+		))
+
+	k = 20000
+	a, b, c = set_lst[0][1][:3, :k].tolist()
+	t0 = time.perf_counter()
+	for i in range(k) :
+		orient2d(* a[i], * b[i], * c[i])
+	t1 = time.perf_counter()
+	for i in range(k) :
+		_orient2d_exact(* a[i], * b[i], * c[i])
+	t2 = time.perf_counter()
+	print("scalar orient2d {0:10.0f} per second, always exact {1:10.0f} per second".format(k / (t1 - t0), k / (t2 - t1)))
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+
+"""
+triangulation of a simple polygon, with holes, by ear clipping
+
+the vertices are kept in a circular doubly linked list; the holes are first merged into the outer ring by a
+bridge toward a visible vertex. Plain ear clipping checks each candidate ear against all the remaining vertices,
+which is quadratic: above 80 vertices, the vertices are also linked in the order of their z-order (Morton) code,
+and only those whose code lies between the codes of the corners of the bounding box of the ear are checked.
+When no ear is left (degenerate or self-intersecting input), the duplicated and aligned vertices are removed,
+then the small local self-intersections are cured, and at last the polygon is split along a valid diagonal.
+(the same steps as the earcut library by V. Agafonkin, Mapbox)
+
+the polygon is given as a (N, 2) buffer of coordinates: the outer ring, followed by the holes, each one starting
+at the index given in hole_start; the result is a (T, 3) array of indices into this buffer, counterclockwise
+"""
+
+import bisect
+
+import numpy as np
+
+class _Node() :
+
+	__slots__ = ['i', 'x', 'y', 'prev', 'next', 'z', 'is_reflex', 'steiner']
+
+	def __init__(self, i, x, y) :
+		self.i = i # index of the vertex in the buffer
+		self.x = x
+		self.y = y
+		self.prev = None
+		self.next = None
+		self.z = 0
+		self.is_reflex = False
+		self.steiner = False
+
+def _area(p, q, r) :
+	""" twice the area of the triangle (p, q, r), negative when it is counterclockwise """
+	return (q.y - p.y) * (r.x - q.x) - (q.x - p.x) * (r.y - q.y)
+
+def _equals(p, q) :
+	return p.x == q.x and p.y == q.y
+
+def _sign(x) :
+	return 1 if x > 0 else (-1 if x < 0 else 0)
+
+def _on_segment(p, q, r) :
+	""" q, aligned with p and r, lies between them """
+	return min(p.x, r.x) <= q.x <= max(p.x, r.x) and min(p.y, r.y) <= q.y <= max(p.y, r.y)
+
+def _intersects(p1, q1, p2, q2) :
+	o1 = _sign(_area(p1, q1, p2))
+	o2 = _sign(_area(p1, q1, q2))
+	o3 = _sign(_area(p2, q2, p1))
+	o4 = _sign(_area(p2, q2, q1))
+	if o1 != o2 and o3 != o4 :
+		return True
+	return (
+		(o1 == 0 and _on_segment(p1, p2, q1)) or (o2 == 0 and _on_segment(p1, q2, q1)) or
+		(o3 == 0 and _on_segment(p2, p1, q2)) or (o4 == 0 and _on_segment(p2, q1, q2))
+	)
+
+def _point_in_triangle(ax, ay, bx, by, cx, cy, px, py) :
+	return (
+		(cx - px) * (ay - py) >= (ax - px) * (cy - py) and
+		(ax - px) * (by - py) >= (bx - px) * (ay - py) and
+		(bx - px) * (cy - py) >= (cx - px) * (by - py)
+	)
+
+def _insert_node(i, x, y, last) :
+	p = _Node(i, x, y)
+	if last is None :
+		p.prev = p
+		p.next = p
+	else :
+		p.next = last.next
+		p.prev = last
+		last.next.prev = p
+		last.next = p
+	return p
+
+def _remove_node(p) :
+	p.next.prev = p.prev
+	p.prev.next = p.next
+	p.is_reflex = False
+
+def _linked_list(X, Y, start, stop, is_ccw) :
+	""" the ring [start ; stop[ as a circular list, turned counterclockwise (or clockwise for a hole) """
+	area = 0.0
+	j = stop - 1
+	for i in range(start, stop) :
+		area += (X[j] - X[i]) * (Y[i] + Y[j])
+		j = i
+	last = None
+	i_lst = range(start, stop) if is_ccw == (area > 0.0) else range(stop - 1, start - 1, -1)
+	for i in i_lst :
+		last = _insert_node(i, X[i], Y[i], last)
+	if last is not None and _equals(last, last.next) :
+		_remove_node(last)
+		last = last.next
+	return last
+
+def _filter_points(start, stop=None) :
+	""" remove the duplicated and the aligned vertices """
+	if start is None :
+		return start
+	if stop is None :
+		stop = start
+	p = start
+	while True :
+		again = False
+		if not p.steiner and (_equals(p, p.next) or _area(p.prev, p, p.next) == 0) :
+			_remove_node(p)
+			p = stop = p.prev
+			if p is p.next :
+				break
+			again = True
+		else :
+			p = p.next
+		if not again and p is stop :
+			break
+	return stop
+
+def _z_order(x, y, min_x, min_y, inv_size) :
+	""" interleave the bits of the coordinates, scaled to 15 bits """
+	x = int((x - min_x) * inv_size)
+	y = int((y - min_y) * inv_size)
+	x = (x | (x << 8)) & 0x00FF00FF
+	x = (x | (x << 4)) & 0x0F0F0F0F
+	x = (x | (x << 2)) & 0x33333333
+	x = (x | (x << 1)) & 0x55555555
+	y = (y | (y << 8)) & 0x00FF00FF
+	y = (y | (y << 4)) & 0x0F0F0F0F
+	y = (y | (y << 2)) & 0x33333333
+	y = (y | (y << 1)) & 0x55555555
+	return x | (y << 1)
+
+def _is_ear(ear) :
+	a, b, c = ear.prev, ear, ear.next
+	if _area(a, b, c) >= 0 :
+		return False # reflex
+
+	ax, ay, bx, by, cx, cy = a.x, a.y, b.x, b.y, c.x, c.y
+	x0, x1 = min(ax, bx, cx), max(ax, bx, cx)
+	y0, y1 = min(ay, by, cy), max(ay, by, cy)
+
+	p = c.next
+	while p is not a :
+		if (
+			x0 <= p.x <= x1 and y0 <= p.y <= y1 and
+			_point_in_triangle(ax, ay, bx, by, cx, cy, p.x, p.y) and _area(p.prev, p, p.next) >= 0
+		) :
+			return False
+		p = p.next
+	return True
+
+class _ReflexIndex() :
+	"""
+	the reflex (and flat) vertices of a ring, sorted by z-order code: only them can lie inside an ear, and clipping
+	an ear only closes the angles of its neighbours, so that the index shrinks as the triangulation goes on
+	"""
+
+	def __init__(self, start, min_x, min_y, inv_size) :
+		self.min_x, self.min_y, self.inv_size = min_x, min_y, inv_size
+		n_lst = list()
+		p = start
+		while True :
+			p.is_reflex = _area(p.prev, p, p.next) >= 0
+			if p.is_reflex :
+				if p.z == 0 :
+					p.z = _z_order(p.x, p.y, min_x, min_y, inv_size)
+				n_lst.append(p)
+			p = p.next
+			if p is start :
+				break
+		self._set(n_lst)
+
+	def _set(self, n_lst) :
+		n_lst.sort(key=lambda n : n.z)
+		self.n_lst = n_lst
+		self.z_lst = [n.z for n in n_lst]
+		self.dead = 0
+
+	def update(self, p) :
+		""" p lost a neighbour, False if it became reflex (which a simple ring does not allow) """
+		is_reflex = _area(p.prev, p, p.next) >= 0
+		if is_reflex :
+			return p.is_reflex
+		if p.is_reflex :
+			p.is_reflex = False
+			self.dead += 1
+			if len(self.n_lst) < 2 * self.dead :
+				self._set([n for n in self.n_lst if n.is_reflex])
+		return True
+
+	def is_ear(self, ear) :
+		a, b, c = ear.prev, ear, ear.next
+		if _area(a, b, c) >= 0 :
+			return False # reflex
+
+		ax, ay, bx, by, cx, cy = a.x, a.y, b.x, b.y, c.x, c.y
+		x0, x1 = min(ax, bx, cx), max(ax, bx, cx)
+		y0, y1 = min(ay, by, cy), max(ay, by, cy)
+
+		# the codes of the points of the bounding box lie between the codes of its corners
+		lo = bisect.bisect_left(self.z_lst, _z_order(x0, y0, self.min_x, self.min_y, self.inv_size))
+		hi = bisect.bisect_right(self.z_lst, _z_order(x1, y1, self.min_x, self.min_y, self.inv_size))
+		for p in self.n_lst[lo:hi] :
+			if (
+				p.is_reflex and x0 <= p.x <= x1 and y0 <= p.y <= y1 and p is not a and p is not c and
+				_point_in_triangle(ax, ay, bx, by, cx, cy, p.x, p.y) and _area(p.prev, p, p.next) >= 0
+			) :
+				return False
+		return True
+
+def _locally_inside(a, b) :
+	""" the diagonal (a, b) starts toward the inside of the polygon, at a """
+	if _area(a.prev, a, a.next) < 0 :
+		return _area(a, b, a.next) >= 0 and _area(a, a.prev, b) >= 0
+	return _area(a, b, a.prev) < 0 or _area(a, a.next, b) < 0
+
+def _middle_inside(a, b) :
+	""" the middle of the diagonal (a, b) is inside the polygon """
+	px, py = (a.x + b.x) / 2.0, (a.y + b.y) / 2.0
+	is_inside = False
+	p = a
+	while True :
+		q = p.next
+		if (p.y > py) != (q.y > py) and q.y != p.y and px < (q.x - p.x) * (py - p.y) / (q.y - p.y) + p.x :
+			is_inside = not is_inside
+		p = q
+		if p is a :
+			return is_inside
+
+def _intersects_polygon(a, b) :
+	p = a
+	while True :
+		q = p.next
+		if p.i != a.i and q.i != a.i and p.i != b.i and q.i != b.i and _intersects(p, q, a, b) :
+			return True
+		p = q
+		if p is a :
+			return False
+
+def _is_valid_diagonal(a, b) :
+	if a.next.i == b.i or a.prev.i == b.i or _intersects_polygon(a, b) :
+		return False
+	if _locally_inside(a, b) and _locally_inside(b, a) and _middle_inside(a, b) :
+		return _area(a.prev, a, b.prev) != 0 or _area(a, b.prev, b) != 0 # does not create opposite-facing sectors
+	# a zero-length diagonal between the two copies of a vertex
+	return _equals(a, b) and _area(a.prev, a, a.next) > 0 and _area(b.prev, b, b.next) > 0
+
+def _split_polygon(a, b) :
+	""" link a and b by a diagonal, splitting the ring in two (or merging two rings), return the copy of b """
+	a2 = _Node(a.i, a.x, a.y)
+	b2 = _Node(b.i, b.x, b.y)
+	an = a.next
+	bp = b.prev
+
+	a.next = b
+	b.prev = a
+	a2.next = an
+	an.prev = a2
+	b2.next = a2
+	a2.prev = b2
+	bp.next = b2
+	b2.prev = bp
+	return b2
+
+def _cure_local_intersections(start, t_lst) :
+	""" clip the triangle (a, p, b) when the edges (a, p) and (p.next, b) cross """
+	p = start
+	while True :
+		a = p.prev
+		b = p.next.next
+		if not _equals(a, b) and _intersects(a, p, p.next, b) and _locally_inside(a, b) and _locally_inside(b, a) :
+			t_lst.append((a.i, p.i, b.i))
+			_remove_node(p)
+			_remove_node(p.next)
+			p = start = b
+		p = p.next
+		if p is start :
+			break
+	return _filter_points(p)
+
+def _split_earcut(start, t_lst, grid) :
+	""" split the polygon along a valid diagonal, and triangulate both sides """
+	a = start
+	while True :
+		b = a.next.next
+		while b is not a.prev :
+			if a.i != b.i and _is_valid_diagonal(a, b) :
+				c = _split_polygon(a, b)
+				a = _filter_points(a, a.next)
+				c = _filter_points(c, c.next)
+				_earcut_linked(a, t_lst, grid)
+				_earcut_linked(c, t_lst, grid)
+				return
+			b = b.next
+		a = a.next
+		if a is start :
+			return
+
+def _earcut_linked(ear, t_lst, grid, stage=0) :
+	""" grid is (min_x, min_y, inv_size) for the z-order codes, None to check the ears against all the vertices """
+	if ear is None :
+		return
+	index = None if grid is None else _ReflexIndex(ear, * grid)
+
+	stop = ear
+	while ear.prev is not ear.next :
+		prev = ear.prev
+		nxt = ear.next
+
+		if _is_ear(ear) if index is None else index.is_ear(ear) :
+			t_lst.append((prev.i, ear.i, nxt.i))
+			_remove_node(ear)
+			if index is not None and not (index.update(prev) and index.update(nxt)) :
+				index = _ReflexIndex(nxt, * grid)
+			# skip the next vertex, it leads to less sliver triangles
+			ear = nxt.next
+			stop = nxt.next
+			continue
+
+		ear = nxt
+		if ear is stop :
+			# no ear found after a full turn
+			if stage == 0 :
+				_earcut_linked(_filter_points(ear), t_lst, grid, 1)
+			elif stage == 1 :
+				ear = _cure_local_intersections(_filter_points(ear), t_lst)
+				_earcut_linked(ear, t_lst, grid, 2)
+			else :
+				_split_earcut(ear, t_lst, grid)
+			break
+
+def _leftmost(start) :
+	p = start
+	leftmost = start
+	while True :
+		if p.x < leftmost.x or (p.x == leftmost.x and p.y < leftmost.y) :
+			leftmost = p
+		p = p.next
+		if p is start :
+			return leftmost
+
+def _sector_contains_sector(m, p) :
+	return _area(m.prev, m, p.prev) < 0 and _area(p.next, m, m.next) < 0
+
+def _find_hole_bridge(hole, outer) :
+	""" a vertex of the outer ring which is visible from the leftmost vertex of the hole """
+	hx, hy = hole.x, hole.y
+	qx = -np.inf
+	m = None
+
+	# the closest crossing of the ray toward -x with an edge, and the endpoint of this edge with the largest x
+	p = outer
+	while True :
+		q = p.next
+		if q.y <= hy <= p.y and q.y != p.y :
+			x = p.x + (hy - p.y) * (q.x - p.x) / (q.y - p.y)
+			if qx < x <= hx :
+				qx = x
+				m = p if p.x < q.x else q
+				if x == hx :
+					return m # the hole touches the outer ring
+		p = q
+		if p is outer :
+			break
+	if m is None :
+		return None
+
+	# the vertices inside the triangle (hole, crossing, m) may hide m, keep the one with the smallest angle to the ray
+	stop = m
+	mx, my = m.x, m.y
+	tan_min = np.inf
+	p = m
+	while True :
+		if hx >= p.x >= mx and hx != p.x and _point_in_triangle(hx if hy < my else qx, hy, mx, my, qx if hy < my else hx, hy, p.x, p.y) :
+			tan = abs(hy - p.y) / (hx - p.x)
+			if _locally_inside(p, hole) and (
+				tan < tan_min or (tan == tan_min and (p.x > m.x or (p.x == m.x and _sector_contains_sector(m, p))))
+			) :
+				m = p
+				tan_min = tan
+		p = p.next
+		if p is stop :
+			return m
+
+def _eliminate_holes(X, Y, hole_start, outer) :
+	""" merge the holes into the outer ring, from the leftmost one """
+	stop_lst = list(hole_start[1:]) + [len(X)]
+	queue = list()
+	for start, stop in zip(hole_start, stop_lst) :
+		ring = _linked_list(X, Y, start, stop, False)
+		if ring is None :
+			continue
+		if ring is ring.next :
+			ring.steiner = True
+		queue.append(_leftmost(ring))
+	queue.sort(key=lambda n : n.x)
+
+	for hole in queue :
+		bridge = _find_hole_bridge(hole, outer)
+		if bridge is None :
+			continue
+		bridge_reverse = _split_polygon(bridge, hole)
+		_filter_points(bridge_reverse, bridge_reverse.next)
+		outer = _filter_points(bridge, bridge.next)
+	return outer
+
+def triangulate(p, hole_start=None) :
+	"""
+	p is a (N, 2) array (or a sequence of (x, y)), hole_start the index in p of the first vertex of each hole;
+	return a (T, 3) int64 array of indices into p, N - 2 + 2 * holes triangles for a simple polygon
+	"""
+	p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+	X = p[:, 0].tolist()
+	Y = p[:, 1].tolist()
+	hole_start = list() if hole_start is None else [int(i) for i in hole_start]
+
+	outer_stop = hole_start[0] if hole_start else len(X)
+	outer = _linked_list(X, Y, 0, outer_stop, True)
+	if outer is None or outer.next is outer.prev :
+		return np.zeros((0, 3), dtype=np.int64)
+	if hole_start :
+		outer = _eliminate_holes(X, Y, hole_start, outer)
+
+	# the z-order hash is only worth its cost on large polygons
+	grid = None
+	if 80 < len(X) :
+		min_x, min_y = min(X[:outer_stop]), min(Y[:outer_stop])
+		size = max(max(X[:outer_stop]) - min_x, max(Y[:outer_stop]) - min_y)
+		if size != 0.0 :
+			grid = (min_x, min_y, 32767.0 / size)
+
+	t_lst = list()
+	_earcut_linked(outer, t_lst, grid)
+	return np.array(t_lst, dtype=np.int64).reshape(-1, 3)
+
+def triangle_area(p, t) :
+	""" (T,) signed areas of the triangles t over the vertices p, positive when counterclockwise """
+	p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+	a, b, c = p[t[:, 0]], p[t[:, 1]], p[t[:, 2]]
+	return 0.5 * ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+
+if __name__ == '__main__' :
+
+	import time
+
+	def ring_area(p) :
+		x, y = p[:, 0], p[:, 1]
+		return 0.5 * (x * np.roll(y, -1) - np.roll(x, -1) * y).sum()
+
+	def star(n, r0, r1, rng, center=(0.0, 0.0)) :
+		""" a non convex polygon with n vertices, counterclockwise """
+		theta = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+		r = rng.uniform(r0, r1, n)
+		return np.column_stack([center[0] + r * np.cos(theta), center[1] + r * np.sin(theta)])
+
+	def coast(n, rng) :
+		""" a polygon whose radius follows a random walk, closer to the outline of a real region """
+		theta = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+		r = 1.0 + 0.3 * np.sin(theta / 2.0) * np.cumsum(rng.normal(size=n)) / np.sqrt(n)
+		return np.column_stack([r * np.cos(theta), r * np.sin(theta)])
+
+	rng = np.random.default_rng(0)
+
+	# the comb (random radius in [0.5 ; 1]) is the hard case: its thin ears have large bounding boxes
+	for n in [100, 1000, 10000, 100000] :
+		for name, p in [("coast", coast(n, rng)), ("comb", star(n, 0.5, 1.0, rng))] :
+			if name == "comb" and 10000 < n :
+				continue
+			t0 = time.perf_counter()
+			t = triangulate(p)
+			t0 = time.perf_counter() - t0
+			err = abs(triangle_area(p, t).sum() - ring_area(p)) / ring_area(p)
+			print("{0:<6s} {1:7d} vertices: {2:7d} triangles in {3:7.3f} s, {4:5.1f} us per vertex, area error {5:.1e}".format(
+				name, n, len(t), t0, 1e6 * t0 / n, err
+			))
+
+	# a square with holes: the buffer holds the outer ring, then each hole, clockwise
+	n = 10000
+	outer = np.array([[-10.0, -10.0], [10.0, -10.0], [10.0, 10.0], [-10.0, 10.0]])
+	hole_lst = [star(n // 16, 0.3, 0.9, rng, (x, y))[::-1] for x in range(-6, 7, 4) for y in range(-6, 7, 4)]
+	p = np.concatenate([outer] + hole_lst)
+	hole_start = np.cumsum([len(outer)] + [len(h) for h in hole_lst[:-1]])
+	t0 = time.perf_counter()
+	t = triangulate(p, hole_start)
+	t0 = time.perf_counter() - t0
+	expected = ring_area(outer) + sum(ring_area(h) for h in hole_lst)
+	print("{0:7d} vertices, {1} holes: {2:7d} triangles in {3:7.3f} s, area error {4:.1e}".format(
+		len(p), len(hole_lst), len(t), t0, abs(triangle_area(p, t).sum() - expected) / expected
+	))
+
+	print(triangulate([[0.0, 0.0], [2.0, 0.0], [2.0, 2.0], [1.0, 1.0], [0.0, 2.0]]))
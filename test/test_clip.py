@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+from geometrik.twod import Point, Polygon
+from geometrik.twod.clip import (
+	as_buffer, as_polygons, ring_area, is_inside, clip_convex, clip_box,
+	segment_intersections, intersection, union, difference
+)
+
+def square(x0, y0, x1, y1) :
+	return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+def star(n, center, seed) :
+	rng = np.random.default_rng(seed)
+	theta = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+	r = rng.uniform(0.5, 1.0, n)
+	return np.column_stack([center[0] + r * np.cos(theta), center[1] + r * np.sin(theta)])
+
+empty = (np.zeros((0, 2)), np.zeros(1, dtype=np.int64))
+
+operand_lst = [
+	("identical", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(0, 0, 2, 2)])),
+	("reversed", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(0, 0, 2, 2)[::-1]])),
+	("shared edge", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(2, 0, 4, 2)])),
+	("shared part of an edge", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(2, 1, 3, 3)])),
+	("overlap", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(1, 1, 3, 3)])),
+	("nested", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(0.5, 0.5, 1, 1)])),
+	("nested on an edge", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(0, 0.5, 1, 1)])),
+	("disjoint", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(5, 5, 6, 6)])),
+	("touching corner", as_buffer([square(0, 0, 2, 2)]), as_buffer([square(2, 2, 3, 3)])),
+	("hole", as_buffer([square(0, 0, 4, 4), square(1, 1, 3, 3)]), as_buffer([[[-1, 1.5], [5, 1.5], [5, 2.5], [-1, 2.5]]])),
+	("hole on a hole", as_buffer([square(0, 0, 4, 4), square(1, 1, 3, 3)]), as_buffer([square(1, 1, 3, 3)])),
+	("empty ring", as_buffer([square(0, 0, 2, 2)]), (np.array(square(1, 1, 3, 3), dtype=np.float64), np.array([0, 0, 4]))),
+	("empty operand", as_buffer([square(0, 0, 2, 2)]), empty),
+	("stars", as_buffer([star(200, (0.0, 0.0), 0)]), as_buffer([star(200, (0.5, 0.2), 1)])),
+]
+
+def is_far(p, xy, offsets, eps=1e-6) :
+	""" the points which are not within eps of an edge, where the sampling is not decisive """
+	if len(xy) == 0 :
+		return np.ones(len(p), dtype=bool)
+	a = xy
+	b = np.concatenate([np.roll(xy[s:e], -1, axis=0) for s, e in zip(offsets[:-1], offsets[1:])])
+	ab = b - a
+	t = np.clip(((p[:, None, :] - a) * ab).sum(axis=2) / np.maximum((ab * ab).sum(axis=1), 1e-300), 0.0, 1.0)
+	d = np.hypot(* (a + t[:, :, None] * ab - p[:, None, :]).transpose(2, 0, 1))
+	return (d > eps).all(axis=1)
+
+@pytest.mark.parametrize('name, a, b', operand_lst, ids=[o[0] for o in operand_lst])
+@pytest.mark.parametrize('op, rule', [
+	(intersection, lambda x, y : x & y),
+	(union, lambda x, y : x | y),
+	(difference, lambda x, y : x & ~y),
+])
+def test_boolean(name, a, b, op, rule) :
+	xy, offsets = op(a, b)
+	p = np.random.default_rng(0).uniform(-1.5, 4.5, (4000, 2))
+	p = p[is_far(p, * a) & is_far(p, * b)]
+	assert (is_inside(p, xy, offsets) == rule(is_inside(p, * a), is_inside(p, * b))).all()
+	# the outer rings are counterclockwise and the holes clockwise, so that the areas add up
+	area = ring_area(xy, offsets)
+	assert np.isfinite(area).all()
+
+@pytest.mark.parametrize('name, a, b', operand_lst, ids=[o[0] for o in operand_lst])
+def test_area(name, a, b) :
+	# the area of an operand, its rings oriented as in the results (holes clockwise)
+	area = lambda u : ring_area(* intersection(u, u)).sum()
+	s_and, s_or = ring_area(* intersection(a, b)).sum(), ring_area(* union(a, b)).sum()
+	s_sub = ring_area(* difference(a, b)).sum()
+	assert s_and + s_or == pytest.approx(area(a) + area(b), abs=1e-9)
+	assert s_and + s_sub == pytest.approx(area(a), abs=1e-9)
+
+def test_segment_intersections() :
+	p0, p1 = np.array([[0.0, 0.0], [0.0, 1.0], [0.0, 5.0]]), np.array([[2.0, 2.0], [2.0, 1.0], [1.0, 5.0]])
+	q0, q1 = np.array([[0.0, 2.0], [1.0, 1.0], [2.0, 1.0]]), np.array([[2.0, 0.0], [1.0, 3.0], [3.0, 1.0]])
+	i, j, pt, i_c, j_c = segment_intersections(p0, p1, q0, q1)
+	hit = sorted(zip(i.tolist(), j.tolist(), map(tuple, pt.tolist())))
+	assert hit == [(0, 0, (1.0, 1.0)), (0, 1, (1.0, 1.0)), (1, 0, (1.0, 1.0)), (1, 1, (1.0, 1.0))]
+	assert list(zip(i_c.tolist(), j_c.tolist())) == [(1, 2)] # touching, collinear
+
+	z = np.zeros((0, 2))
+	for r in segment_intersections(z, z, q0, q1) + segment_intersections(p0, p1, z, z) :
+		assert len(r) == 0
+
+def test_segment_intersections_brute() :
+	# against all the pairs, with many collinear and touching segments on an integer grid
+	rng = np.random.default_rng(0)
+	p0, q0 = rng.integers(0, 20, (300, 2)).astype(float), rng.integers(0, 20, (200, 2)).astype(float)
+	p1, q1 = p0 + rng.integers(-5, 6, (300, 2)), q0 + rng.integers(-5, 6, (200, 2))
+	p1[::3, 0] = p0[::3, 0]
+	i, j, pt, i_c, j_c = segment_intersections(p0, p1, q0, q1, chunk_size=1000)
+	reference = set()
+	for m in range(len(p0)) :
+		for n in range(len(q0)) :
+			u, v, w = p1[m] - p0[m], q1[n] - q0[n], q0[n] - p0[m]
+			c = lambda a, b : a[0] * b[1] - a[1] * b[0]
+			o1, o2 = np.sign(c(u, w)), np.sign(c(u, q1[n] - p0[m]))
+			o3, o4 = np.sign(c(v, -w)), np.sign(c(v, p1[m] - q0[n]))
+			if not (o1 == 0 and o2 == 0) and o1 * o2 <= 0 and o3 * o4 <= 0 :
+				reference.add((m, n))
+	assert set(zip(i.tolist(), j.tolist())) == reference
+
+def test_is_inside() :
+	# the sweep, used for many edges, against a direct count of the crossings
+	xy = star(500, (0.0, 0.0), 2)
+	p = np.random.default_rng(3).uniform(-1.2, 1.2, (3000, 2))
+	polygon = Polygon(* [Point(x, y) for x, y in xy.tolist()])
+	crossing = np.zeros(len(p), dtype=int)
+	for (ax, ay), (bx, by) in zip(xy, np.roll(xy, -1, axis=0)) :
+		is_crossing = (ay > p[:, 1]) != (by > p[:, 1])
+		with np.errstate(divide='ignore', invalid='ignore') :
+			x = ax + (p[:, 1] - ay) * (bx - ax) / (by - ay)
+		crossing += is_crossing & (p[:, 0] < x)
+	assert (is_inside(p, * as_buffer([polygon]), chunk_size=777) == (crossing % 2 == 1)).all()
+	assert len(is_inside(np.zeros((0, 2)), * as_buffer([polygon]))) == 0
+	assert not is_inside([[0.0, 0.0]], * empty).any()
+
+def test_clip() :
+	rng = np.random.default_rng(0)
+	n = 500
+	theta = np.linspace(0.0, 2.0 * np.pi, 6, endpoint=False)
+	c = rng.uniform(0.0, 1.0, (n, 1, 2))
+	xy = (c + rng.uniform(0.01, 0.1, (n, 6, 1)) * np.stack([np.cos(theta), np.sin(theta)], axis=-1)).reshape(-1, 2)
+	offsets = np.arange(0, 6 * n + 1, 6)
+	total = 0.0
+	for x in range(4) :
+		for y in range(4) :
+			u, o = clip_box(xy, offsets, x / 4.0, y / 4.0, (x + 1) / 4.0, (y + 1) / 4.0)
+			assert len(o) == n + 1
+			total += ring_area(u, o).sum()
+	# the parts outside [0 ; 1]^2 are dropped
+	inside = ring_area(* clip_box(xy, offsets, 0.0, 0.0, 1.0, 1.0)).sum()
+	assert total == pytest.approx(inside)
+
+	# a triangle window, and the rings outside of it
+	u, o = clip_convex(as_buffer([square(0, 0, 2, 2), square(5, 5, 6, 6)])[0], [0, 4, 8], [[0, 0], [4, 0], [0, 4]])
+	assert ring_area(u, o).tolist() == pytest.approx([4.0, 0.0])
+	assert clip_box(* empty, 0.0, 0.0, 1.0, 1.0)[1].tolist() == [0]
+
+def test_buffer() :
+	p_lst = [Polygon(Point(0.0, 0.0), Point(1.0, 0.0), Point(0.0, 1.0)), np.array(square(0, 0, 2, 2))]
+	xy, offsets = as_buffer(p_lst)
+	assert offsets.tolist() == [0, 3, 7]
+	assert ring_area(xy, offsets).tolist() == [0.5, 4.0]
+	assert [len(p.p_lst) for p in as_polygons(xy, offsets)] == [3, 4]
+	assert as_buffer([])[1].tolist() == [0]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+from geometrik.columnar import GeometryColumns, save, load
+from geometrik.twod import Point, Segment, Circle, Arc, Polygon
+from geometrik.twod.clip import ring_area
+from geometrik.threed.vector import Vector
+
+def polygon_lst() :
+	return [
+		Polygon(Point(0.0, 0.0), Point(1.0, 0.0), Point(0.0, 1.0)),
+		Polygon(Point(5.0, 5.0), Point(6.0, 5.0), Point(6.0, 6.0), Point(5.0, 6.0)),
+		Polygon(Point(2.0, 2.0), Point(3.0, 2.0), Point(3.0, 4.0), Point(2.5, 5.0), Point(2.0, 4.0)),
+	]
+
+def as_tuple(o) :
+	if isinstance(o, Polygon) :
+		return tuple((p.x, p.y) for p in o.p_lst)
+	if isinstance(o, Vector) :
+		return o.as_tuple + (o._is_unit,)
+	if isinstance(o, Point) :
+		return o.x, o.y
+	if isinstance(o, Segment) :
+		return o.a.x, o.a.y, o.b.x, o.b.y
+	if isinstance(o, Circle) :
+		return o.c.x, o.c.y, o.r
+	if isinstance(o, Arc) :
+		return o.c.x, o.c.y, o.w, o.start, o.stop
+
+@pytest.mark.parametrize('o_lst', [
+	[Point(1.0, 2.0), Point(3.0, 4.0), Point(5.0, 6.0)],
+	[Segment(Point(0.0, 1.0), Point(2.0, 3.0))] * 2,
+	[Circle(Point(1.0, 2.0), 3.0)] * 2,
+	[Arc(Point(0.0, 0.0), 0.5, 0.0, 1.0)] * 2,
+	[Vector(1.0, 2.0, 3.0), Vector(0.0, 0.6, 0.8, True)],
+	polygon_lst(),
+])
+def test_round_trip(tmp_path, o_lst) :
+	save(tmp_path / 'u', o_lst)
+	u = load(tmp_path / 'u')
+	assert len(u) == len(o_lst)
+	assert [as_tuple(o) for o in u] == [as_tuple(o) for o in o_lst]
+	assert as_tuple(u[-1]) == as_tuple(o_lst[-1])
+
+def test_empty(tmp_path) :
+	for kind in ('Point', 'Polygon') :
+		save(tmp_path / kind, [], kind)
+		u = load(tmp_path / kind)
+		assert len(u) == 0 and list(u) == []
+	with pytest.raises(ValueError) :
+		GeometryColumns.from_objects([])
+
+def test_index() :
+	u = GeometryColumns.from_objects(polygon_lst())
+	assert len(u[-1].p_lst) == 5 and len(u[-3].p_lst) == 3
+	with pytest.raises(IndexError) :
+		u[3]
+	with pytest.raises(TypeError) :
+		u[1.0]
+	with pytest.raises(TypeError) :
+		GeometryColumns.from_objects([Point(1.0, 2.0)])[[0]]
+
+def test_slice(tmp_path) :
+	p_lst = [Point(float(i), float(-i)) for i in range(10)]
+	save(tmp_path / 'point', p_lst)
+	u = load(tmp_path / 'point')
+	for key in [slice(0, 2), slice(-3, None), slice(None, None, 3), slice(5, 2)] :
+		assert [as_tuple(o) for o in u[key]] == [as_tuple(o) for o in p_lst[key]]
+
+	v = GeometryColumns.from_objects(polygon_lst())
+	for key in [slice(0, 2), slice(1, None), slice(-1, None), slice(2, 1)] :
+		w = v[key]
+		assert [as_tuple(o) for o in w] == [as_tuple(o) for o in polygon_lst()[key]]
+		assert np.allclose(ring_area(* w.buffer), [abs(x) for x in ring_area(* v.buffer)[key]])
+	with pytest.raises(ValueError) :
+		v[::2]
+
+def test_buffer() :
+	u = GeometryColumns.from_objects(polygon_lst())
+	xy, offsets = u.buffer
+	assert offsets.tolist() == [0, 3, 7, 12]
+	with pytest.raises(ValueError) :
+		GeometryColumns.from_objects([Point(1.0, 2.0)]).buffer
+	with pytest.raises(ValueError) :
+		GeometryColumns('Point', np.zeros((3, 3)))
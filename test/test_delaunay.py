@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+from geometrik.twod import Point
+from geometrik.twod.delaunay import Delaunay, hilbert_index, brio_order
+from geometrik.twod.predicate import incircle
+from geometrik.twod.triangulate import triangle_area
+
+def hull_area(p) :
+	""" area of the convex hull, by the monotone chain """
+	p = sorted(set(map(tuple, p.tolist())))
+	cross = lambda o, a, b : (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+	lower, upper = list(), list()
+	for q in p :
+		while len(lower) >= 2 and cross(lower[-2], lower[-1], q) <= 0 :
+			lower.pop()
+		lower.append(q)
+	for q in reversed(p) :
+		while len(upper) >= 2 and cross(upper[-2], upper[-1], q) <= 0 :
+			upper.pop()
+		upper.append(q)
+	h = np.array(lower[:-1] + upper[:-1])
+	return 0.5 * (h[:, 0] * np.roll(h[:, 1], -1) - np.roll(h[:, 0], -1) * h[:, 1]).sum()
+
+def check(d) :
+	p, t = d.points, d.triangles
+	# counterclockwise, covering the convex hull
+	area = triangle_area(p, t)
+	assert (area > 0.0).all()
+	assert area.sum() == pytest.approx(hull_area(p[d.vertex_triangle >= 0]))
+	# the empty circle property, exactly
+	for a, b, c in t.tolist() :
+		for i in range(len(p)) :
+			if i not in (a, b, c) :
+				assert incircle(* p[a], * p[b], * p[c], * p[i]) <= 0
+	# the neighbor opposite to the vertex k shares the edge (k+1, k+2)
+	for i, n in enumerate(d.neighbors.tolist()) :
+		for k in range(3) :
+			if n[k] >= 0 :
+				edge = {t[i, (k + 1) % 3], t[i, (k + 2) % 3]}
+				assert edge <= set(t[n[k]].tolist())
+				assert i in d.neighbors[n[k]]
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random(seed) :
+	p = np.random.default_rng(seed).uniform(0.0, 1.0, (150, 2))
+	d = Delaunay(p, seed=seed)
+	check(d)
+	# 2n - 2 - h triangles
+	h = (d.neighbors < 0).sum()
+	assert len(d) == 2 * len(p) - 2 - h
+
+def test_grid() :
+	# cocircular points everywhere
+	x, y = np.meshgrid(np.arange(12.0), np.arange(12.0))
+	d = Delaunay(np.column_stack([x.ravel(), y.ravel()]))
+	check(d)
+	assert len(d) == 2 * 11 * 11
+
+def test_duplicated() :
+	d = Delaunay([Point(0.0, 0.0), Point(2.0, 0.0), Point(1.0, 2.0), Point(1.0, 0.7), Point(0.0, 0.0), Point(1.0, 0.7)])
+	check(d)
+	assert len(d) == 3
+	assert (d.vertex_triangle >= 0).sum() == 4
+
+def test_aligned() :
+	for p in [np.zeros((0, 2)), [[0.0, 0.0]], [[0.0, 0.0], [1.0, 1.0]], [[0.0, 0.0], [1.0, 1.0], [2.0, 2.0], [3.0, 3.0]], np.zeros((5, 2))] :
+		with pytest.raises(ValueError) :
+			Delaunay(np.array(p, dtype=np.float64).reshape(-1, 2))
+	# aligned points and one more
+	d = Delaunay(np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [3.0, 0.0], [1.5, 1.0]]))
+	check(d)
+	assert len(d) == 3
+
+def test_voronoi() :
+	p = np.random.default_rng(0).uniform(0.0, 1.0, (200, 2))
+	d = Delaunay(p)
+	cell_lst = d.voronoi_cells()
+	hull = set(d.triangles[d.neighbors < 0].ravel().tolist()) | set(d.triangles[np.roll(d.neighbors < 0, 1, axis=1)].ravel().tolist())
+	for i, cell in enumerate(cell_lst) :
+		if cell is None :
+			continue
+		c = np.array([(q.x, q.y) for q in cell.p_lst])
+		# counterclockwise, around its point, whose nearest site it is
+		assert 0.5 * (c[:, 0] * np.roll(c[:, 1], -1) - np.roll(c[:, 0], -1) * c[:, 1]).sum() > 0.0
+		for q in c :
+			dist = np.hypot(* (p - q).T)
+			assert dist[i] == pytest.approx(dist.min())
+	# the unbounded cells are the ones of the hull
+	assert {i for i, cell in enumerate(cell_lst) if cell is None} <= hull
+
+def test_hilbert() :
+	# a bijection of the grid, consecutive positions are neighbors
+	x, y = np.meshgrid(np.arange(16), np.arange(16))
+	h = hilbert_index(x.ravel(), y.ravel(), 4)
+	assert sorted(h.tolist()) == list(range(256))
+	order = np.argsort(h)
+	step = np.abs(np.diff(x.ravel()[order])) + np.abs(np.diff(y.ravel()[order]))
+	assert (step == 1).all()
+	assert sorted(brio_order(np.random.default_rng(0).uniform(size=(100, 2))).tolist()) == list(range(100))
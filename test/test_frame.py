@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import gc
+import random
+import weakref
+
+import numpy as np
+
+from geometrik.frame import Frame, FrameGraph, _transport, _common_reference
+from geometrik.quaternion import Quaternion
+
+def frame_tree(n, seed=0) :
+	rng = random.Random(seed)
+	f_lst = [None]
+	for i in range(n) :
+		q = Quaternion.from_axial_rotation(rng.random(), rng.random(), 1.0, rng.uniform(0.0, 360.0))
+		f_lst.append(Frame(Quaternion.from_vector(rng.random(), rng.random(), rng.random()), q, rng.choice(f_lst)))
+	return f_lst[1:]
+
+def test_transport_is_a_copy() :
+	root = Frame(Quaternion.from_vector(1.0, 2.0, 3.0), None, None, "root")
+	a = Frame(Quaternion.from_vector(0.0, 1.0, 0.0), Quaternion.from_axial_rotation(0.0, 0.0, 1.0, 30.0), root, "a")
+	for graph in (None, FrameGraph()) :
+		f = a.transport(root, graph)
+		assert f is not a and f._ref is root
+		f.pos_l = Quaternion.from_vector(9.0, 9.0, 9.0)
+		f.pos_r.imul(Quaternion.from_axial_rotation(1.0, 0.0, 0.0, 10.0))
+		assert a.pos_l.to_vector() == (0.0, 1.0, 0.0)
+		assert a.transport(root, graph).pos_l.to_vector() == (0.0, 1.0, 0.0)
+
+def test_graph() :
+	f_lst = frame_tree(200)
+	g = FrameGraph(cache_size=64)
+	rng = random.Random(1)
+	for n in range(2000) :
+		x, y = rng.choice(f_lst), rng.choice(f_lst)
+		common = _common_reference(x, y)
+		assert g.common_reference(x, y) is common
+		u, v = g.transport(x, y), _transport(x, y, common)
+		assert u._ref is y
+		assert np.allclose(u.pos_l.to_vector(), v.pos_l.to_vector(), atol=1e-12)
+		assert np.allclose(u.pos_r.dcm, v.pos_r.dcm, atol=1e-12)
+		if n % 50 == 0 :
+			# moving a frame invalidates the cached transports through it
+			x.pos_l = Quaternion.from_vector(rng.random(), 0.0, 0.0)
+
+def test_graph_does_not_hold_frames() :
+	root = Frame(None, None, None, "root")
+	a = Frame(Quaternion.from_vector(0.0, 1.0, 0.0), None, root, "a")
+	g = FrameGraph()
+	ref_lst = list()
+	for n in range(1000) :
+		t = Frame(Quaternion.from_vector(float(n), 0.0, 0.0), None, a if n % 2 else root)
+		g.transport(t, root)
+		g.transport(root, t)
+		ref_lst.append(weakref.ref(t))
+	del t
+	gc.collect()
+	assert not any(r() is not None for r in ref_lst)
+	assert len(g) == 2
+	assert len(root._children) == 1 and len(a._children) == 0
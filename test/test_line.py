@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+from geometrik.twod import Vector, Point, Line
+
+def test_intersection_nearly_parallel() :
+	# the float cross product of the directions is 0.0, but the directions are not colinear
+	e = 2.0**-52
+	u = Line(Vector(1.0 + e, 1.0), Point(0.0, 0.0))
+	v = Line(Vector(1.0, 1.0 - e), Point(0.0, 1.0))
+	assert u.intersection_with_line(v) is None
+	p = u.intersection_with_line(v, robust=True)
+	# exactly, t.(1 + e, 1) = (0, 1) + s.(1, 1 - e) gives t = 1 / e^2
+	assert (p.x, p.y) == ((1.0 + e) / e**2, 1.0 / e**2)
+
+def test_intersection_parallel() :
+	u = Line(Vector(1.0, 1.0), Point(0.0, 0.0))
+	v = Line(Vector(2.0, 2.0), Point(0.0, 1.0))
+	assert u.intersection_with_line(v, robust=True) is None
+
+def test_intersection() :
+	u = Line(Vector(1.0, 0.0), Point(0.0, 1.0))
+	v = Line(Vector(0.0, 1.0), Point(2.0, 0.0))
+	for robust in (False, True) :
+		p = u.intersection_with_line(v, robust=robust)
+		assert (p.x, p.y) == (2.0, 1.0)
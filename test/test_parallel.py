@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import os
+
+import numpy as np
+import pytest
+
+from geometrik.parallel import SharedArray, ParallelExecutor
+
+# the worker functions must be importable, at the top level of the module
+
+def norm(a, b) :
+	return np.hypot(a[:, 0] - b[:, 0], a[:, 1] - b[:, 1])
+
+def affine(a, scale=1.0, offset=0.0) :
+	return scale * a + offset
+
+def fail_on_zero(a) :
+	if (a == 0.0).any() :
+		raise ArithmeticError("a zero in the chunk")
+	return 1.0 / a
+
+class Scale() :
+	def __init__(self, k) :
+		self.k = k
+
+	def apply(self, a) :
+		return self.k * a
+
+def shm_lst() :
+	return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+@pytest.fixture(params=[1, 2])
+def ex(request) :
+	before = shm_lst()
+	with ParallelExecutor(request.param, scale=Scale(3.0)) as ex :
+		yield ex
+	assert shm_lst() <= before
+
+def test_map(ex) :
+	rng = np.random.default_rng(0)
+	a, b = rng.uniform(size=(1001, 2)), rng.uniform(size=(1001, 2))
+	assert (ex.map(norm, a, b) == norm(a, b)).all()
+	assert (ex.map(norm, a, b, chunk_size=7) == norm(a, b)).all()
+	# the keywords are given to each call, the output keeps the shape and type of the rows
+	c = rng.integers(0, 100, (500, 3, 2))
+	res = ex.map(affine, c, scale=2, offset=1)
+	assert res.dtype == c.dtype and (res == 2 * c + 1).all()
+
+def test_context(ex) :
+	a = np.arange(100.0)
+	assert (ex.map('scale.apply', a) == 3.0 * a).all()
+	assert (ex.map('scale.apply', a, chunk_size=3) == 3.0 * a).all()
+
+def test_shared(ex) :
+	a = np.arange(200.0).reshape(-1, 2)
+	with SharedArray.from_array(a) as s, SharedArray((100, 2)) as out :
+		res = ex.map(affine, s, out=out, scale=2.0)
+		assert res is out.value
+		assert (out.value == 2.0 * a).all()
+		# the same shared input, used again
+		assert (ex.map(affine, s, offset=1.0) == a + 1.0).all()
+		with SharedArray((99, 2)) as short, pytest.raises(ValueError) :
+			ex.map(affine, s, out=short)
+
+def test_error(ex) :
+	a = np.arange(1.0, 101.0)
+	a[57] = 0.0
+	with pytest.raises(ArithmeticError) :
+		ex.map(fail_on_zero, a, chunk_size=5)
+	# the executor is still usable
+	assert (ex.map(fail_on_zero, a[:50]) == 1.0 / a[:50]).all()
+
+def test_mismatch(ex) :
+	with pytest.raises(ValueError) :
+		ex.map(norm, np.zeros((10, 2)), np.zeros((11, 2)))
+	with pytest.raises(ValueError) :
+		ex.map(norm)
+
+def test_no_row(ex) :
+	res = ex.map(norm, np.zeros((0, 2)), np.zeros((0, 2)))
+	assert res.shape == (0,) and res.dtype == np.float64
+	res = ex.map('scale.apply', np.zeros((0, 3)))
+	assert res.shape == (0, 3)
+
+def test_shared_array() :
+	before = shm_lst()
+	s = SharedArray((0, 4), np.int32)
+	assert len(s) == 0 and s.value.shape == (0, 4) and s.value.dtype == np.int32
+	s.close()
+	with SharedArray.from_array(np.arange(6).reshape(2, 3)) as s :
+		assert s[1].tolist() == [3, 4, 5]
+		assert s.descriptor[1:] == ((2, 3), np.dtype(np.int64).str)
+	assert shm_lst() <= before
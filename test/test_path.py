@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import math
+
+import numpy as np
+import pytest
+
+from geometrik.twod import Point, Segment, Arc, Circle
+from geometrik.twod.path import Path
+
+def route() :
+	""" straight, a quarter turn to the left, straight, a half turn to the right """
+	return Path(
+		Segment(Point(0.0, 0.0), Point(10.0, 0.0)),
+		Arc(Point(10.0, 5.0), 0.2, -math.pi / 2.0, 0.0),
+		Segment(Point(15.0, 5.0), Point(15.0, 20.0)),
+		Arc(Point(17.0, 20.0), -0.5, math.pi, 0.0),
+	)
+
+def sample(u, n=20000) :
+	""" dense points of the path, from the elements themselves """
+	p_lst = list()
+	for e in u.e_lst :
+		p_lst.extend((q.x, q.y) for q in (e.get_point_at(i) for i in np.linspace(0.0, 1.0, n)))
+	return np.array(p_lst)
+
+def test_length() :
+	u = route()
+	assert len(u) == 4
+	assert u.length == pytest.approx(10.0 + 5.0 * math.pi / 2.0 + 15.0 + 2.0 * math.pi)
+	assert u.cumulative_length.tolist() == pytest.approx([0.0, 10.0, 10.0 + 2.5 * math.pi, 25.0 + 2.5 * math.pi, u.length])
+	assert Path().length == 0.0
+
+def test_point_at() :
+	u = route()
+	cum = u.cumulative_length
+	for k, e in enumerate(u.e_lst) :
+		for i in [0.0, 0.25, 0.5, 1.0] :
+			q = e.get_point_at(i)
+			assert u.point_at(cum[k] + i * (cum[k + 1] - cum[k])).tolist() == pytest.approx([q.x, q.y])
+	# clamped to the ends
+	assert u.point_at([-1.0, u.length + 1.0]) == pytest.approx(np.array([[0.0, 0.0], [19.0, 20.0]]))
+	assert u.get_point_at(5.0).x == pytest.approx(5.0)
+	assert u.point_at(np.zeros((3, 4))).shape == (3, 4, 2)
+
+def test_tangent_at() :
+	u = route()
+	cum = u.cumulative_length
+	assert u.tangent_at([5.0, cum[1] + 1e-9, cum[2] + 1.0, cum[3] + 1e-9, u.length]) == pytest.approx(
+		np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 1.0], [0.0, -1.0]]), abs=1e-6
+	)
+	# unit tangents, along the finite differences
+	s = np.linspace(0.1, u.length - 0.1, 500)
+	g = u.tangent_at(s)
+	assert np.hypot(* g.T) == pytest.approx(np.ones(len(s)))
+	d = (u.point_at(s + 1e-6) - u.point_at(s - 1e-6)) / 2e-6
+	assert np.abs(d - g).max() < 1e-5
+
+def test_nearest() :
+	u = route()
+	x = sample(u)
+	q = np.random.default_rng(0).uniform(-5.0, 25.0, (300, 2))
+	s, p, d = u.nearest(q)
+	reference = np.hypot(* (x[None, :, :] - q[:, None, :]).transpose(2, 0, 1)).min(axis=1)
+	assert d == pytest.approx(reference, abs=1e-3)
+	assert np.hypot(* (p - q).T) == pytest.approx(d)
+	assert u.point_at(s) == pytest.approx(p)
+
+def test_nearest_long() :
+	# more elements than a block, with small chunks
+	rng = np.random.default_rng(1)
+	u = Path()
+	p, heading = Point(0.0, 0.0), 0.0
+	for n in range(300) :
+		if n % 2 == 0 :
+			q = Point(p.x + 10.0 * math.cos(heading), p.y + 10.0 * math.sin(heading))
+			u.append(Segment(p, q))
+		else :
+			turn = rng.uniform(-2.0, 2.0)
+			w = math.copysign(1.0 / 5.0, turn)
+			c = Point(p.x - math.sin(heading) / w, p.y + math.cos(heading) / w)
+			start = math.atan2(p.y - c.y, p.x - c.x)
+			u.append(Arc(c, w, start, start + turn))
+			heading += turn
+			q = Point(c.x + math.cos(start + turn) / abs(w), c.y + math.sin(start + turn) / abs(w))
+		p = q
+	x = sample(u, 200)
+	lo, hi = x.min(axis=0), x.max(axis=0)
+	q = rng.uniform(lo, hi, (200, 2))
+	d = u.nearest(q, chunk_size=100)[2]
+	reference = np.array([np.hypot(* (x - r).T).min() for r in q])
+	assert d == pytest.approx(reference, abs=0.05)
+	assert (d <= reference + 1e-9).all()
+
+def test_empty() :
+	u = Path()
+	for f in [u.point_at, u.tangent_at, u.locate, u.nearest] :
+		with pytest.raises(ValueError) :
+			f([0.0])
+	with pytest.raises(TypeError) :
+		Path(Circle(Point(0.0, 0.0), 1.0))
+	with pytest.raises(TypeError) :
+		route().append(Point(0.0, 0.0))
+
+def test_no_query() :
+	u = route()
+	assert u.point_at(np.zeros(0)).shape == (0, 2)
+	s, p, d = u.nearest(np.zeros((0, 2)))
+	assert s.shape == (0,) and p.shape == (0, 2) and d.shape == (0,)
+
+def test_append() :
+	# beyond the initial capacity, the same as built at once
+	e_lst = list(route().e_lst) * 10
+	u = Path(capacity=1)
+	for e in e_lst :
+		u.append(e)
+	v = Path(* e_lst)
+	assert u.cumulative_length.tolist() == v.cumulative_length.tolist()
+	s = np.linspace(0.0, v.length, 100)
+	assert u.point_at(s).tolist() == v.point_at(s).tolist()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+from geometrik.frame import Frame, wgs84_to_cartesian_array
+from geometrik.pipeline import Pipeline, Chunk, read_array, rows_for
+from geometrik.twod import Point, Polygon
+from geometrik.twod.clip import as_buffer, is_inside
+
+outer = Polygon(Point(0.0, 0.0), Point(4.0, 0.0), Point(4.0, 4.0), Point(0.0, 4.0))
+hole = Polygon(Point(1.0, 1.0), Point(3.0, 1.0), Point(3.0, 3.0), Point(1.0, 3.0))
+
+def points(n=1000) :
+	return np.random.default_rng(0).uniform(-1.0, 5.0, (n, 2))
+
+def test_run_twice() :
+	u = Pipeline.from_array(points()).inside(outer)
+	n = u.count()
+	assert 0 < n and u.count() == n
+	index, value = u.collect()
+	assert len(index) == n
+
+def test_generator_source() :
+	u = Pipeline(read_array(points()))
+	assert u.count() == 1000
+	with pytest.raises(ValueError) :
+		u.count()
+	# a sequence of chunks can be run again
+	v = Pipeline([Chunk(np.arange(2), np.zeros((2, 2))), Chunk(np.arange(2, 3), np.zeros((1, 2)))])
+	assert v.count() == v.count() == 3
+
+@pytest.mark.parametrize('polygon', [(outer, hole), [outer, hole], as_buffer([outer, hole])])
+def test_inside(polygon) :
+	p = points()
+	index, value = Pipeline.from_array(p, chunk_size=37).inside(polygon).collect()
+	reference = np.flatnonzero(is_inside(p, * as_buffer([outer, hole])))
+	assert index.tolist() == reference.tolist()
+	assert (value == p[reference]).all()
+
+def test_empty() :
+	index, value = Pipeline.from_array(np.zeros((0, 2))).inside(outer).collect()
+	assert len(index) == 0 and value is None
+	index, value = Pipeline.from_array(np.full((10, 2), 10.0)).inside(outer).collect()
+	assert len(index) == 0
+
+@pytest.mark.parametrize('size', [1, 7, 64, 5000])
+def test_rebatch(size) :
+	c_lst = list(Pipeline.from_array(points(), chunk_size=50).filter(lambda v : v[:, 0] < 2.0).rebatch(size))
+	assert all(len(c.index) == size for c in c_lst[:-1]) and 0 < len(c_lst[-1].index) <= size
+	index = np.concatenate([c.index for c in c_lst])
+	assert index.tolist() == np.flatnonzero(points()[:, 0] < 2.0).tolist()
+
+def test_sources(tmp_path) :
+	llh = np.column_stack([np.linspace(43.0, 44.0, 100), np.linspace(1.0, 2.0, 100), np.linspace(0.0, 500.0, 100)])
+	np.savetxt(tmp_path / 'fix.csv', llh, delimiter=',', fmt='%.12f')
+	llh.tofile(tmp_path / 'fix.bin')
+	np.save(tmp_path / 'fix.npy', llh)
+	for u in [
+		Pipeline.from_csv(tmp_path / 'fix.csv', chunk_size=30),
+		Pipeline.from_binary(tmp_path / 'fix.bin', chunk_size=30),
+		Pipeline.from_binary(tmp_path / 'fix.npy', chunk_size=30),
+	] :
+		index, value = u.collect()
+		assert index.tolist() == list(range(100))
+		assert np.allclose(value, llh, rtol=0.0, atol=1e-9)
+
+def test_local_frame(tmp_path) :
+	# the whole chain against the frames, fix by fix
+	lat0, lon0, alt0 = 43.6, 1.45, 150.0
+	rng = np.random.default_rng(1)
+	llh = np.column_stack([lat0 + rng.uniform(-0.01, 0.01, 200), lon0 + rng.uniform(-0.01, 0.01, 200), rng.uniform(0.0, 100.0, 200)])
+	index, value = Pipeline.from_array(llh, chunk_size=64).to_ecef().to_local(lat0, lon0, alt0).collect()
+	ned = Frame.init_NorthEastDown(lat0, lon0, alt0)
+	reference = Frame().transform_points(wgs84_to_cartesian_array(llh), ned)
+	assert np.allclose(value, reference, rtol=0.0, atol=1e-6)
+
+	n = Pipeline.from_array(llh).to_ecef().to_local(lat0, lon0, alt0).project().write_binary(tmp_path / 'en.bin')
+	assert n == 200
+	assert np.allclose(np.fromfile(tmp_path / 'en.bin').reshape(-1, 2), reference[:, [1, 0]], rtol=0.0, atol=1e-6)
+
+def test_rows_for() :
+	assert rows_for(8 << 20, 3) == (8 << 20) // 24
+	assert rows_for(1, 3) == 1
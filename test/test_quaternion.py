@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+from geometrik.quaternion import Quaternion, QuaternionArray
+
+def test_compose_in_place_drift() :
+	# the product of unit quaternions is not exactly unit, inormalize() must not skip it
+	dq = Quaternion.from_axial_rotation(1.0, 2.0, 3.0, 0.01)
+	q = Quaternion.identity()
+	for i in range(200000) :
+		q.imul(dq).inormalize()
+	assert abs(q.norm - 1.0) < 1e-15
+
+def test_compose_drift() :
+	dq = Quaternion.from_axial_rotation(1.0, 2.0, 3.0, 0.01)
+	q = Quaternion.identity()
+	for i in range(200000) :
+		q = (q * dq).normalize()
+	assert abs(q.norm - 1.0) < 1e-15
+
+def test_product_is_not_flagged() :
+	p = Quaternion.from_axial_rotation(0.0, 0.0, 1.0, 30.0)
+	q = Quaternion.from_axial_rotation(1.0, 0.0, 0.0, 45.0)
+	assert not (p * q)._is_unit
+	assert not Quaternion.identity().imul(q)._is_unit
+	u = QuaternionArray.from_axial_rotation(np.eye(3), [10.0, 20.0, 30.0])
+	assert not (u * u)._is_unit
+	assert np.allclose((u * u).normalize().norm, 1.0)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import math
+
+import numpy as np
+import pytest
+
+from geometrik.threed.polygon import SphericalPolygon
+
+def random_points(n, seed=0) :
+	p = np.random.default_rng(seed).normal(size=(n, 3))
+	return p / np.linalg.norm(p, axis=1)[:, None]
+
+@pytest.mark.parametrize('lon', [[45, 135, 225, 315], [0, 120, 240], [0, 90, 180, 270], [10, 100, 200, 300]])
+@pytest.mark.parametrize('use_cap', [True, False])
+def test_equator(lon, use_cap) :
+	# the boundary is the equator, through the candidate reference points (1, 0, 0) or (0, 1, 0) for some of them
+	u = SphericalPolygon.from_latlon([0.0] * len(lon), lon, is_ccw=True, use_cap=use_cap)
+	assert math.isclose(u.area, 2.0 * math.pi)
+	lat = np.array([60.0, 10.0, 89.0, -60.0, -10.0, -89.0])
+	assert (u.is_inside_latlon(lat, np.full(len(lat), 10.0)) == (0.0 < lat)).all()
+
+	v = SphericalPolygon.from_latlon([0.0] * len(lon), lon, is_ccw=False, use_cap=use_cap)
+	assert (v.is_inside_latlon(lat, np.full(len(lat), 10.0)) == (lat < 0.0)).all()
+
+def test_meridian() :
+	# the boundary is the great circle of the meridians 0 and 180, the interior one of the hemispheres
+	for is_ccw in (True, False) :
+		u = SphericalPolygon.from_latlon([0.0, 90.0, 0.0, -90.0], [0.0, 0.0, 180.0, 0.0], is_ccw=is_ccw, use_cap=False)
+		is_east = bool(u.is_inside_latlon(0.0, 90.0))
+		assert is_east != bool(u.is_inside_latlon(0.0, -90.0))
+		p = random_points(10000)
+		assert (u.is_inside(p) == ((p[:, 1] > 0.0) == is_east)).all()
+
+def test_winding() :
+	# the winding number is 2 pi inside a polygon smaller than a hemisphere (-2 pi at the antipodes, else 0)
+	for lat, lon in [
+		([50.0, 50.0, 60.0, 60.0], [170.0, -170.0, -170.0, 170.0]), # across the antimeridian
+		([80.0, 80.0, 80.0, 80.0], [0.0, 90.0, 180.0, -90.0]), # around the north pole
+		([44.1, 44.1, 43.9, 43.8, 43.8, 43.8], [4.76, 4.96, 4.99, 4.97, 4.84, 4.78]),
+		([-30.0, -10.0, -30.0, 20.0, 0.0], [-40.0, 0.0, 40.0, 30.0, -30.0]), # concave
+	] :
+		p = random_points(2000)
+		# points close to the polygon, in its cap
+		c = SphericalPolygon.from_latlon(lat, lon).cap_center
+		q = c + 0.3 * random_points(2000, 1)
+		p = np.vstack([p, q / np.linalg.norm(q, axis=1)[:, None]])
+		for use_cap in (True, False) :
+			u = SphericalPolygon.from_latlon(lat, lon, use_cap=use_cap)
+			reference = np.array([u._winding(r) > math.pi for r in p])
+			assert (u.is_inside(p) == reference).all()
+
+def test_large_region() :
+	# both orientations of the same boundary: a small region and its complement
+	lat, lon = [50.0, 50.0, 60.0, 60.0], [170.0, -170.0, -170.0, 170.0]
+	u = SphericalPolygon.from_latlon(lat, lon, is_ccw=True)
+	v = SphericalPolygon.from_latlon(lat, lon, is_ccw=False)
+	assert math.isclose(u.area + v.area, 4.0 * math.pi)
+	p = random_points(5000)
+	assert (u.is_inside(p) != v.is_inside(p)).all()
+
+def test_degenerate() :
+	with pytest.raises(ValueError) :
+		SphericalPolygon.from_latlon([0.0, 10.0], [0.0, 10.0])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+from geometrik.twod import Point, Polygon
+from geometrik.twod.triangulate import triangulate, triangle_area
+
+def ring_area(p) :
+	p = np.asarray(p, dtype=np.float64)
+	return 0.5 * (p[:, 0] * np.roll(p[:, 1], -1) - np.roll(p[:, 0], -1) * p[:, 1]).sum()
+
+def star(n, r0, r1, seed, center=(0.0, 0.0)) :
+	theta = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+	r = np.random.default_rng(seed).uniform(r0, r1, n)
+	return np.column_stack([center[0] + r * np.cos(theta), center[1] + r * np.sin(theta)])
+
+def check(p, t, area, count) :
+	assert t.shape == (count, 3) and t.dtype == np.int64
+	a = triangle_area(p, t)
+	assert (a >= 0.0).all()
+	assert a.sum() == pytest.approx(area)
+
+@pytest.mark.parametrize('n', [3, 4, 10, 100, 1000])
+def test_simple(n) :
+	# the z-order hash is used above 80 vertices
+	p = star(n, 0.5, 1.0, n)
+	check(p, triangulate(p), ring_area(p), n - 2)
+	# clockwise, the triangles are still counterclockwise
+	check(p[::-1], triangulate(p[::-1]), ring_area(p), n - 2)
+
+def test_concave() :
+	p = [[0.0, 0.0], [2.0, 0.0], [2.0, 2.0], [1.0, 1.0], [0.0, 2.0]]
+	check(p, triangulate(p), 3.0, 3)
+	# a comb, with teeth sharing their x
+	p = [[0.0, 0.0], [6.0, 0.0]] + [[x, 3.0 - 2.0 * (i % 2)] for i, x in enumerate(range(6, -1, -1))]
+	check(p, triangulate(p), ring_area(p), len(p) - 2)
+
+def test_hole() :
+	outer = np.array([[-10.0, -10.0], [10.0, -10.0], [10.0, 10.0], [-10.0, 10.0]])
+	hole_lst = [star(12, 0.3, 0.9, i, (x, y))[::-1] for i, (x, y) in enumerate([(-5.0, -5.0), (5.0, 0.0), (0.0, 5.0)])]
+	p = np.concatenate([outer] + hole_lst)
+	hole_start = np.cumsum([len(outer)] + [len(h) for h in hole_lst[:-1]])
+	area = ring_area(outer) + sum(ring_area(h) for h in hole_lst)
+	check(p, triangulate(p, hole_start), area, len(p) - 2 + 2 * len(hole_lst))
+
+def test_hole_touching() :
+	# a hole whose vertex is on a vertex of the outer ring
+	p = [[0.0, 0.0], [4.0, 0.0], [4.0, 4.0], [0.0, 4.0], [0.0, 0.0], [1.0, 2.0], [2.0, 1.0]]
+	t = triangulate(p, [4])
+	assert triangle_area(p, t).sum() == pytest.approx(16.0 - 1.5)
+
+@pytest.mark.parametrize('p', [
+	np.zeros((0, 2)),
+	[[0.0, 0.0]],
+	[[0.0, 0.0], [1.0, 1.0]],
+	[[0.0, 0.0], [1.0, 1.0], [0.0, 0.0]],
+	[[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [3.0, 0.0]],
+])
+def test_degenerate(p) :
+	t = triangulate(p)
+	assert t.shape == (0, 3) and t.dtype == np.int64
+	assert triangle_area(p, t).shape == (0,)
+
+def test_duplicated() :
+	# repeated and aligned vertices are dropped
+	p = [[0.0, 0.0], [1.0, 0.0], [1.0, 0.0], [2.0, 0.0], [2.0, 2.0], [0.0, 2.0], [0.0, 0.0]]
+	t = triangulate(p)
+	assert triangle_area(p, t).sum() == pytest.approx(4.0)
+	assert (triangle_area(p, t) > 0.0).all()
+
+def test_polygon() :
+	u = Polygon(Point(0.0, 0.0), Point(4.0, 0.0), Point(4.0, 4.0), Point(0.0, 4.0))
+	hole = Polygon(Point(1.0, 1.0), Point(1.0, 3.0), Point(3.0, 3.0), Point(3.0, 1.0))
+	t = u.triangulate()
+	assert t.shape == (2, 3)
+	t = u.triangulate(hole)
+	p = [(q.x, q.y) for q in u.p_lst + hole.p_lst]
+	check(p, t, 12.0, 8)